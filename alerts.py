@@ -0,0 +1,203 @@
+"""
+Модуль состояния оповещений
+Отслеживает переходы состояний сайтов (ok→error, error→ok, изменения контента),
+подавляет повторы в пределах окна и копит события для периодических сводок
+"""
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+import config
+
+# Виды событий в порядке вывода в уведомлении
+ALERT_EVENTS = ('error', 'recovered', 'changed', 'slow')
+
+
+class AlertStateEngine:
+    """
+    Движок состояний оповещений
+    Хранит последнее состояние каждого сайта и время последних уведомлений в JSON файле
+    """
+
+    def __init__(self, state_file: str = None, dedupe_window: int = None, digest_interval_hours: float = None):
+        """
+        Инициализация движка
+
+        Args:
+            state_file (str): Путь к файлу состояния
+            dedupe_window (int): Окно подавления повторных уведомлений в секундах
+            digest_interval_hours (float): Интервал сводок в часах (0 - отправлять сразу)
+        """
+        self.state_file = state_file or config.ALERT_STATE_FILE
+        self.dedupe_window = timedelta(seconds=config.NOTIFICATION_RETRY_DELAY if dedupe_window is None else dedupe_window)
+        self.digest_interval = timedelta(
+            hours=config.DIGEST_INTERVAL_HOURS if digest_interval_hours is None else digest_interval_hours
+        )
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict:
+        """
+        Загружает состояние из файла
+
+        Returns:
+            Dict: Состояние с ключами sites и digests
+        """
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            state = {}
+        state.setdefault('sites', {})
+        state.setdefault('digests', {})
+        return state
+
+    def save(self):
+        """Сохраняет состояние в файл"""
+        state_dir = os.path.dirname(self.state_file)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def site_key(site: Dict) -> str:
+        """
+        Ключ сайта в состоянии (ID сайтов пересчитываются при удалении, поэтому используем URL)
+
+        Args:
+            site (Dict): Данные сайта
+
+        Returns:
+            str: Ключ сайта
+        """
+        return f"{site.get('user_id')}:{site['url']}"
+
+    def process(self, user_id: int, user_results: Dict[str, List], now: datetime = None) -> Dict[str, List]:
+        """
+        Обрабатывает результаты проверки пользователя и возвращает события для немедленной отправки
+
+        Args:
+            user_id (int): ID пользователя
+            user_results (Dict[str, List]): Результаты проверки по статусам
+            now (datetime): Текущее время
+
+        Returns:
+            Dict[str, List]: События по видам (пусто, если уведомлять не о чем
+            или включен режим сводок)
+        """
+        now = now or datetime.now()
+        events = {event: [] for event in ALERT_EVENTS}
+
+        for status, results in user_results.items():
+            for result in results:
+                for event in self._transition(result['site'], status, now, result.get('content_hash')):
+                    events[event].append({
+                        'site': {key: result['site'].get(key) for key in ('id', 'name', 'url', 'user_id')},
+                        'message': result['message'],
+                        'at': now.isoformat()
+                    })
+
+        if not any(events.values()) or not self.digest_interval:
+            return events
+
+        # Режим сводок: копим события до истечения интервала
+        digest = self.state['digests'].setdefault(str(user_id), {'started_at': now.isoformat(), 'events': {}})
+        for event, items in events.items():
+            digest['events'].setdefault(event, []).extend(items)
+        return {event: [] for event in ALERT_EVENTS}
+
+    def _transition(self, site: Dict, status: str, now: datetime, content_hash: str = None) -> List[str]:
+        """
+        Обновляет состояние сайта и определяет события для уведомления
+
+        Повтор события в пределах окна подавления не отправляется, а состояние сайта
+        при этом не меняется: если новое состояние сохранится, событие будет отправлено
+        при следующей проверке после окна. Изменение контента подавляется, только
+        если совпадает хеш (о новом изменении сообщаем всегда)
+
+        Args:
+            site (Dict): Данные сайта
+            status (str): Статус текущей проверки
+            now (datetime): Текущее время
+            content_hash (str): Хеш контента текущей проверки
+
+        Returns:
+            List[str]: Виды событий (пусто, если уведомлять не нужно); после сбоя
+            вместе с медленным ответом или изменением контента приходит и восстановление
+        """
+        entry = self.state['sites'].setdefault(self.site_key(site), {'state': None, 'notified': {}})
+        previous = entry['state']
+        current = status if status in ('error', 'slow') else 'ok'
+
+        if status == 'changed':
+            events = ['recovered', 'changed'] if previous == 'error' else ['changed']
+        elif current == 'error':
+            events = ['error'] if previous != 'error' else []
+        else:
+            events = ['recovered'] if previous == 'error' else []
+            if current == 'slow' and previous != 'slow':
+                events.append('slow')
+
+        notify = [event for event in events if not self._suppressed(entry, event, now, content_hash)]
+        if events and not notify:
+            return []
+
+        if current != previous:
+            entry['state'] = current
+            entry['since'] = now.isoformat()
+
+        for event in notify:
+            entry['notified'][event] = now.isoformat()
+            if event == 'changed':
+                entry['changed_hash'] = content_hash
+        return notify
+
+    def _suppressed(self, entry: Dict, event: str, now: datetime, content_hash: Optional[str]) -> bool:
+        """
+        Проверяет, подавляется ли повтор события (например, при "мигающем" сайте)
+
+        Args:
+            entry (Dict): Состояние сайта
+            event (str): Вид события
+            now (datetime): Текущее время
+            content_hash (Optional[str]): Хеш контента текущей проверки
+
+        Returns:
+            bool: True если о таком событии уже сообщали в пределах окна
+        """
+        last_notified = entry['notified'].get(event)
+        if not last_notified or now - datetime.fromisoformat(last_notified) >= self.dedupe_window:
+            return False
+        return event != 'changed' or entry.get('changed_hash') == content_hash
+
+    def pop_due_digests(self, now: datetime = None) -> Dict[int, Dict[str, List]]:
+        """
+        Возвращает и удаляет сводки, интервал которых истек
+
+        Args:
+            now (datetime): Текущее время
+
+        Returns:
+            Dict[int, Dict[str, List]]: События по пользователям
+        """
+        now = now or datetime.now()
+        due = {}
+
+        for user_id, digest in list(self.state['digests'].items()):
+            if now - datetime.fromisoformat(digest['started_at']) >= self.digest_interval:
+                due[int(user_id)] = {event: digest['events'].get(event, []) for event in ALERT_EVENTS}
+                del self.state['digests'][user_id]
+
+        return due
+
+    def prune(self, sites: Iterable[Dict]):
+        """
+        Удаляет состояние сайтов, которых больше нет среди проверяемых
+
+        Args:
+            sites (Iterable[Dict]): Проверяемые сайты
+        """
+        keys = {self.site_key(site) for site in sites}
+        for key in list(self.state['sites']):
+            if key not in keys:
+                del self.state['sites'][key]
@@ -0,0 +1,196 @@
+"""
+Микробенчмарк извлечения текста, хеширования и детекции значительных изменений
+
+Для каждой пары страниц из корпуса отдельно замеряются extract_text, потоковое
+извлечение текста (StreamingTextExtractor), hash_text и _is_significant_change,
+а также сохраняется вердикт о значительности изменения.
+Сохраненные вердикты позволяют проверить, что более быстрая реализация дает тот же
+результат (--verify).
+
+Пример:
+    python benchmarks/bench_change_detection.py --output verdicts.json
+    python benchmarks/bench_change_detection.py --max-size 100000 --verify verdicts.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from corpus import CHANGE_KINDS, DEFAULT_SIZES, build_corpus  # noqa: E402
+
+
+def _best_of(repeat: int, func: Callable, *args):
+    """
+    Выполняет функцию несколько раз и возвращает лучшее время и результат
+
+    Args:
+        repeat (int): Количество повторов
+        func (Callable): Замеряемая функция
+        *args: Аргументы функции
+
+    Returns:
+        tuple: (лучшее время в секундах, результат функции)
+    """
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _stream_extract(html: str) -> str:
+    """
+    Извлекает текст потоково, передавая HTML фрагментами как при загрузке
+
+    Args:
+        html (str): HTML страницы
+
+    Returns:
+        str: Текст страницы
+    """
+    from fetcher import CHUNK_SIZE
+    from html_stream import StreamingTextExtractor
+    from site_monitor import SKIP_TAGS
+
+    extractor = StreamingTextExtractor(SKIP_TAGS)
+    for start in range(0, len(html), CHUNK_SIZE):
+        extractor.feed(html[start:start + CHUNK_SIZE])
+    extractor.close()
+    return extractor.text
+
+
+def run(corpus: List[Dict], repeat: int) -> List[Dict]:
+    """
+    Замеряет этапы детекции изменений для каждой пары корпуса
+
+    Args:
+        corpus (List[Dict]): Пары страниц
+        repeat (int): Количество повторов каждого замера
+
+    Returns:
+        List[Dict]: Замеры и вердикты по парам
+    """
+    from database import SitesDatabase
+    from site_monitor import SiteMonitor
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        monitor = SiteMonitor(SitesDatabase(os.path.join(tmp_dir, 'sites.json')))
+        results = []
+
+        for pair in corpus:
+            print(f"{pair['kind']:>13} {pair['size']:>9} байт...", file=sys.stderr)
+            extract_old, old_text = _best_of(repeat, monitor.extract_text, pair['old'])
+            extract_new, new_text = _best_of(repeat, monitor.extract_text, pair['new'])
+            stream_time, stream_text = _best_of(repeat, _stream_extract, pair['new'])
+            hash_time, new_hash = _best_of(repeat, monitor.hash_text, new_text)
+            old_hash = monitor.hash_text(old_text)
+
+            # Как и в check_site, сравнение выполняется только при несовпадении хешей
+            if old_hash != new_hash:
+                diff_time, (is_significant, description) = _best_of(
+                    repeat, monitor._is_significant_change, old_text, new_text
+                )
+            else:
+                diff_time, is_significant, description = 0.0, False, 'Контент не изменился'
+
+            results.append({
+                'kind': pair['kind'],
+                'size': pair['size'],
+                'html_bytes': len(pair['new'].encode('utf-8')),
+                'text_chars': len(new_text),
+                'extract_seconds': round(extract_old + extract_new, 6),
+                'stream_extract_seconds': round(stream_time, 6),
+                'stream_text_equal': stream_text == new_text,
+                'hash_seconds': round(hash_time, 6),
+                'diff_seconds': round(diff_time, 6),
+                'hash_changed': old_hash != new_hash,
+                'is_significant': is_significant,
+                'description': description
+            })
+
+    return results
+
+
+def verify(results: List[Dict], expected: List[Dict]) -> int:
+    """
+    Сравнивает вердикты с сохраненными и печатает расхождения
+
+    Args:
+        results (List[Dict]): Текущие результаты
+        expected (List[Dict]): Сохраненные результаты
+
+    Returns:
+        int: Количество расхождений
+    """
+    expected_by_case = {(item['kind'], item['size']): item for item in expected}
+    mismatches = 0
+
+    for item in results:
+        old = expected_by_case.get((item['kind'], item['size']))
+        if not old:
+            continue
+        if not item['stream_text_equal']:
+            mismatches += 1
+            print(f"Расхождение {item['kind']}/{item['size']}: потоковый текст отличается от extract_text")
+        for key in ('hash_changed', 'is_significant'):
+            if item[key] != old[key]:
+                mismatches += 1
+                print(f"Расхождение {item['kind']}/{item['size']}: {key} {old[key]} -> {item[key]}")
+        for key in ('extract_seconds', 'stream_extract_seconds', 'hash_seconds', 'diff_seconds'):
+            before, after = old.get(key), item[key]
+            if before:
+                print(f"  {item['kind']:>13} {item['size']:>9}: {key} {before} -> {after} ({(after - before) / before * 100:+.1f}%)")
+
+    print(f"Расхождений в вердиктах: {mismatches}")
+    return mismatches
+
+
+def main():
+    """Точка входа микробенчмарка"""
+    parser = argparse.ArgumentParser(description='Микробенчмарк детекции изменений')
+    parser.add_argument('--kinds', default=','.join(CHANGE_KINDS), help='Виды изменений через запятую')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES), help='Размеры страниц в байтах')
+    parser.add_argument('--max-size', type=int, help='Пропустить страницы больше указанного размера')
+    parser.add_argument('--repeat', type=int, default=3, help='Повторов каждого замера (берется лучший)')
+    parser.add_argument('--seed', type=int, default=42, help='Зерно генератора корпуса')
+    parser.add_argument('--output', help='Файл для JSON результатов')
+    parser.add_argument('--verify', help='JSON с ранее сохраненными вердиктами для проверки эквивалентности')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',') if not args.max_size or int(size) <= args.max_size]
+    corpus = build_corpus(args.kinds.split(','), sizes, args.seed)
+    results = run(corpus, args.repeat)
+
+    report = {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'params': {'repeat': args.repeat, 'seed': args.seed},
+        'results': results
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.verify:
+        with open(args.verify, 'r', encoding='utf-8') as f:
+            if verify(results, json.load(f)['results']):
+                sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
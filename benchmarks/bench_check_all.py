@@ -0,0 +1,230 @@
+"""
+Сквозной бенчмарк check_all_sites на локальной ферме тестовых сайтов
+
+Для каждого размера базы (по умолчанию 100, 1000 и 10000 сайтов) запускается
+отдельный процесс, который выполняет несколько прогонов check_all_sites и
+замеряет пропускную способность, задержки по сайтам, пиковый RSS и файловый
+ввод-вывод базы. Результаты выводятся в JSON для сравнения между коммитами.
+
+Пример:
+    python benchmarks/bench_check_all.py --sizes 100,1000 --output results.json
+    python benchmarks/bench_check_all.py --sizes 100 --compare results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from datetime import datetime
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fixture_farm import FixtureFarm  # noqa: E402
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _git_revision() -> str:
+    """Короткий хеш текущего коммита (для сравнения результатов)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_worker(sites_count: int, farm_url: str, runs: int) -> Dict:
+    """
+    Выполняет прогоны check_all_sites в текущем процессе
+
+    Args:
+        sites_count (int): Количество сайтов в базе
+        farm_url (str): Базовый URL фермы тестовых сайтов
+        runs (int): Количество прогонов (между прогонами ферма меняет поколение)
+
+    Returns:
+        Dict: Результаты замеров
+    """
+    import config
+    config.CHECK_PAUSE_SECONDS = 0
+    config.SLOW_RESPONSE_THRESHOLD = 0
+
+    from database import SitesDatabase
+    from site_monitor import SiteMonitor
+
+    class CountingSitesDatabase(SitesDatabase):
+        """База данных, считающая операции и объем файлового ввода-вывода"""
+
+        def __init__(self, db_file: str):
+            self.io = {'reads': 0, 'read_bytes': 0, 'writes': 0, 'write_bytes': 0, 'seconds': 0.0}
+            super().__init__(db_file)
+
+        def _load_sites(self):
+            started = time.perf_counter()
+            sites = super()._load_sites()
+            self.io['seconds'] += time.perf_counter() - started
+            self.io['reads'] += 1
+            self.io['read_bytes'] += os.path.getsize(self.db_file) if os.path.exists(self.db_file) else 0
+            return sites
+
+        def _save_sites(self, sites):
+            started = time.perf_counter()
+            super()._save_sites(sites)
+            self.io['seconds'] += time.perf_counter() - started
+            self.io['writes'] += 1
+            self.io['write_bytes'] += os.path.getsize(self.db_file)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database = CountingSitesDatabase(os.path.join(tmp_dir, 'sites.json'))
+
+        # Заполняем базу одной записью файла, чтобы подготовка не искажала замеры
+        now = datetime.now().isoformat()
+        database._save_sites([
+            {
+                'id': i + 1, 'url': f"{farm_url}/site/{i}", 'name': f"site-{i}", 'user_id': i % 50 + 1,
+                'added_at': now, 'last_check': None, 'last_status': None, 'last_content_hash': None,
+                'last_content': None, 'is_active': True, 'check_count': 0, 'error_count': 0
+            }
+            for i in range(sites_count)
+        ])
+
+        monitor = SiteMonitor(database)
+        run_results = []
+
+        for run in range(runs):
+            if run > 0:
+                urllib.request.urlopen(f"{farm_url}/__advance").read()
+
+            database.io = {key: 0 for key in database.io}
+            cpu_started = time.process_time()
+            started = time.perf_counter()
+            results = monitor.check_all_sites()
+            wall = time.perf_counter() - started
+
+            latencies = [
+                entry['timings'].get('total', 0.0)
+                for entries in results.values() for entry in entries
+            ]
+            run_results.append({
+                'run': run + 1,
+                'wall_seconds': round(wall, 4),
+                'cpu_seconds': round(time.process_time() - cpu_started, 4),
+                'throughput_sites_per_sec': round(sites_count / wall, 2) if wall else 0,
+                'latency_p50': round(_percentile(latencies, 50), 4),
+                'latency_p90': round(_percentile(latencies, 90), 4),
+                'latency_p99': round(_percentile(latencies, 99), 4),
+                'latency_max': round(max(latencies, default=0.0), 4),
+                'statuses': {status: len(entries) for status, entries in results.items()},
+                'db_io': {key: round(value, 4) for key, value in database.io.items()},
+                'db_file_bytes': os.path.getsize(database.db_file)
+            })
+
+    # ru_maxrss в Linux измеряется в килобайтах, в macOS - в байтах
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_rss_mb = peak_rss / (1024 * 1024) if sys.platform == 'darwin' else peak_rss / 1024
+
+    return {'sites': sites_count, 'peak_rss_mb': round(peak_rss_mb, 1), 'runs': run_results}
+
+
+def compare(current: Dict, previous: Dict):
+    """
+    Печатает изменение ключевых показателей относительно предыдущих результатов
+
+    Args:
+        current (Dict): Текущие результаты
+        previous (Dict): Результаты для сравнения
+    """
+    print(f"Сравнение {previous.get('revision')} -> {current.get('revision')}")
+    previous_by_size = {item['sites']: item for item in previous.get('results', [])}
+
+    for item in current['results']:
+        old = previous_by_size.get(item['sites'])
+        if not old:
+            continue
+        for run, old_run in zip(item['runs'], old['runs']):
+            for key in ('throughput_sites_per_sec', 'latency_p50', 'latency_p99', 'wall_seconds'):
+                before, after = old_run[key], run[key]
+                delta = (after - before) / before * 100 if before else 0.0
+                print(f"  {item['sites']:>6} сайтов, прогон {run['run']}: {key} {before} -> {after} ({delta:+.1f}%)")
+        before, after = old['peak_rss_mb'], item['peak_rss_mb']
+        print(f"  {item['sites']:>6} сайтов: peak_rss_mb {before} -> {after}")
+
+
+def main():
+    """Точка входа бенчмарка"""
+    parser = argparse.ArgumentParser(description='Бенчмарк check_all_sites на локальной ферме сайтов')
+    parser.add_argument('--sizes', default='100,1000,10000', help='Размеры базы через запятую')
+    parser.add_argument('--runs', type=int, default=2, help='Прогонов на каждый размер')
+    parser.add_argument('--latency', type=float, default=0.005, help='Задержка ответа фермы в секундах')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, help='Случайная добавка к задержке')
+    parser.add_argument('--page-size', type=int, default=20_000, help='Размер страницы в байтах')
+    parser.add_argument('--change-rate', type=float, default=0.1, help='Доля страниц, меняющихся между прогонами')
+    parser.add_argument('--error-rate', type=float, default=0.02, help='Доля ответов с ошибкой')
+    parser.add_argument('--seed', type=int, default=42, help='Зерно генератора страниц')
+    parser.add_argument('--output', help='Файл для JSON результатов')
+    parser.add_argument('--compare', help='JSON результатов предыдущего запуска для сравнения')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--farm-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(int(args.sizes), args.farm_url, args.runs)))
+        return
+
+    farm = FixtureFarm(
+        latency=args.latency, latency_jitter=args.latency_jitter, size=args.page_size,
+        change_rate=args.change_rate, error_rate=args.error_rate, seed=args.seed
+    )
+    results = []
+
+    with farm:
+        for size in (int(value) for value in args.sizes.split(',')):
+            print(f"Бенчмарк {size} сайтов...", file=sys.stderr)
+            # Каждый размер - отдельный процесс, чтобы пиковый RSS не накапливался
+            output = subprocess.check_output(
+                [sys.executable, os.path.abspath(__file__), '--worker', '--sizes', str(size),
+                 '--farm-url', farm.base_url, '--runs', str(args.runs)],
+                stderr=subprocess.DEVNULL, text=True
+            )
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    report = {
+        'revision': _git_revision(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'params': {
+            'runs': args.runs, 'latency': args.latency, 'latency_jitter': args.latency_jitter,
+            'page_size': args.page_size, 'change_rate': args.change_rate,
+            'error_rate': args.error_rate, 'seed': args.seed
+        },
+        'results': results
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,336 @@
+"""
+Бенчмарк задержки команд бота в режимах вебхука и long polling
+
+Поднимает локальный фиктивный сервер Bot API (getMe, setWebhook, getUpdates,
+sendMessage и т.д.), запускает бота на нем и отправляет "залпом" записанные
+обновления с командой от множества пользователей: в режиме вебхука - POST запросами
+на сервер вебхука, в режиме polling - через очередь getUpdates. Задержка команды -
+время от отправки обновления до получения фиктивным сервером ответа бота этому пользователю.
+
+Пример:
+    python benchmarks/bench_webhook.py --users 100 --rounds 3 --output webhook.json
+    python benchmarks/bench_webhook.py --mode webhook --updates recorded_update.json
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Токен фиктивного бота
+BENCH_TOKEN = '123456:BENCHMARK'
+
+# Обновление с командой в формате Telegram (используется, если не задан --updates)
+DEFAULT_UPDATE = {
+    'update_id': 1,
+    'message': {
+        'message_id': 1,
+        'date': 1700000000,
+        'chat': {'id': 1, 'type': 'private', 'first_name': 'Bench'},
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'Bench', 'language_code': 'ru'},
+        'text': '/list',
+        'entities': [{'type': 'bot_command', 'offset': 0, 'length': 5}]
+    }
+}
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(percent / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _git_revision() -> str:
+    """Короткий хеш текущего коммита (для сравнения результатов)"""
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class FakeBotApi(ThreadingHTTPServer):
+    """
+    Фиктивный сервер Bot API: отвечает на методы, которые вызывает бот,
+    отдает обновления через getUpdates и запоминает время ответов пользователям
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), _FakeBotApiHandler)
+        self.updates = []
+        self.replies: Dict[int, float] = {}
+        self.condition = threading.Condition()
+        self.message_id = 0
+
+    @property
+    def base_url(self) -> str:
+        """Адрес Bot API для TELEGRAM_API_URL"""
+        return f"http://127.0.0.1:{self.server_address[1]}/bot"
+
+    def push_update(self, update: Dict):
+        """Добавляет обновление в очередь getUpdates"""
+        with self.condition:
+            self.updates.append(update)
+            self.condition.notify_all()
+
+    def get_updates(self, offset: int, timeout: float) -> List[Dict]:
+        """Long polling: ждет обновления не дольше timeout секунд"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                self.updates = [update for update in self.updates if update['update_id'] >= offset]
+                remaining = deadline - time.monotonic()
+                if self.updates or remaining <= 0:
+                    return list(self.updates)
+                self.condition.wait(remaining)
+
+    def record_reply(self, chat_id: int) -> Dict:
+        """Запоминает время первого ответа пользователю и формирует сообщение"""
+        now = time.perf_counter()
+        with self.condition:
+            self.replies.setdefault(chat_id, now)
+            self.message_id += 1
+            self.condition.notify_all()
+            return {'message_id': self.message_id, 'date': int(time.time()), 'chat': {'id': chat_id, 'type': 'private'}}
+
+    def wait_replies(self, chat_ids: List[int], timeout: float) -> bool:
+        """Ждет ответов всем пользователям"""
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while not all(chat_id in self.replies for chat_id in chat_ids):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+
+class _FakeBotApiHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик запросов к фиктивному Bot API
+    """
+
+    def do_POST(self):
+        method = self.path.rsplit('/', 1)[-1]
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        content_type = self.headers.get('Content-Type', '')
+        if 'json' in content_type:
+            params = json.loads(body or b'{}')
+        else:
+            params = {key: values[0] for key, values in parse_qs(body.decode('utf-8')).items()}
+
+        if method == 'getMe':
+            result = {'id': 123456, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        elif method == 'getUpdates':
+            result = self.server.get_updates(int(params.get('offset') or 0), float(params.get('timeout') or 0))
+        elif method in ('sendMessage', 'sendDocument'):
+            result = self.server.record_reply(int(params['chat_id']))
+        else:
+            result = True
+
+        payload = json.dumps({'ok': True, 'result': result}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _make_updates(template: Dict, users: int, first_update_id: int) -> List[Dict]:
+    """Размножает записанное обновление на пользователей с уникальными ID"""
+    updates = []
+    for index in range(users):
+        update = copy.deepcopy(template)
+        update['update_id'] = first_update_id + index
+        message = update['message']
+        message['message_id'] = first_update_id + index
+        message['chat']['id'] = message['from']['id'] = index + 1
+        updates.append(update)
+    return updates
+
+
+def _post_update(url: str, secret_token: str, update: Dict):
+    """Отправляет обновление на вебхук так же, как Telegram"""
+    request = urllib.request.Request(
+        url, data=json.dumps(update).encode('utf-8'), method='POST',
+        headers={'Content-Type': 'application/json', 'X-Telegram-Bot-Api-Secret-Token': secret_token}
+    )
+    urllib.request.urlopen(request, timeout=30).read()
+
+
+async def run_mode(mode: str, template: Dict, users: int, rounds: int, sites_per_user: int) -> Dict:
+    """
+    Запускает бота в заданном режиме и замеряет задержку команд залпами обновлений
+
+    Args:
+        mode (str): webhook или polling
+        template (Dict): Записанное обновление с командой
+        users (int): Пользователей в залпе
+        rounds (int): Количество залпов
+        sites_per_user (int): Сайтов у каждого пользователя в базе
+
+    Returns:
+        Dict: Результаты замеров
+    """
+    import config
+
+    api = FakeBotApi()
+    threading.Thread(target=api.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        config.TELEGRAM_BOT_TOKEN = BENCH_TOKEN
+        config.TELEGRAM_API_URL = api.base_url
+        config.SITES_DATABASE_FILE = os.path.join(tmp_dir, 'sites.json')
+        config.WEBHOOK_URL = 'https://bench.invalid/telegram'
+        config.WEBHOOK_LISTEN = '127.0.0.1'
+        config.WEBHOOK_PORT = 0
+        config.WEBHOOK_CERT_FILE = config.WEBHOOK_KEY_FILE = ''
+
+        from telegram_bot import SiteMonitorBot
+
+        bot = SiteMonitorBot()
+        bot.database.add_sites(
+            [(f"https://site{index}.example", None) for index in range(sites_per_user)], user_id=None
+        )
+        sites = bot.database._load_sites()
+        now = datetime.now().isoformat()
+        bot.database._save_sites([
+            dict(site, id=user * sites_per_user + index + 1, user_id=user + 1, added_at=now)
+            for user in range(users) for index, site in enumerate(sites)
+        ])
+        application = bot.build_application()
+
+        stop_event = asyncio.Event()
+        if mode == 'webhook':
+            server_task = asyncio.create_task(bot.serve_webhook(stop_event))
+            while not application.running:
+                await asyncio.sleep(0.01)
+        else:
+            await application.initialize()
+            await application.start()
+            await application.updater.start_polling(poll_interval=0, timeout=10)
+
+        latencies = []
+        round_results = []
+        executor = ThreadPoolExecutor(max_workers=min(users, 64))
+        loop = asyncio.get_running_loop()
+
+        for round_index in range(rounds):
+            updates = _make_updates(template, users, round_index * users + 1)
+            chat_ids = [update['message']['chat']['id'] for update in updates]
+            with api.condition:
+                api.replies.clear()
+
+            sent = {}
+            started = time.perf_counter()
+            if mode == 'webhook':
+                url = bot.webhook_server.url
+                secret_token = bot.webhook_server.secret_token
+
+                def post(update):
+                    sent[update['message']['chat']['id']] = time.perf_counter()
+                    _post_update(url, secret_token, update)
+
+                await asyncio.gather(*(loop.run_in_executor(executor, post, update) for update in updates))
+            else:
+                for update in updates:
+                    sent[update['message']['chat']['id']] = time.perf_counter()
+                    api.push_update(update)
+
+            completed = await loop.run_in_executor(None, api.wait_replies, chat_ids, 60)
+            wall = time.perf_counter() - started
+
+            round_latencies = [api.replies[chat_id] - sent[chat_id] for chat_id in chat_ids if chat_id in api.replies]
+            latencies.extend(round_latencies)
+            round_results.append({
+                'round': round_index + 1,
+                'completed': completed,
+                'wall_seconds': round(wall, 4),
+                'throughput_commands_per_sec': round(len(round_latencies) / wall, 2) if wall else 0,
+                'latency_p50': round(_percentile(round_latencies, 50), 4),
+                'latency_p99': round(_percentile(round_latencies, 99), 4),
+                'latency_max': round(max(round_latencies, default=0.0), 4)
+            })
+
+        executor.shutdown()
+        if mode == 'webhook':
+            stop_event.set()
+            await server_task
+        else:
+            await application.updater.stop()
+            await application.stop()
+            await application.shutdown()
+
+    api.shutdown()
+    api.server_close()
+
+    return {
+        'mode': mode,
+        'users': users,
+        'latency_p50': round(_percentile(latencies, 50), 4),
+        'latency_p90': round(_percentile(latencies, 90), 4),
+        'latency_p99': round(_percentile(latencies, 99), 4),
+        'latency_max': round(max(latencies, default=0.0), 4),
+        'rounds': round_results
+    }
+
+
+def main():
+    """Точка входа бенчмарка"""
+    parser = argparse.ArgumentParser(description='Бенчмарк задержки команд бота: вебхук и long polling')
+    parser.add_argument('--mode', choices=('webhook', 'polling', 'both'), default='both', help='Режим получения обновлений')
+    parser.add_argument('--users', type=int, default=100, help='Пользователей в одном залпе')
+    parser.add_argument('--rounds', type=int, default=3, help='Количество залпов')
+    parser.add_argument('--sites-per-user', type=int, default=10, help='Сайтов у каждого пользователя')
+    parser.add_argument('--updates', help='JSON файл с записанным обновлением Telegram (команда в message)')
+    parser.add_argument('--output', help='Файл для JSON результатов')
+    args = parser.parse_args()
+
+    template = DEFAULT_UPDATE
+    if args.updates:
+        with open(args.updates, 'r', encoding='utf-8') as f:
+            template = json.load(f)
+
+    modes = ('webhook', 'polling') if args.mode == 'both' else (args.mode,)
+    results = []
+    for mode in modes:
+        print(f"Бенчмарк режима {mode}...", file=sys.stderr)
+        results.append(asyncio.run(run_mode(mode, template, args.users, args.rounds, args.sites_per_user)))
+
+    report = {
+        'revision': _git_revision(),
+        'command': template['message'].get('text'),
+        'results': results
+    }
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
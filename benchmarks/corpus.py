@@ -0,0 +1,130 @@
+"""
+Корпус пар HTML страниц для микробенчмарков детекции изменений
+Каждая пара - "старая" и "новая" версия страницы с типичным видом изменений
+"""
+import random
+from typing import Dict, List
+
+# Виды изменений между версиями страницы
+CHANGE_KINDS = ('identical', 'small_edit', 'rotating_ads', 'timestamps', 'redesign')
+
+# Размеры страниц по умолчанию: от 1 КБ до 5 МБ
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000, 5_000_000)
+
+_WORDS = (
+    'цена', 'товар', 'доставка', 'новости', 'компания', 'клиент', 'сервис', 'заказ', 'склад',
+    'наличие', 'скидка', 'каталог', 'отзыв', 'гарантия', 'оплата', 'регион', 'магазин', 'акция',
+    'price', 'product', 'update', 'release', 'support', 'account', 'order', 'status', 'report'
+)
+
+
+def _sentence(rnd: random.Random) -> str:
+    """Генерирует предложение из словаря"""
+    words = [rnd.choice(_WORDS) for _ in range(rnd.randint(6, 14))]
+    words[0] = words[0].capitalize()
+    return ' '.join(words) + '.'
+
+
+def _paragraphs(rnd: random.Random, size: int) -> List[str]:
+    """Генерирует абзацы общим объемом примерно size байт"""
+    paragraphs = []
+    total = 0
+    while total < size:
+        paragraph = ' '.join(_sentence(rnd) for _ in range(rnd.randint(3, 6)))
+        paragraphs.append(paragraph)
+        total += len(paragraph.encode('utf-8')) + 20
+    return paragraphs
+
+
+def _render(paragraphs: List[str], ad: str, stamp: str, layout: str = 'article') -> str:
+    """Собирает HTML страницу из абзацев"""
+    body = ''.join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+    if layout == 'article':
+        main = f"<article><h1>Главная страница</h1><div class='ad'>{ad}</div>{body}</article>"
+    else:
+        main = (
+            f"<div class='grid'><section><h2>Обновленный раздел</h2>{body}</section>"
+            f"<div class='promo'>{ad}</div></div>"
+        )
+    return (
+        "<!DOCTYPE html><html><head><title>Тестовая страница</title>"
+        "<style>.ad { color: red; }</style><script>window.dataLayer = [];</script></head>"
+        "<body><header><a href='/'>Логотип</a></header><nav><a href='/a'>Раздел</a></nav>"
+        f"<main>{main}<p class='updated'>Обновлено: {stamp}</p></main>"
+        "<aside>Баннер</aside><footer>© Компания</footer></body></html>"
+    )
+
+
+def _stamp(rnd: random.Random) -> str:
+    """Случайная отметка времени"""
+    return f"{rnd.randint(1, 28):02d}.{rnd.randint(1, 12):02d}.2026 {rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}"
+
+
+def make_pair(kind: str, size: int, seed: int = 42) -> Dict[str, str]:
+    """
+    Формирует пару версий страницы с изменением заданного вида
+
+    Args:
+        kind (str): Вид изменения из CHANGE_KINDS
+        size (int): Примерный размер страницы в байтах
+        seed (int): Зерно генератора
+
+    Returns:
+        Dict[str, str]: Словарь с ключами kind, size, old, new
+    """
+    rnd = random.Random(f"{seed}:{kind}:{size}")
+    paragraphs = _paragraphs(rnd, size)
+    ad = f"Реклама: {_sentence(rnd)}"
+    stamp = _stamp(rnd)
+    old = _render(paragraphs, ad, stamp)
+
+    if kind == 'identical':
+        new = old
+    elif kind == 'small_edit':
+        # Правка нескольких слов в одном абзаце
+        edited = list(paragraphs)
+        index = rnd.randrange(len(edited))
+        words = edited[index].split()
+        for _ in range(min(3, len(words))):
+            words[rnd.randrange(len(words))] = rnd.choice(_WORDS)
+        edited[index] = ' '.join(words)
+        new = _render(edited, ad, stamp)
+    elif kind == 'rotating_ads':
+        new = _render(paragraphs, f"Реклама: {_sentence(rnd)}", stamp)
+    elif kind == 'timestamps':
+        # Отметки времени в подвале и в каждом десятом абзаце
+        stamped = [
+            f"{paragraph} Опубликовано {_stamp(rnd)}" if i % 10 == 0 else paragraph
+            for i, paragraph in enumerate(paragraphs)
+        ]
+        old = _render([
+            f"{paragraph} Опубликовано {_stamp(random.Random(i))}" if i % 10 == 0 else paragraph
+            for i, paragraph in enumerate(paragraphs)
+        ], ad, stamp)
+        new = _render(stamped, ad, _stamp(rnd))
+    elif kind == 'redesign':
+        # Новая верстка, половина текста переписана
+        rewritten = [
+            paragraph if i % 2 else ' '.join(_sentence(rnd) for _ in range(4))
+            for i, paragraph in enumerate(paragraphs)
+        ]
+        new = _render(rewritten, ad, stamp, layout='grid')
+    else:
+        raise ValueError(f"Неизвестный вид изменения: {kind}")
+
+    return {'kind': kind, 'size': size, 'old': old, 'new': new}
+
+
+def build_corpus(kinds=CHANGE_KINDS, sizes=DEFAULT_SIZES, seed: int = 42) -> List[Dict[str, str]]:
+    """
+    Формирует корпус пар страниц для всех видов изменений и размеров
+
+    Args:
+        kinds: Виды изменений
+        sizes: Размеры страниц в байтах
+        seed (int): Зерно генератора
+
+    Returns:
+        List[Dict[str, str]]: Пары страниц
+    """
+    return [make_pair(kind, size, seed) for size in sizes for kind in kinds]
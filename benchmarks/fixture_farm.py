@@ -0,0 +1,208 @@
+"""
+Локальная ферма тестовых сайтов для бенчмарков
+Отдает тысячи синтетических страниц с управляемыми задержкой, размером,
+частотой изменений и частотой ошибок
+"""
+import random
+import socket
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+# Слоги для генерации правдоподобных слов
+_SYLLABLES = ('ка', 'ро', 'ми', 'на', 'те', 'ло', 'ва', 'си', 'по', 'ре', 'ку', 'да',
+              'ban', 'tor', 'lin', 'mer', 'sta', 'pro', 'vel', 'dat')
+
+
+def _words(rnd: random.Random, count: int) -> str:
+    """Генерирует строку из псевдослов"""
+    return ' '.join(
+        ''.join(rnd.choice(_SYLLABLES) for _ in range(rnd.randint(1, 4)))
+        for _ in range(count)
+    )
+
+
+def generate_page(page_id: int, version: int, size: int, seed: int = 42) -> bytes:
+    """
+    Генерирует HTML страницу заданного размера
+
+    Основной текст зависит только от page_id, а примерно пятая часть абзацев
+    меняется с каждой версией страницы - так изменение выглядит значительным
+
+    Args:
+        page_id (int): Номер страницы
+        version (int): Версия контента страницы
+        size (int): Примерный размер страницы в байтах
+        seed (int): Зерно генератора
+
+    Returns:
+        bytes: HTML страницы в UTF-8
+    """
+    rnd = random.Random(f"{seed}:{page_id}")
+    versioned = random.Random(f"{seed}:{page_id}:{version}")
+
+    head = (
+        f"<!DOCTYPE html><html><head><title>Страница {page_id}</title>"
+        f"<style>body {{ font-family: sans-serif; }}</style>"
+        f"<script>var pageId = {page_id}; var build = {version};</script></head><body>"
+        f"<header><a href='/'>Главная</a> <a href='/news'>Новости</a></header>"
+        f"<nav><ul><li>Раздел 1</li><li>Раздел 2</li><li>Раздел 3</li></ul></nav><main>"
+    )
+    tail = "</main><aside>Реклама</aside><footer>© Ферма тестовых сайтов</footer></body></html>"
+
+    paragraphs = []
+    length = len(head.encode('utf-8')) + len(tail.encode('utf-8'))
+    index = 0
+    while length < size:
+        source = versioned if index % 5 == 0 else rnd
+        paragraph = f"<h2>{_words(source, 3)}</h2><p>{_words(source, rnd.randint(30, 80))}</p>"
+        paragraphs.append(paragraph)
+        length += len(paragraph.encode('utf-8'))
+        index += 1
+
+    return (head + ''.join(paragraphs) + tail).encode('utf-8')
+
+
+class FixtureFarm:
+    """
+    HTTP сервер с синтетическими сайтами по адресам /site/<номер>
+
+    Каждый вызов advance() (или GET /__advance) начинает новое "поколение": часть
+    страниц меняет контент (change_rate), часть отвечает ошибкой (error_rate).
+    Решения детерминированы по seed, поэтому прогоны воспроизводимы.
+    """
+
+    def __init__(self, latency: float = 0.0, latency_jitter: float = 0.0, size: int = 20_000,
+                 change_rate: float = 0.1, error_rate: float = 0.0, seed: int = 42,
+                 host: str = '127.0.0.1', port: int = 0):
+        """
+        Инициализация фермы
+
+        Args:
+            latency (float): Задержка ответа в секундах
+            latency_jitter (float): Случайная добавка к задержке в секундах (0..jitter)
+            size (int): Примерный размер страницы в байтах
+            change_rate (float): Доля страниц, меняющих контент в каждом поколении
+            error_rate (float): Доля запросов, на которые отвечаем HTTP 500
+            seed (int): Зерно генератора
+            host (str): Адрес сервера
+            port (int): Порт сервера (0 - любой свободный)
+        """
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.size = size
+        self.change_rate = change_rate
+        self.error_rate = error_rate
+        self.seed = seed
+        self.generation = 0
+        self.requests_served = 0
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+        # Кеш страниц: генерация дороже отдачи
+        self._page = lru_cache(maxsize=4096)(self._render_page)
+
+    @property
+    def base_url(self) -> str:
+        """Базовый URL фермы"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url_for(self, page_id: int) -> str:
+        """
+        Возвращает URL синтетического сайта
+
+        Args:
+            page_id (int): Номер страницы
+
+        Returns:
+            str: URL страницы
+        """
+        return f"{self.base_url}/site/{page_id}"
+
+    def start(self) -> 'FixtureFarm':
+        """Запускает сервер в фоновом потоке"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Останавливает сервер"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def advance(self):
+        """Переходит к следующему поколению страниц"""
+        self.generation += 1
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _roll(self, kind: str, page_id: int, generation: int) -> float:
+        """Детерминированное случайное число в [0, 1) для решения о странице"""
+        return random.Random(f"{self.seed}:{kind}:{page_id}:{generation}").random()
+
+    def _version(self, page_id: int, generation: int) -> int:
+        """Номер версии контента страницы в заданном поколении"""
+        return sum(1 for g in range(1, generation + 1) if self._roll('change', page_id, g) < self.change_rate)
+
+    def _render_page(self, page_id: int, version: int) -> bytes:
+        return generate_page(page_id, version, self.size, self.seed)
+
+    def _make_handler(self):
+        farm = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                # Заголовки и тело пишутся отдельно - без TCP_NODELAY Nagle добавляет ~40 мс к ответу
+                self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+            def do_GET(self):
+                parts = self.path.strip('/').split('/')
+                if parts == ['__advance']:
+                    # Управляющий адрес: бенчмарк в другом процессе переключает поколение
+                    farm.advance()
+                    self._reply(200, str(farm.generation).encode())
+                    return
+                if len(parts) != 2 or parts[0] != 'site' or not parts[1].isdigit():
+                    self._reply(404, b'not found')
+                    return
+
+                page_id = int(parts[1])
+                generation = farm.generation
+
+                delay = farm.latency + (random.random() * farm.latency_jitter if farm.latency_jitter else 0)
+                if delay > 0:
+                    time.sleep(delay)
+
+                if farm._roll('error', page_id, generation) < farm.error_rate:
+                    self._reply(500, b'synthetic error')
+                    return
+
+                self._reply(200, farm._page(page_id, farm._version(page_id, generation)))
+
+            def _reply(self, status: int, body: bytes):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with farm._lock:
+                    farm.requests_served += 1
+                    farm.bytes_served += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
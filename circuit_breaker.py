@@ -0,0 +1,176 @@
+"""
+Модуль автомата отключения хостов (circuit breaker)
+Приостанавливает загрузку страниц с хостов, которые подряд не отвечают,
+и проверяет их восстановление дешевыми пробными запросами
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from urllib.parse import urlsplit
+import config
+
+# Состояния автомата для хоста
+CLOSED = 'closed'  # Обычная проверка
+OPEN = 'open'  # Загрузки приостановлены до времени следующей пробы
+HALF_OPEN = 'half_open'  # Время пробы наступило
+
+
+class HostCircuitBreaker:
+    """
+    Автомат отключения хостов
+    Хранит число последовательных сбоев и расписание проб для каждого хоста в JSON файле
+    """
+
+    def __init__(self, state_file: str = None, failure_threshold: int = None,
+                 probe_delay: float = None, probe_max_delay: float = None):
+        """
+        Инициализация автомата
+
+        Args:
+            state_file (str): Путь к файлу состояния
+            failure_threshold (int): Число сбоев подряд, после которого хост отключается
+            probe_delay (float): Задержка перед первой пробой в секундах (удваивается после каждой неудачной)
+            probe_max_delay (float): Максимальная задержка между пробами в секундах
+        """
+        self.state_file = state_file or config.CIRCUIT_STATE_FILE
+        self.failure_threshold = config.CIRCUIT_FAILURE_THRESHOLD if failure_threshold is None else failure_threshold
+        self.probe_delay = config.CIRCUIT_PROBE_DELAY if probe_delay is None else probe_delay
+        self.probe_max_delay = config.CIRCUIT_PROBE_MAX_DELAY if probe_max_delay is None else probe_max_delay
+        self.hosts = self._load_state()
+        self._lock = threading.Lock()
+
+    def _load_state(self) -> dict:
+        """
+        Загружает состояние из файла
+
+        Returns:
+            dict: Состояние по хостам
+        """
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {}
+
+    def save(self):
+        """Сохраняет состояние в файл"""
+        state_dir = os.path.dirname(self.state_file)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        with self._lock:
+            hosts = {host: dict(entry) for host, entry in self.hosts.items()}
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(hosts, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def host_key(url: str) -> str:
+        """
+        Ключ хоста для URL
+
+        Args:
+            url (str): URL сайта
+
+        Returns:
+            str: Хост с портом в нижнем регистре
+        """
+        return urlsplit(url).netloc.lower()
+
+    @property
+    def enabled(self) -> bool:
+        """Автомат включен (порог сбоев больше нуля)"""
+        return self.failure_threshold > 0
+
+    def state(self, host: str, now: datetime = None) -> str:
+        """
+        Определяет состояние автомата для хоста
+
+        Args:
+            host (str): Ключ хоста
+            now (datetime): Текущее время
+
+        Returns:
+            str: CLOSED, OPEN или HALF_OPEN
+        """
+        entry = self.hosts.get(host)
+        if not entry or not entry.get('next_probe_at'):
+            return CLOSED
+
+        now = now or datetime.now()
+        return HALF_OPEN if now >= datetime.fromisoformat(entry['next_probe_at']) else OPEN
+
+    def next_probe_at(self, host: str) -> Optional[datetime]:
+        """
+        Время следующей пробы отключенного хоста
+
+        Args:
+            host (str): Ключ хоста
+
+        Returns:
+            Optional[datetime]: Время пробы или None если хост не отключен
+        """
+        entry = self.hosts.get(host)
+        if not entry or not entry.get('next_probe_at'):
+            return None
+        return datetime.fromisoformat(entry['next_probe_at'])
+
+    def open_hosts(self) -> int:
+        """
+        Количество отключенных хостов
+
+        Returns:
+            int: Число хостов с запланированной пробой
+        """
+        with self._lock:
+            return sum(1 for entry in self.hosts.values() if entry.get('next_probe_at'))
+
+    def record_success(self, host: str):
+        """
+        Отмечает успешный ответ хоста и возвращает его к обычной проверке
+
+        Args:
+            host (str): Ключ хоста
+        """
+        with self._lock:
+            self.hosts.pop(host, None)
+
+    def record_failure(self, host: str, now: datetime = None):
+        """
+        Отмечает сбой хоста: считает сбои подряд и при достижении порога отключает хост
+
+        Args:
+            host (str): Ключ хоста
+            now (datetime): Текущее время
+        """
+        if not self.enabled:
+            return
+
+        now = now or datetime.now()
+        with self._lock:
+            entry = self.hosts.setdefault(host, {'failures': 0, 'probes': 0})
+            entry['failures'] += 1
+
+            if entry.get('next_probe_at'):
+                # Неудачная проба - откладываем следующую с экспоненциальной задержкой
+                entry['probes'] += 1
+            elif entry['failures'] < self.failure_threshold:
+                return
+            else:
+                entry['opened_at'] = now.isoformat()
+
+            delay = min(self.probe_max_delay, self.probe_delay * 2 ** entry['probes'])
+            entry['next_probe_at'] = (now + timedelta(seconds=delay)).isoformat()
+
+    def prune(self, urls: Iterable[str]):
+        """
+        Удаляет состояние хостов, которых больше нет среди проверяемых сайтов
+
+        Args:
+            urls (Iterable[str]): URL проверяемых сайтов
+        """
+        hosts = {self.host_key(url) for url in urls}
+        with self._lock:
+            for host in list(self.hosts):
+                if host not in hosts:
+                    del self.hosts[host]
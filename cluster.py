@@ -0,0 +1,608 @@
+"""
+Модуль распределенной проверки сайтов (координатор и воркеры)
+Координатор раскладывает группы сайтов по воркерам консистентным хешированием,
+воркеры в отдельных процессах (на одном или нескольких хостах) забирают задания
+из общей очереди SQLite, проверяют сайты и возвращают результаты.
+База сайтов и Telegram остаются только за координатором
+
+Запуск воркера: python cluster.py
+"""
+import bisect
+import hashlib
+import json
+import logging
+import os
+import re
+import signal
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import config
+import metrics
+from circuit_breaker import HostCircuitBreaker
+from database import SitesDatabase
+from fair_queue import FairQueue
+from redirect_cache import RedirectCache
+from site_monitor import SiteMonitor
+
+# Состояния заданий в очереди
+PENDING = 'pending'  # Ждет своего воркера
+TAKEN = 'taken'  # Проверяется воркером
+DONE = 'done'  # Результат ждет координатора
+
+
+class HashRing:
+    """
+    Кольцо консистентного хеширования
+    При появлении или выбытии воркера переезжает только часть ключей
+    """
+
+    def __init__(self, nodes: Iterable[str], replicas: int = 100):
+        """
+        Строит кольцо
+
+        Args:
+            nodes (Iterable[str]): Идентификаторы воркеров
+            replicas (int): Число виртуальных точек каждого воркера на кольце
+        """
+        self.nodes = sorted(set(nodes))
+        self._ring = sorted(
+            (self._hash(f"{node}#{replica}"), node) for node in self.nodes for replica in range(replicas)
+        )
+        self._points = [point for point, _ in self._ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        """Положение значения на кольце"""
+        return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+    def node_for(self, key: str) -> Optional[str]:
+        """
+        Определяет воркера для ключа
+
+        Args:
+            key (str): Ключ группы сайтов
+
+        Returns:
+            Optional[str]: Идентификатор воркера или None если воркеров нет
+        """
+        if not self._ring:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._ring)
+        return self._ring[index][1]
+
+
+class WorkQueue:
+    """
+    Общая очередь заданий в файле SQLite
+    Хранит живых воркеров (время последнего сигнала) и задания прогонов с результатами
+    """
+
+    def __init__(self, db_file: str = None):
+        """
+        Инициализация очереди
+
+        Args:
+            db_file (str): Путь к файлу очереди
+        """
+        self.db_file = db_file or config.CLUSTER_QUEUE_FILE
+        queue_dir = os.path.dirname(self.db_file)
+        if queue_dir:
+            os.makedirs(queue_dir, exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS workers (worker_id TEXT PRIMARY KEY, heartbeat REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, run_id TEXT NOT NULL, shard_key TEXT NOT NULL, "
+                "worker_id TEXT, state TEXT NOT NULL, payload TEXT NOT NULL, result TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_worker ON tasks (worker_id, state)")
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_run ON tasks (run_id, state)")
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        Открывает соединение с очередью (отдельное на каждую операцию, как и запись JSON файлов)
+
+        Returns:
+            sqlite3.Connection: Соединение, которое фиксирует транзакцию при выходе из with
+        """
+        return _ClosingConnection(sqlite3.connect(self.db_file, timeout=30))
+
+    def heartbeat(self, worker_id: str):
+        """
+        Отмечает, что воркер жив (первый сигнал регистрирует воркера)
+
+        Args:
+            worker_id (str): Идентификатор воркера
+        """
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, heartbeat) VALUES (?, ?)", (worker_id, time.time())
+            )
+
+    def leave(self, worker_id: str):
+        """
+        Снимает воркера с учета и возвращает его незавершенные задания в очередь
+
+        Args:
+            worker_id (str): Идентификатор воркера
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+            conn.execute(
+                "UPDATE tasks SET state = ? WHERE worker_id = ? AND state = ?", (PENDING, worker_id, TAKEN)
+            )
+
+    def live_workers(self, timeout: float) -> List[str]:
+        """
+        Возвращает воркеров, подававших сигнал не позднее timeout секунд назад,
+        и удаляет записи выбывших
+
+        Args:
+            timeout (float): Допустимое время без сигнала в секундах
+
+        Returns:
+            List[str]: Идентификаторы живых воркеров
+        """
+        cutoff = time.time() - timeout
+        with self._connect() as conn:
+            conn.execute("DELETE FROM workers WHERE heartbeat < ?", (cutoff,))
+            rows = conn.execute("SELECT worker_id FROM workers ORDER BY worker_id").fetchall()
+        return [worker_id for worker_id, in rows]
+
+    def enqueue(self, run_id: str, tasks: Iterable[Tuple[str, str, List[Dict]]]):
+        """
+        Добавляет задания прогона
+
+        Args:
+            run_id (str): Идентификатор прогона
+            tasks (Iterable[Tuple[str, str, List[Dict]]]): Тройки (ключ группы, воркер, сайты группы)
+        """
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO tasks (run_id, shard_key, worker_id, state, payload) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (run_id, shard_key, worker_id, PENDING, json.dumps(sites, ensure_ascii=False))
+                    for shard_key, worker_id, sites in tasks
+                )
+            )
+
+    def claim(self, worker_id: str, limit: int) -> List[Tuple[int, List[Dict]]]:
+        """
+        Забирает задания, назначенные воркеру
+
+        Args:
+            worker_id (str): Идентификатор воркера
+            limit (int): Максимум заданий
+
+        Returns:
+            List[Tuple[int, List[Dict]]]: Пары (ID задания, сайты группы)
+        """
+        with self._connect() as conn:
+            # Блокируем запись сразу, чтобы координатор не переназначил задания между чтением и отметкой
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, payload FROM tasks WHERE worker_id = ? AND state = ? ORDER BY id LIMIT ?",
+                (worker_id, PENDING, limit)
+            ).fetchall()
+            conn.executemany("UPDATE tasks SET state = ? WHERE id = ?", ((TAKEN, task_id) for task_id, _ in rows))
+        return [(task_id, json.loads(payload)) for task_id, payload in rows]
+
+    def complete(self, task_id: int, worker_id: str, result: Dict) -> bool:
+        """
+        Сохраняет результат задания
+
+        Args:
+            task_id (int): ID задания
+            worker_id (str): Идентификатор воркера
+            result (Dict): Результаты проверки сайтов группы
+
+        Returns:
+            bool: False если задание тем временем передано другому воркеру и результат отброшен
+        """
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE tasks SET state = ?, result = ? WHERE id = ? AND worker_id = ? AND state = ?",
+                (DONE, json.dumps(result, ensure_ascii=False), task_id, worker_id, TAKEN)
+            )
+        return cursor.rowcount == 1
+
+    def collect(self, run_id: str) -> List[Dict]:
+        """
+        Забирает и удаляет готовые результаты прогона
+
+        Args:
+            run_id (str): Идентификатор прогона
+
+        Returns:
+            List[Dict]: Результаты заданий
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, result FROM tasks WHERE run_id = ? AND state = ?", (run_id, DONE)
+            ).fetchall()
+            conn.executemany("DELETE FROM tasks WHERE id = ?", ((task_id,) for task_id, _ in rows))
+        return [json.loads(result) for _, result in rows]
+
+    def rebalance(self, run_id: str, ring: HashRing) -> int:
+        """
+        Переназначает задания прогона по новому составу воркеров: ожидающие задания
+        расходятся по кольцу (в том числе на новых воркеров), а задания выбывших
+        воркеров возвращаются в очередь
+
+        Args:
+            run_id (str): Идентификатор прогона
+            ring (HashRing): Кольцо живых воркеров
+
+        Returns:
+            int: Количество переназначенных заданий
+        """
+        live = set(ring.nodes)
+        moved = []
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, shard_key, worker_id, state FROM tasks WHERE run_id = ? AND state != ?", (run_id, DONE)
+            ).fetchall()
+            for task_id, shard_key, worker_id, state in rows:
+                if state == TAKEN and worker_id in live:
+                    continue
+                node = ring.node_for(shard_key)
+                if node != worker_id or state == TAKEN:
+                    moved.append((node, PENDING, task_id))
+            conn.executemany("UPDATE tasks SET worker_id = ?, state = ? WHERE id = ?", moved)
+        return len(moved)
+
+    def release(self, run_id: str) -> List[List[Dict]]:
+        """
+        Снимает с воркеров незавершенные задания прогона
+
+        Args:
+            run_id (str): Идентификатор прогона
+
+        Returns:
+            List[List[Dict]]: Сайты снятых заданий по группам
+        """
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT id, payload FROM tasks WHERE run_id = ? AND state != ?", (run_id, DONE)
+            ).fetchall()
+            conn.executemany("DELETE FROM tasks WHERE id = ?", ((task_id,) for task_id, _ in rows))
+        return [json.loads(payload) for _, payload in rows]
+
+    def purge(self, run_id: str):
+        """
+        Удаляет все задания прогона
+
+        Args:
+            run_id (str): Идентификатор прогона
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM tasks WHERE run_id = ?", (run_id,))
+
+
+class _ClosingConnection:
+    """Соединение SQLite, которое при выходе из with фиксирует (или откатывает) транзакцию и закрывается"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+        finally:
+            self.conn.close()
+        return False
+
+
+class DeferredStatusWrites:
+    """
+    Записи статусов сайтов, которые воркер передает координатору вместо записи в базу
+    (JSON файл базы нельзя безопасно менять из нескольких процессов)
+    """
+
+    def __init__(self):
+        """Инициализация пустого набора записей"""
+        self.writes = {}
+
+    def update_site_status(self, site_id: int, *args, **kwargs):
+        """
+        Запоминает обновление статуса сайта с аргументами SitesDatabase.update_site_status
+
+        Args:
+            site_id (int): ID сайта
+        """
+        self.writes[site_id] = {'args': list(args), 'kwargs': kwargs}
+
+
+class ClusterCoordinator:
+    """
+    Координатор распределенной проверки
+    Раздает группы сайтов воркерам, применяет их результаты к базе и доделывает
+    прогон сам, если воркеров нет или они не уложились в CLUSTER_RUN_TIMEOUT
+    """
+
+    def __init__(self, database: SitesDatabase, monitor: SiteMonitor, queue: WorkQueue = None):
+        """
+        Инициализация координатора
+
+        Args:
+            database (SitesDatabase): База данных сайтов
+            monitor (SiteMonitor): Монитор для проверки без воркеров
+            queue (WorkQueue): Очередь заданий
+        """
+        self.database = database
+        self.monitor = monitor
+        self.queue = queue or WorkQueue()
+        self.logger = logging.getLogger(__name__)
+
+    def check_all_sites(self, site_filter: Callable[[Dict], bool] = None,
+                        on_result: Callable[[str, Dict], None] = None) -> Dict[str, list]:
+        """
+        Проверяет все активные сайты силами воркеров
+
+        Сайты с одинаковым нормализованным URL образуют одну группу и попадают
+        к одному воркеру, поэтому страница по-прежнему загружается один раз
+
+        Args:
+            site_filter (Callable[[Dict], bool]): Какие сайты проверять
+            on_result (Callable[[str, Dict], None]): Вызывается с категорией и результатом каждого сайта
+
+        Returns:
+            Dict[str, list]: Результаты проверки по категориям
+        """
+        workers = self.queue.live_workers(config.WORKER_HEARTBEAT_TIMEOUT)
+        metrics.CLUSTER_WORKERS.set(len(workers))
+        if not workers:
+            self.logger.warning("Нет активных воркеров, проверяю сайты в процессе координатора")
+            return self.monitor.check_all_sites(site_filter, on_result)
+
+        active_sites = self.database.get_active_sites()
+        if site_filter:
+            active_sites = [site for site in active_sites if site_filter(site)]
+        groups = {}
+        for site in active_sites:
+            groups.setdefault(self.monitor.fetch_key(site['url']), []).append(site)
+        sites_by_id = {site['id']: site for site in active_sites}
+
+        results = {
+            'ok': [],
+            'error': [],
+            'changed': [],
+            'slow': []
+        }
+
+        # Воркеры забирают задания по порядку постановки, поэтому группы ставятся
+        # в порядке справедливой очереди - вперемешку по пользователям с учетом весов
+        fair_order = FairQueue(config.USER_WEIGHTS)
+        for key, subscribers in groups.items():
+            fair_order.add((site.get('user_id') for site in subscribers), (key, subscribers))
+
+        run_id = uuid.uuid4().hex
+        ring = HashRing(workers)
+        self.queue.enqueue(run_id, (
+            (key, ring.node_for(key), subscribers)
+            for key, subscribers in (fair_order.pop()[0] for _ in range(len(groups)))
+        ))
+        self.logger.info(f"Прогон {run_id}: {len(groups)} групп сайтов для {len(workers)} воркеров")
+
+        remaining = len(groups)
+        deadline = time.monotonic() + config.CLUSTER_RUN_TIMEOUT
+        try:
+            while remaining:
+                remaining -= self._apply_reports(self.queue.collect(run_id), sites_by_id, results, on_result)
+                if not remaining:
+                    break
+
+                if self.monitor.stop_event.is_set():
+                    # Остановка: неполученные результаты достанутся следующему прогону
+                    self.logger.info(f"Прогон {run_id} остановлен, не получено групп: {remaining}")
+                    break
+
+                workers = self.queue.live_workers(config.WORKER_HEARTBEAT_TIMEOUT)
+                metrics.CLUSTER_WORKERS.set(len(workers))
+
+                if not workers or time.monotonic() > deadline:
+                    leftovers = self.queue.release(run_id)
+                    # Задания, завершенные до снятия, забираем как обычно
+                    remaining -= self._apply_reports(self.queue.collect(run_id), sites_by_id, results, on_result)
+                    self.logger.warning(f"Прогон {run_id}: доделываю {len(leftovers)} групп сайтов без воркеров")
+                    local_results = self.monitor.check_sites(
+                        [site for group in leftovers for site in group], on_result=on_result
+                    )
+                    for status, items in local_results.items():
+                        results[status].extend(items)
+                    break
+
+                if set(workers) != set(ring.nodes):
+                    ring = HashRing(workers)
+                    moved = self.queue.rebalance(run_id, ring)
+                    metrics.CLUSTER_TASKS_REBALANCED_TOTAL.inc(moved)
+                    self.logger.info(f"Прогон {run_id}: состав воркеров изменился ({len(workers)}), переназначено {moved} групп")
+
+                self.monitor.stop_event.wait(config.CLUSTER_POLL_SECONDS)
+        finally:
+            self.queue.purge(run_id)
+
+        return results
+
+    def _apply_reports(self, reports: List[Dict], sites_by_id: Dict[int, Dict], results: Dict[str, list],
+                       on_result: Callable[[str, Dict], None] = None) -> int:
+        """
+        Записывает в базу статусы из результатов воркеров и добавляет их к результатам прогона
+
+        Args:
+            reports (List[Dict]): Результаты заданий
+            sites_by_id (Dict[int, Dict]): Сайты прогона по ID
+            results (Dict[str, list]): Результаты прогона по категориям (дополняются)
+            on_result (Callable[[str, Dict], None]): Обработчик результата каждого сайта
+
+        Returns:
+            int: Количество обработанных заданий
+        """
+        for report in reports:
+            for item in report['results']:
+                site = sites_by_id.get(item['site_id'])
+                if site is None:
+                    continue
+
+                write = report['writes'].get(str(item['site_id']))
+                if write:
+                    self.database.update_site_status(item['site_id'], *write['args'], **write['kwargs'])
+
+                entry = {
+                    'site': site,
+                    'message': item['message'],
+                    'content_hash': item['content_hash'],
+                    'timings': item['timings'],
+                    'retries': item['retries']
+                }
+                results[item['status']].append(entry)
+                if on_result:
+                    on_result(item['status'], entry)
+        return len(reports)
+
+
+class ClusterWorker:
+    """
+    Воркер распределенной проверки
+    Подает сигнал о себе, забирает назначенные ему группы сайтов и возвращает результаты
+    """
+
+    def __init__(self, worker_id: str = None, queue: WorkQueue = None):
+        """
+        Инициализация воркера
+
+        Args:
+            worker_id (str): Идентификатор воркера (по умолчанию WORKER_ID или хост и PID)
+            queue (WorkQueue): Очередь заданий
+        """
+        self.worker_id = worker_id or config.WORKER_ID or f"{socket.gethostname()}-{os.getpid()}"
+        self.queue = queue or WorkQueue()
+        self.writes = DeferredStatusWrites()
+        self.monitor = SiteMonitor(self.writes)
+
+        # Состояние отключенных хостов у каждого воркера в своем файле
+        root, ext = os.path.splitext(config.CIRCUIT_STATE_FILE)
+        suffix = re.sub(r'[^\w.-]', '_', self.worker_id)
+        self.monitor.circuit_breaker = HostCircuitBreaker(state_file=f"{root}_{suffix}{ext}")
+
+        # Кеш постоянных редиректов - тоже свой у каждого воркера
+        root, ext = os.path.splitext(config.REDIRECT_CACHE_FILE)
+        self.monitor.redirects = self.monitor.fetcher.redirects = RedirectCache(state_file=f"{root}_{suffix}{ext}")
+
+        self.running = False
+        self._stopped = threading.Event()
+        self.logger = logging.getLogger(__name__)
+
+    def run(self):
+        """Обрабатывает задания, пока воркер не остановлен"""
+        self.running = True
+        self._stopped.clear()
+        self.queue.heartbeat(self.worker_id)
+        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        heartbeat_thread.start()
+        self.logger.info(f"Воркер {self.worker_id} запущен, очередь: {self.queue.db_file}")
+
+        try:
+            while self.running:
+                if not self.run_once():
+                    self._stopped.wait(config.CLUSTER_POLL_SECONDS)
+        finally:
+            self._stopped.set()
+            heartbeat_thread.join()
+            self.queue.leave(self.worker_id)
+            self.logger.info(f"Воркер {self.worker_id} остановлен")
+
+    def stop(self):
+        """Останавливает воркер после текущей пачки заданий"""
+        self.running = False
+        self._stopped.set()
+
+    def _heartbeat_loop(self):
+        """Подает сигнал о себе, пока воркер работает (в том числе во время долгой проверки)"""
+        while not self._stopped.wait(config.WORKER_HEARTBEAT_TIMEOUT / 3):
+            try:
+                self.queue.heartbeat(self.worker_id)
+            except sqlite3.Error as e:
+                self.logger.error(f"Не удалось отправить сигнал воркера: {str(e)}")
+
+    def run_once(self) -> int:
+        """
+        Проверяет одну пачку назначенных заданий
+
+        Returns:
+            int: Количество обработанных заданий
+        """
+        tasks = self.queue.claim(self.worker_id, config.WORKER_BATCH_SIZE)
+        if not tasks:
+            return 0
+
+        task_by_site = {}
+        sites = []
+        for task_id, group in tasks:
+            for site in group:
+                task_by_site[site['id']] = task_id
+                sites.append(site)
+
+        self.writes.writes.clear()
+        results = self.monitor.check_sites(sites)
+
+        reports = {task_id: {'results': [], 'writes': {}} for task_id, _ in tasks}
+        for status, items in results.items():
+            for item in items:
+                site_id = item['site']['id']
+                report = reports[task_by_site[site_id]]
+                report['results'].append({
+                    'site_id': site_id,
+                    'status': status,
+                    'message': item['message'],
+                    'content_hash': item['content_hash'],
+                    'timings': item['timings'],
+                    'retries': item['retries']
+                })
+                report['writes'][str(site_id)] = self.writes.writes.get(site_id)
+
+        for task_id, report in reports.items():
+            if not self.queue.complete(task_id, self.worker_id, report):
+                self.logger.warning(f"Задание {task_id} передано другому воркеру, результат отброшен")
+
+        return len(tasks)
+
+
+def main():
+    """Запускает воркер распределенной проверки"""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+
+    worker = ClusterWorker()
+
+    def stop_worker(signum, frame):
+        worker.logger.info(f"Получен сигнал {signum}, завершаю работу воркера...")
+        worker.stop()
+
+    signal.signal(signal.SIGINT, stop_worker)
+    signal.signal(signal.SIGTERM, stop_worker)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -9,25 +9,95 @@ load_dotenv()
 
 # Настройки Telegram бота
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org/bot')  # Адрес Bot API (для собственного сервера Bot API)
+
+# Режим вебхука (без WEBHOOK_URL бот получает обновления через long polling)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # Публичный HTTPS адрес вебхука, например https://example.com/telegram
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')  # Адрес, на котором слушает сервер вебхука
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))  # Порт сервера вебхука
+WEBHOOK_SECRET_TOKEN = os.getenv('WEBHOOK_SECRET_TOKEN', '')  # Секрет запросов Telegram (по умолчанию генерируется при запуске)
+WEBHOOK_CERT_FILE = os.getenv('WEBHOOK_CERT_FILE', '')  # Сертификат для HTTPS (без него сервер принимает HTTP за обратным прокси)
+WEBHOOK_KEY_FILE = os.getenv('WEBHOOK_KEY_FILE', '')  # Закрытый ключ сертификата
 
 # Настройки мониторинга
 CHECK_INTERVAL_HOURS = int(os.getenv('CHECK_INTERVAL_HOURS', 6))  # Интервал проверки в часах
+AVAILABILITY_CHECK_INTERVAL_MINUTES = float(os.getenv('AVAILABILITY_CHECK_INTERVAL_MINUTES', 0))  # Интервал отдельной проверки сайтов в режиме availability в минутах (0 - только вместе с основной)
 REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', 10))  # Таймаут HTTP запроса в секундах
 MAX_RETRIES = int(os.getenv('MAX_RETRIES', 3))  # Максимальное количество попыток при ошибке
+RETRY_BACKOFF_BASE = float(os.getenv('RETRY_BACKOFF_BASE', 2))  # Задержка перед первым повтором в секундах (удваивается с каждой попыткой)
+RETRY_BACKOFF_MAX = float(os.getenv('RETRY_BACKOFF_MAX', 60))  # Максимальная задержка перед повтором в секундах
+RETRY_BUDGET_RATIO = float(os.getenv('RETRY_BUDGET_RATIO', 0.1))  # Бюджет повторов на прогон: доля от числа уникальных URL (не меньше MAX_RETRIES)
+
+# Настройки отключения недоступных хостов (circuit breaker)
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 3))  # Сбоев подряд до отключения хоста (0 - не отключать)
+CIRCUIT_PROBE_DELAY = float(os.getenv('CIRCUIT_PROBE_DELAY', 1800))  # Задержка перед первой пробой отключенного хоста в секундах
+CIRCUIT_PROBE_MAX_DELAY = float(os.getenv('CIRCUIT_PROBE_MAX_DELAY', 24 * 3600))  # Максимальная задержка между пробами в секундах
+CIRCUIT_PROBE_TIMEOUT = float(os.getenv('CIRCUIT_PROBE_TIMEOUT', 3))  # Таймаут пробного запроса в секундах
+CIRCUIT_STATE_FILE = os.getenv('CIRCUIT_STATE_FILE', 'host_data/circuit_state.json')  # Файл состояния отключенных хостов
+REDIRECT_CACHE_TTL_HOURS = float(os.getenv('REDIRECT_CACHE_TTL_HOURS', 24))  # Сколько часов загружать конечный URL постоянного редиректа (301, 308) без проверки цепочки (0 - не кешировать)
+REDIRECT_CACHE_FILE = os.getenv('REDIRECT_CACHE_FILE', 'host_data/redirect_cache.json')  # Файл кеша постоянных редиректов
+CHECK_PAUSE_SECONDS = float(os.getenv('CHECK_PAUSE_SECONDS', 1))  # Пауза между запросами к сайтам в секундах
+CHECK_RUN_CONCURRENCY = int(os.getenv('CHECK_RUN_CONCURRENCY', 1))  # Сколько плановых прогонов проверки выполняется одновременно
+MANUAL_CHECK_CONCURRENCY = int(os.getenv('MANUAL_CHECK_CONCURRENCY', 1))  # Сколько проверок /check выполняется одновременно (не ждут планового прогона)
+SHUTDOWN_DRAIN_SECONDS = float(os.getenv('SHUTDOWN_DRAIN_SECONDS', 20))  # Сколько ждать остановки текущего прогона при завершении (прогон продолжится после перезапуска)
+SLOW_RESPONSE_THRESHOLD = float(os.getenv('SLOW_RESPONSE_THRESHOLD', 5.0))  # SLO по времени ответа в секундах (0 - отключено)
+
+# Справедливая очередь проверки: вес и квота скорости пользователей (формат "user_id:значение,...")
+USER_WEIGHTS = {int(user_id): float(weight) for user_id, weight in (item.split(':') for item in os.getenv('USER_WEIGHTS', '').split(',') if item.strip())}  # Веса пользователей (по умолчанию 1)
+USER_FETCH_RATE = float(os.getenv('USER_FETCH_RATE', 0))  # Загрузок в минуту на пользователя (0 - без ограничения)
+USER_FETCH_RATES = {int(user_id): float(rate) for user_id, rate in (item.split(':') for item in os.getenv('USER_FETCH_RATES', '').split(',') if item.strip())}  # Квоты отдельных пользователей, загрузок в минуту
 
 # Настройки детекции изменений
 CONTENT_HASH_ALGORITHM = os.getenv('CONTENT_HASH_ALGORITHM', 'sha256')  # Алгоритм хеширования
 MIN_CONTENT_LENGTH = int(os.getenv('MIN_CONTENT_LENGTH', 100))  # Минимальная длина контента
+MAX_TEXT_LENGTH = int(os.getenv('MAX_TEXT_LENGTH', 1_000_000))  # Сколько символов текста страницы хранить для сравнения (хеш считается по всему тексту)
 
 # Настройки порога значительных изменений
 SIGNIFICANT_CHANGE_THRESHOLD = float(os.getenv('SIGNIFICANT_CHANGE_THRESHOLD', 0.15))  # 15% - порог изменений
 MIN_CHANGED_CHARS = int(os.getenv('MIN_CHANGED_CHARS', 50))  # Минимум измененных символов
 MAX_LENGTH_CHANGE_RATIO = float(os.getenv('MAX_LENGTH_CHANGE_RATIO', 0.30))  # 30% - изменение длины
+CHANGE_SUMMARY_PASSAGES = int(os.getenv('CHANGE_SUMMARY_PASSAGES', 3))  # Сколько крупнейших добавленных и удаленных участков показывать
+CHANGE_SUMMARY_WORDS = int(os.getenv('CHANGE_SUMMARY_WORDS', 12))  # Сколько слов показывать из каждого участка
+WATCH_CACHE_SIZE = int(os.getenv('WATCH_CACHE_SIZE', 10000))  # Сколько результатов правил наблюдения хранить в памяти (по хешу текста страницы)
+
+# Настройки распределенной проверки (координатор и воркеры)
+CLUSTER_MODE = os.getenv('CLUSTER_MODE', 'single')  # single - все проверки в процессе бота, coordinator - раздавать проверки воркерам (python cluster.py)
+CLUSTER_QUEUE_FILE = os.getenv('CLUSTER_QUEUE_FILE', 'host_data/work_queue.sqlite3')  # Общая очередь заданий координатора и воркеров
+CLUSTER_POLL_SECONDS = float(os.getenv('CLUSTER_POLL_SECONDS', 2))  # Интервал опроса очереди в секундах
+CLUSTER_RUN_TIMEOUT = float(os.getenv('CLUSTER_RUN_TIMEOUT', 3 * 3600))  # Сколько ждать воркеров, прежде чем координатор доделает прогон сам
+WORKER_ID = os.getenv('WORKER_ID', '')  # Имя воркера (по умолчанию хост и PID)
+WORKER_BATCH_SIZE = int(os.getenv('WORKER_BATCH_SIZE', 10))  # Сколько групп сайтов воркер забирает за раз
+WORKER_HEARTBEAT_TIMEOUT = float(os.getenv('WORKER_HEARTBEAT_TIMEOUT', 60))  # Через сколько секунд без сигнала воркер считается выбывшим
 
 # Пути к файлам
 SITES_DATABASE_FILE = os.getenv('SITES_DATABASE_FILE', 'host_data/sites.json')  # Файл с базой сайтов
 LOG_FILE = os.getenv('LOG_FILE', 'logs/monitor.log')  # Файл логов
 
+# Настройки постраничного вывода в боте
+LIST_PAGE_SIZE = int(os.getenv('LIST_PAGE_SIZE', 20))  # Сайтов на странице /list
+STATUS_PAGE_SIZE = int(os.getenv('STATUS_PAGE_SIZE', 5))  # Сайтов на странице /status
+PAGE_CACHE_SIZE = int(os.getenv('PAGE_CACHE_SIZE', 1000))  # Сколько разбиений /list и /status (пользователь, представление) хранить в памяти
+
+# Настройки импорта сайтов из файла
+IMPORT_MAX_FILE_SIZE = int(os.getenv('IMPORT_MAX_FILE_SIZE', 5 * 1024 * 1024))  # Максимальный размер файла в байтах
+IMPORT_MAX_SITES = int(os.getenv('IMPORT_MAX_SITES', 10000))  # Максимум сайтов в одном импорте
+
+# Администраторы бота (ID пользователей Telegram через запятую)
+ADMIN_USER_IDS = [int(user_id) for user_id in os.getenv('ADMIN_USER_IDS', '').split(',') if user_id.strip()]
+
+# Настройки профилирования проверок
+PROFILE_CHECKS = os.getenv('PROFILE_CHECKS', 'false').lower() == 'true'  # Профилировать каждый прогон проверки
+PROFILE_MODE = os.getenv('PROFILE_MODE', 'stages')  # stages, cprofile или sample
+PROFILE_TOP_N = int(os.getenv('PROFILE_TOP_N', 10))  # Сколько самых медленных сайтов выводить в лог
+PROFILE_OUTPUT_DIR = os.getenv('PROFILE_OUTPUT_DIR', 'logs/profiles')  # Директория для дампов профиля
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL', 0.01))  # Интервал сэмплирования стеков в секундах
+
 # Настройки уведомлений
-NOTIFICATION_RETRY_DELAY = 300  # Задержка между повторными уведомлениями в секундах (5 минут)
+NOTIFICATION_RETRY_DELAY = int(os.getenv('NOTIFICATION_RETRY_DELAY', 3 * CHECK_INTERVAL_HOURS * 3600))  # Окно подавления повторных уведомлений о сайте в секундах (по умолчанию три интервала проверки)
+DIGEST_INTERVAL_HOURS = float(os.getenv('DIGEST_INTERVAL_HOURS', 0))  # Интервал сводок уведомлений в часах (0 - отправлять сразу)
+ALERT_STATE_FILE = os.getenv('ALERT_STATE_FILE', 'host_data/alert_state.json')  # Файл состояния оповещений
+RUN_JOURNAL_FILE = os.getenv('RUN_JOURNAL_FILE', 'host_data/run_journal.jsonl')  # Журнал текущего прогона для продолжения после перезапуска
 
+# Настройки метрик (эндпоинт /metrics в формате Prometheus)
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))  # Порт эндпоинта метрик (0 - отключено)
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')  # Адрес эндпоинта метрик
@@ -0,0 +1,267 @@
+"""
+Модуль правил выборочного мониторинга фрагментов страницы
+Ограничивает сравниваемый текст нужными частями страницы (CSS селекторы или XPath)
+и нормализует изменчивые значения (даты, числа, токены сессий)
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+from bs4 import BeautifulSoup
+import soupsieve
+from lxml import etree, html as lxml_html
+from json_snapshot import is_json_path, parse_json_path
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Виды правил сайта
+RULE_KINDS = ('include', 'exclude', 'normalize')
+
+# Префикс пользовательского регулярного выражения в правилах нормализации
+REGEX_PREFIX = 're:'
+
+# Предельная длина пользовательского регулярного выражения
+REGEX_MAX_LENGTH = 200
+
+# Узлы разобранного выражения, повторяющие вложенное выражение
+_REPEAT_OPS = tuple(
+    getattr(sre_parse, name) for name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT') if hasattr(sre_parse, name)
+)
+
+# Встроенные нормализаторы в порядке применения (даты раньше чисел, токены раньше всего)
+NORMALIZERS = {
+    'tokens': (re.compile(r'\b(?=[\w-]*\d)(?=[\w-]*[A-Za-z])[A-Za-z0-9_-]{16,}\b'), '[токен]'),
+    'dates': (re.compile(
+        r'\b\d{1,4}[./-]\d{1,2}[./-]\d{1,4}(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?\b|\b\d{1,2}:\d{2}(?::\d{2})?\b'
+    ), '[дата]'),
+    'numbers': (re.compile(r'\d+(?:[.,]\d+)*'), '[число]')
+}
+
+
+def is_xpath(selector: str) -> bool:
+    """
+    Определяет, является ли селектор выражением XPath (иначе это CSS селектор)
+
+    Args:
+        selector (str): Селектор из правила
+
+    Returns:
+        bool: True для XPath
+    """
+    return selector.startswith(('/', '('))
+
+
+def _subpatterns(value) -> Iterable:
+    """Вложенные выражения в аргументах узла разобранного выражения"""
+    if isinstance(value, sre_parse.SubPattern):
+        yield value
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _subpatterns(item)
+
+
+def _has_nested_repeat(pattern, outer: Optional[bool] = None) -> bool:
+    """
+    Ищет квантификатор внутри квантификатора, если хотя бы один из них не ограничен сверху
+
+    Такие выражения, как (a+)+ или (\\w*\\s?)*, на неподходящем тексте перебирают
+    экспоненциальное число вариантов
+
+    Args:
+        pattern: Разобранное выражение
+        outer (Optional[bool]): Неограничено ли внешнее повторение (None - его нет)
+
+    Returns:
+        bool: True если найдено вложенное повторение
+    """
+    for op, value in pattern:
+        if op in _REPEAT_OPS and value[1] > 1:
+            unbounded = value[1] == sre_parse.MAXREPEAT
+            if outer is not None and (outer or unbounded):
+                return True
+            if _has_nested_repeat(value[2], unbounded if outer is None else outer or unbounded):
+                return True
+            continue
+        for subpattern in _subpatterns(value):
+            if _has_nested_repeat(subpattern, outer):
+                return True
+    return False
+
+
+def regex_error(expression: str) -> Optional[str]:
+    """
+    Проверяет пользовательское регулярное выражение
+
+    Выражения выполняются в общем потоке проверки без ограничения времени, поэтому
+    кроме синтаксиса ограничиваются длина и вложенные квантификаторы, из-за которых
+    одно выражение может надолго остановить прогон для всех пользователей
+
+    Args:
+        expression (str): Выражение без префикса re:
+
+    Returns:
+        Optional[str]: Описание ошибки или None если выражение допустимо
+    """
+    if len(expression) > REGEX_MAX_LENGTH:
+        return f"Слишком длинное регулярное выражение (больше {REGEX_MAX_LENGTH} символов)"
+    try:
+        parsed = sre_parse.parse(expression)
+    except re.error as e:
+        return f"Некорректное регулярное выражение: {e}"
+    if _has_nested_repeat(parsed):
+        return "Вложенные квантификаторы вроде (a+)+ не поддерживаются: такое выражение может выполняться очень долго"
+    return None
+
+
+@lru_cache(maxsize=1024)
+def compile_user_regex(expression: str) -> Optional[re.Pattern]:
+    """
+    Компилирует пользовательское регулярное выражение, если оно допустимо
+
+    Правила, сохраненные до появления ограничений, тоже проверяются: недопустимое
+    выражение не выполняется
+
+    Args:
+        expression (str): Выражение без префикса re:
+
+    Returns:
+        Optional[re.Pattern]: Скомпилированное выражение или None
+    """
+    return None if regex_error(expression) else re.compile(expression)
+
+
+def validate_rule(kind: str, value: str) -> Optional[str]:
+    """
+    Проверяет корректность правила
+
+    Args:
+        kind (str): Вид правила из RULE_KINDS
+        value (str): Селектор или нормализатор
+
+    Returns:
+        Optional[str]: Описание ошибки или None если правило корректно
+    """
+    if kind not in RULE_KINDS:
+        return f"Неизвестный вид правила: {kind}"
+
+    if kind == 'normalize':
+        if value in NORMALIZERS:
+            return None
+        if not value.startswith(REGEX_PREFIX):
+            return f"Неизвестный нормализатор: {value} (доступны: {', '.join(NORMALIZERS)} или re:<выражение>)"
+        return regex_error(value[len(REGEX_PREFIX):])
+
+    if is_json_path(value):
+        try:
+            parse_json_path(value)
+        except ValueError as e:
+            return f"Некорректный селектор JSON {value}: {e}"
+        return None
+
+    try:
+        if is_xpath(value):
+            etree.XPath(value)
+        else:
+            soupsieve.compile(value)
+    except (etree.XPathSyntaxError, soupsieve.SelectorSyntaxError) as e:
+        return f"Некорректный селектор {value}: {str(e).splitlines()[0]}"
+    return None
+
+
+def _selectors(rules: Dict, kind: str, xpath: bool) -> List[str]:
+    """Селекторы правила заданного вида и типа (селекторы полей JSON к HTML не применяются)"""
+    return [
+        selector for selector in rules.get(kind, [])
+        if is_xpath(selector) == xpath and not is_json_path(selector)
+    ]
+
+
+def extract_fragments(content: str, rules: Dict, skip_tags: Iterable[str]) -> str:
+    """
+    Извлекает текст фрагментов страницы по правилам сайта
+
+    Сначала применяются XPath правила (через lxml), затем CSS правила (через BeautifulSoup).
+    Если правил include нет, берется вся страница без исключенных элементов
+
+    Args:
+        content (str): HTML страницы
+        rules (Dict): Правила сайта с ключами include, exclude
+        skip_tags (Iterable[str]): Технические теги, которые всегда удаляются
+
+    Returns:
+        str: Текст выбранных фрагментов с нормализованными пробелами
+    """
+    include_xpath = _selectors(rules, 'include', True)
+    exclude_xpath = _selectors(rules, 'exclude', True)
+
+    if include_xpath or exclude_xpath:
+        tree = lxml_html.fromstring(content)
+        for selector in exclude_xpath:
+            for element in tree.xpath(selector):
+                if isinstance(element, lxml_html.HtmlElement) and element.getparent() is not None:
+                    element.drop_tree()
+        roots = [
+            element for selector in include_xpath for element in tree.xpath(selector)
+            if isinstance(element, lxml_html.HtmlElement)
+        ] if include_xpath else [tree]
+        content = ''.join(lxml_html.tostring(root, encoding='unicode') for root in roots)
+
+    soup = BeautifulSoup(content, 'html.parser')
+    for element in soup(list(skip_tags)):
+        element.decompose()
+    for selector in _selectors(rules, 'exclude', False):
+        for element in soup.select(selector):
+            element.decompose()
+
+    include_css = _selectors(rules, 'include', False)
+    fragments = [element for selector in include_css for element in soup.select(selector)] if include_css else [soup]
+
+    return ' '.join(' '.join(fragment.get_text().split()) for fragment in fragments).strip()
+
+
+def normalize_text(text: str, normalizers: Iterable[str]) -> str:
+    """
+    Заменяет изменчивые значения в тексте, чтобы они не считались изменением контента
+
+    Args:
+        text (str): Текст страницы
+        normalizers (Iterable[str]): Имена встроенных нормализаторов или re:<выражение>
+
+    Returns:
+        str: Нормализованный текст
+    """
+    normalizers = list(normalizers)
+    if not normalizers:
+        return text
+
+    for name, (pattern, replacement) in NORMALIZERS.items():
+        if name in normalizers:
+            text = pattern.sub(replacement, text)
+
+    for value in normalizers:
+        if value.startswith(REGEX_PREFIX):
+            pattern = compile_user_regex(value[len(REGEX_PREFIX):])
+            if pattern is not None:
+                text = pattern.sub('', text)
+
+    return ' '.join(text.split())
+
+
+def format_rules(rules: Dict) -> str:
+    """
+    Формирует описание правил сайта для пользователя
+
+    Args:
+        rules (Dict): Правила сайта
+
+    Returns:
+        str: Текст с правилами по видам
+    """
+    titles = {'include': '✅ Учитывать', 'exclude': '🚫 Исключить', 'normalize': '🔣 Нормализовать'}
+    lines = []
+    for kind in RULE_KINDS:
+        for value in rules.get(kind, []):
+            lines.append(f"{titles[kind]}: {value}")
+    return '\n'.join(lines) if lines else "Правил нет, сравнивается вся страница"
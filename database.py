@@ -4,9 +4,11 @@
 """
 import json
 import os
+import threading
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import config
+import metrics
 
 class SitesDatabase:
     """
@@ -22,6 +24,9 @@ class SitesDatabase:
             db_file (str): Путь к файлу базы данных
         """
         self.db_file = db_file or config.SITES_DATABASE_FILE
+        # Защищает цикл загрузка-изменение-сохранение: проверки пишут статусы из пула потоков,
+        # пока обработчики команд меняют сайты из event loop
+        self._lock = threading.RLock()
         self._ensure_database_exists()
     
     def _ensure_database_exists(self):
@@ -37,8 +42,9 @@ class SitesDatabase:
             List[Dict]: Список сайтов
         """
         try:
-            with open(self.db_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with self._lock, metrics.DB_READ_SECONDS.time():
+                with open(self.db_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
         except (json.JSONDecodeError, FileNotFoundError):
             return []
     
@@ -49,8 +55,9 @@ class SitesDatabase:
         Args:
             sites (List[Dict]): Список сайтов для сохранения
         """
-        with open(self.db_file, 'w', encoding='utf-8') as f:
-            json.dump(sites, f, ensure_ascii=False, indent=2)
+        with self._lock, metrics.DB_WRITE_SECONDS.time():
+            with open(self.db_file, 'w', encoding='utf-8') as f:
+                json.dump(sites, f, ensure_ascii=False, indent=2)
     
     def add_site(self, url: str, name: str = None, user_id: int = None) -> bool:
         """
@@ -62,17 +69,63 @@ class SitesDatabase:
             user_id (int): ID пользователя, добавившего сайт
             
         Returns:
-            bool: True если сайт добавлен успешно, False если уже существует
+            bool: True если сайт добавлен успешно, False если уже есть у пользователя
         """
-        sites = self._load_sites()
+        with self._lock:
+            sites = self._load_sites()
+            
+            # Проверяем, не добавлен ли уже такой URL этим пользователем
+            # (одинаковые URL разных пользователей загружаются при проверке один раз)
+            if any(site['url'] == url and site.get('user_id') == user_id for site in sites):
+                return False
+            
+            sites.append(self._new_site(len(sites) + 1, url, name, user_id))
+            self._save_sites(sites)
+            return True
+    
+    def add_sites(self, entries: List[Tuple[str, Optional[str]]], user_id: int = None) -> Tuple[int, int]:
+        """
+        Добавляет несколько сайтов за одну запись базы данных
         
-        # Проверяем, не существует ли уже такой URL
-        if any(site['url'] == url for site in sites):
-            return False
+        Args:
+            entries (List[Tuple[str, Optional[str]]]): Пары (URL, название)
+            user_id (int): ID пользователя, добавившего сайты
+            
+        Returns:
+            Tuple[int, int]: (количество добавленных, количество пропущенных дубликатов)
+        """
+        with self._lock:
+            sites = self._load_sites()
+            known_urls = {site['url'] for site in sites if site.get('user_id') == user_id}
+            added = 0
+            
+            for url, name in entries:
+                if url in known_urls:
+                    continue
+                known_urls.add(url)
+                sites.append(self._new_site(len(sites) + 1, url, name, user_id))
+                added += 1
+            
+            if added:
+                self._save_sites(sites)
+            
+            return added, len(entries) - added
+    
+    def _new_site(self, site_id: int, url: str, name: str = None, user_id: int = None) -> Dict:
+        """
+        Создает запись нового сайта
         
-        # Создаем новый сайт
-        new_site = {
-            'id': len(sites) + 1,
+        Args:
+            site_id (int): ID сайта
+            url (str): URL сайта
+            name (str): Название сайта
+            user_id (int): ID пользователя
+            
+        Returns:
+            Dict: Запись сайта
+        """
+        return {
+            'id': site_id,
             'url': url,
             'name': name or url,
             'user_id': user_id,
@@ -85,10 +138,6 @@ class SitesDatabase:
             'check_count': 0,
             'error_count': 0
         }
-        
-        sites.append(new_site)
-        self._save_sites(sites)
-        return True
     
     def remove_site(self, site_id: int) -> bool:
         """
@@ -100,21 +149,22 @@ class SitesDatabase:
         Returns:
             bool: True если сайт удален успешно, False если не найден
         """
-        sites = self._load_sites()
-        original_count = len(sites)
-        
-        # Удаляем сайт по ID
-        sites = [site for site in sites if site['id'] != site_id]
-        
-        if len(sites) < original_count:
-            # Пересчитываем ID для оставшихся сайтов
-            for i, site in enumerate(sites):
-                site['id'] = i + 1
+        with self._lock:
+            sites = self._load_sites()
+            original_count = len(sites)
             
-            self._save_sites(sites)
-            return True
-        
-        return False
+            # Удаляем сайт по ID
+            sites = [site for site in sites if site['id'] != site_id]
+            
+            if len(sites) < original_count:
+                # Пересчитываем ID для оставшихся сайтов
+                for i, site in enumerate(sites):
+                    site['id'] = i + 1
+                
+                self._save_sites(sites)
+                return True
+            
+            return False
     
     def get_all_sites(self) -> List[Dict]:
         """
@@ -151,37 +201,133 @@ class SitesDatabase:
                 return site
         return None
     
-    def update_site_status(self, site_id: int, status: str, content_hash: str = None, content: str = None, error_message: str = None):
+    def update_site_status(self, site_id: int, status: str, content_hash: str = None, content: str = None, error_message: str = None,
+                           timings: Dict = None, change_summary: Dict = None, watch: Dict = None):
         """
         Обновляет статус проверки сайта
         
         Args:
             site_id (int): ID сайта
-            status (str): Статус проверки ('ok', 'error', 'changed')
+            status (str): Статус проверки ('ok', 'error', 'changed', 'slow')
             content_hash (str): Хеш содержимого страницы
             content (str): Содержимое страницы для сравнения
             error_message (str): Сообщение об ошибке
+            timings (Dict): Замеры фаз запроса в секундах (dns, connect, tls, ttfb, body, total)
+                и объема тела ответа в байтах (wire_bytes, decoded_bytes)
+            change_summary (Dict): Сводка значительных изменений (сохраняется до следующего изменения)
+            watch (Dict): Результаты правил наблюдения и ключевых слов с хешем текста (hash, matches)
         """
-        sites = self._load_sites()
+        with self._lock:
+            sites = self._load_sites()
+            
+            for site in sites:
+                if site['id'] == site_id:
+                    site['last_check'] = datetime.now().isoformat()
+                    site['last_status'] = status
+                    site['check_count'] += 1
+                    
+                    if content_hash:
+                        site['last_content_hash'] = content_hash
+                    
+                    if content:
+                        site['last_content'] = content
+                    
+                    if change_summary:
+                        site['last_change_summary'] = dict(change_summary, at=site['last_check'])
+                    
+                    if watch:
+                        site['last_watch'] = watch
+                    
+                    if timings:
+                        site['last_timings'] = timings
+                        site['last_response_time'] = timings.get('total')
+                    
+                    if status == 'error':
+                        site['error_count'] += 1
+                    
+                    break
+            
+            self._save_sites(sites)
+    
+    def set_site_rules(self, site_id: int, rules: Dict) -> bool:
+        """
+        Задает правила выборочного мониторинга сайта
         
-        for site in sites:
-            if site['id'] == site_id:
-                site['last_check'] = datetime.now().isoformat()
-                site['last_status'] = status
-                site['check_count'] += 1
-                
-                if content_hash:
-                    site['last_content_hash'] = content_hash
-                
-                if content:
-                    site['last_content'] = content
-                
-                if status == 'error':
-                    site['error_count'] += 1
-                
-                break
+        Сохраненный контент сбрасывается, так как он извлечен по старым правилам:
+        следующая проверка сохранит новый базовый контент без уведомления об изменении
+        
+        Args:
+            site_id (int): ID сайта
+            rules (Dict): Правила с ключами include, exclude, normalize (пустой словарь - без правил)
+            
+        Returns:
+            bool: True если сайт найден
+        """
+        with self._lock:
+            sites = self._load_sites()
+            
+            for site in sites:
+                if site['id'] == site_id:
+                    site['rules'] = {kind: values for kind, values in rules.items() if values}
+                    site['last_content_hash'] = None
+                    site['last_content'] = None
+                    self._save_sites(sites)
+                    return True
+            
+            return False
+    
+    def set_site_watch(self, site_id: int, patterns: List[str]) -> bool:
+        """
+        Задает правила наблюдения сайта: ключевые слова и регулярные выражения (re:...)
+        
+        Для новых правил следующая проверка только запомнит результат без уведомления
+        
+        Args:
+            site_id (int): ID сайта
+            patterns (List[str]): Правила наблюдения (пустой список - без правил)
+            
+        Returns:
+            bool: True если сайт найден
+        """
+        with self._lock:
+            sites = self._load_sites()
+            
+            for site in sites:
+                if site['id'] == site_id:
+                    site['watch'] = patterns
+                    self._save_sites(sites)
+                    return True
+            
+            return False
+    
+    def set_site_check_mode(self, site_id: int, mode: str, keywords: List[str] = None) -> bool:
+        """
+        Задает режим проверки сайта (content, availability или keyword)
+        
+        Сохраненный контент сбрасывается: при возврате в режим content
+        следующая проверка сохранит новый базовый контент без уведомления об изменении
         
-        self._save_sites(sites)
+        Args:
+            site_id (int): ID сайта
+            mode (str): Режим проверки
+            keywords (List[str]): Ключевые слова для режима keyword
+            
+        Returns:
+            bool: True если сайт найден
+        """
+        with self._lock:
+            sites = self._load_sites()
+            
+            for site in sites:
+                if site['id'] == site_id:
+                    site['check_mode'] = mode
+                    site['keywords'] = keywords or []
+                    site['last_content_hash'] = None
+                    site['last_content'] = None
+                    self._save_sites(sites)
+                    return True
+            
+            return False
     
     def get_sites_by_user(self, user_id: int) -> List[Dict]:
         """
@@ -206,12 +352,13 @@ class SitesDatabase:
         Returns:
             bool: Новый статус активности
         """
-        sites = self._load_sites()
-        
-        for site in sites:
-            if site['id'] == site_id:
-                site['is_active'] = not site.get('is_active', True)
-                self._save_sites(sites)
-                return site['is_active']
-        
-        return False
+        with self._lock:
+            sites = self._load_sites()
+            
+            for site in sites:
+                if site['id'] == site_id:
+                    site['is_active'] = not site.get('is_active', True)
+                    self._save_sites(sites)
+                    return site['is_active']
+            
+            return False
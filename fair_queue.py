@@ -0,0 +1,113 @@
+"""
+Модуль справедливой очереди проверки
+Чередует группы сайтов разных пользователей по взвешенному справедливому
+обслуживанию (weighted fair queuing), чтобы пользователь с тысячами сайтов
+не задерживал результаты и уведомления остальных
+"""
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Callable, Dict, Hashable, Iterable, Optional, Tuple
+
+
+class FairQueue:
+    """
+    Очередь групп сайтов с очередями (потоками) по пользователям
+
+    Каждая выдача группы продвигает виртуальное время пользователя на 1/вес,
+    и следующей выдается группа пользователя с наименьшим виртуальным временем.
+    Группа, общая для нескольких пользователей (один URL), стоит в очереди
+    каждого из них и выдается один раз - первому, до кого дошла очередь.
+    Квота скорости ограничивает число выдач пользователя в минуту: пока квота
+    исчерпана, очередь выдает группы остальных пользователей
+    """
+
+    def __init__(self, weights: Dict[Hashable, float] = None, rates: Dict[Hashable, float] = None,
+                 default_rate: float = 0, clock: Callable[[], float] = time.monotonic):
+        """
+        Инициализация очереди
+
+        Args:
+            weights (Dict[Hashable, float]): Веса пользователей (по умолчанию 1)
+            rates (Dict[Hashable, float]): Квоты пользователей, загрузок в минуту
+            default_rate (float): Квота остальных пользователей (0 - без ограничения)
+            clock (Callable[[], float]): Источник времени в секундах
+        """
+        self.weights = weights or {}
+        self.rates = rates or {}
+        self.default_rate = default_rate
+        self.clock = clock
+
+        self._flows: Dict[Hashable, deque] = {}
+        self._finish: Dict[Hashable, float] = {}
+        self._next_allowed: Dict[Hashable, float] = {}
+        self._heap = []
+        self._order = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Число еще не выданных групп"""
+        return self._size
+
+    def add(self, users: Iterable[Hashable], item):
+        """
+        Добавляет группу в очереди пользователей
+
+        Args:
+            users (Iterable[Hashable]): Пользователи, которым нужна группа
+            item: Группа сайтов
+        """
+        # Общая ячейка: после выдачи группа пропускается в очередях остальных пользователей
+        entry = [item]
+        for user in dict.fromkeys(users):
+            flow = self._flows.get(user)
+            if flow is None:
+                flow = self._flows[user] = deque()
+                self._finish.setdefault(user, 0.0)
+            if not flow:
+                heapq.heappush(self._heap, (self._finish[user], next(self._order), user))
+            flow.append(entry)
+        self._size += 1
+
+    def pop(self) -> Tuple[Optional[object], float]:
+        """
+        Выдает следующую группу
+
+        Returns:
+            Tuple[Optional[object], float]: (группа, 0) или (None, сколько секунд ждать
+            до окончания квоты), если у всех пользователей с группами квота исчерпана
+        """
+        now = self.clock()
+        throttled = []
+        item = None
+
+        while self._heap:
+            finish, order, user = heapq.heappop(self._heap)
+            flow = self._flows[user]
+            while flow and not flow[0]:
+                flow.popleft()
+            if not flow:
+                continue
+
+            if self._next_allowed.get(user, 0) > now:
+                throttled.append((finish, order, user))
+                continue
+
+            item = flow.popleft().pop()
+            self._size -= 1
+            self._finish[user] = finish + 1.0 / self.weights.get(user, 1.0)
+            rate = self.rates.get(user, self.default_rate)
+            if rate > 0:
+                self._next_allowed[user] = now + 60.0 / rate
+            if flow:
+                heapq.heappush(self._heap, (self._finish[user], next(self._order), user))
+            break
+
+        for flow_entry in throttled:
+            heapq.heappush(self._heap, flow_entry)
+
+        if item is not None:
+            return item, 0.0
+        wait = min((self._next_allowed[user] for _, _, user in throttled), default=now) - now
+        return None, max(0.0, wait)
@@ -0,0 +1,417 @@
+"""
+Модуль HTTP-загрузки страниц
+Выполняет запросы и замеряет длительность фаз: DNS, подключение, TLS,
+ожидание первого байта (TTFB) и загрузку тела ответа, а также объем тела
+ответа по сети и после распаковки
+"""
+import codecs
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional, Tuple
+import requests
+from requests.compat import chardet
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NameResolutionError, NewConnectionError, ConnectTimeoutError
+from urllib3.util.request import ACCEPT_ENCODING
+from redirect_cache import RedirectCache
+
+# Фазы запроса, которые суммируются по всем соединениям (включая редиректы)
+TIMING_PHASES = ('dns', 'connect', 'tls', 'ttfb', 'body')
+
+# Счетчики объема тела ответа в замерах: передано по сети и после распаковки (байт)
+TRANSFER_COUNTERS = ('wire_bytes', 'decoded_bytes')
+
+# Счетчики редиректов в замерах: пройдено запросами и пропущено по кешу постоянных редиректов
+REDIRECT_COUNTERS = ('redirects', 'redirects_cached')
+
+# Размер фрагмента при чтении тела ответа
+CHUNK_SIZE = 64 * 1024
+
+# Сколько байт тела читает проверка доступности, прежде чем закрыть соединение
+STATUS_PROBE_BYTES = 1024
+
+# Статусы ответа на HEAD, после которых доступность проверяется запросом GET
+HEAD_UNSUPPORTED_CODES = (403, 405, 501)
+
+# Сборщик замеров текущего запроса (у каждого потока свой)
+_collector = threading.local()
+
+
+def _record(phase: str, seconds: float):
+    """
+    Добавляет замер фазы в сборщик текущего потока
+
+    Args:
+        phase (str): Название фазы
+        seconds (float): Длительность в секундах
+    """
+    timings = getattr(_collector, 'timings', None)
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + seconds
+
+
+def is_json_response(response: requests.Response) -> bool:
+    """
+    Определяет по заголовку Content-Type, что ответ содержит JSON
+
+    Args:
+        response (requests.Response): Ответ
+
+    Returns:
+        bool: True для application/json и типов вида application/*+json
+    """
+    mime_type = response.headers.get('Content-Type', '').split(';', 1)[0].strip().lower()
+    return mime_type == 'application/json' or mime_type.endswith('+json')
+
+
+class _TimedConnectionMixin:
+    """
+    Примесь для соединений urllib3, замеряющая DNS, TCP, TLS и TTFB
+    Переиспользованное keep-alive соединение не добавляет времени подключения
+    """
+
+    def _new_conn(self) -> socket.socket:
+        """Разрешает имя хоста отдельно от TCP-подключения, чтобы замерить обе фазы"""
+        started = time.perf_counter()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise NameResolutionError(self.host, self, e) from e
+        resolved = time.perf_counter()
+        _record('dns', resolved - started)
+
+        # Подключаемся к уже разрешенным адресам по очереди, как это делает create_connection
+        dns_host = self._dns_host
+        last_error = None
+        try:
+            for address in dict.fromkeys(info[4][0] for info in addresses):
+                self._dns_host = address
+                try:
+                    sock = super()._new_conn()
+                    break
+                except (NewConnectionError, ConnectTimeoutError) as e:
+                    last_error = e
+            else:
+                raise last_error
+        finally:
+            self._dns_host = dns_host
+
+        self._tcp_connected_at = time.perf_counter()
+        _record('connect', self._tcp_connected_at - resolved)
+        return sock
+
+    def connect(self):
+        """Открывает соединение; все, что после TCP-подключения, считается временем TLS"""
+        self._tcp_connected_at = None
+        super().connect()
+        if self._tcp_connected_at is not None and isinstance(self, HTTPSConnection):
+            _record('tls', time.perf_counter() - self._tcp_connected_at)
+
+    def request(self, *args, **kwargs):
+        """Отправляет запрос и запоминает момент окончания отправки"""
+        super().request(*args, **kwargs)
+        self._request_sent_at = time.perf_counter()
+
+    def getresponse(self, *args, **kwargs):
+        """Получает заголовки ответа и фиксирует время до первого байта"""
+        response = super().getresponse(*args, **kwargs)
+        sent_at = getattr(self, '_request_sent_at', None)
+        if sent_at is not None:
+            _record('ttfb', time.perf_counter() - sent_at)
+        return response
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimingHTTPAdapter(HTTPAdapter):
+    """
+    HTTP-адаптер requests, создающий соединения с замером фаз запроса
+    """
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _TimedHTTPConnectionPool,
+            'https': _TimedHTTPSConnectionPool
+        }
+
+
+class PageFetcher:
+    """
+    Загрузчик страниц с разбивкой времени ответа по фазам
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, redirects: Optional[RedirectCache] = None):
+        """
+        Инициализация загрузчика
+
+        Args:
+            session (requests.Session): Сессия requests (по умолчанию создается новая)
+            redirects (RedirectCache): Кеш постоянных редиректов (None - редиректы проходятся каждый раз)
+        """
+        self.session = session or requests.Session()
+        self.redirects = redirects
+        # Сжатие, которое urllib3 умеет распаковывать: gzip и deflate, а также br и zstd,
+        # если установлены пакеты brotli и zstandard
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        adapter = TimingHTTPAdapter()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def fetch(self, url: str, timeout: float, timings: Dict[str, float]) -> Tuple[requests.Response, str]:
+        """
+        Загружает страницу, заполняя словарь замеров по мере выполнения запроса
+
+        Словарь заполняется и при ошибке, поэтому вызывающий код может сохранить
+        частичные замеры (например, сколько длилось подключение до таймаута)
+
+        Args:
+            url (str): URL страницы
+            timeout (float): Таймаут запроса в секундах
+            timings (Dict[str, float]): Словарь для замеров в секундах
+                (dns, connect, tls, ttfb, body, total) и объема тела в байтах
+                (wire_bytes, decoded_bytes)
+
+        Returns:
+            Tuple[requests.Response, str]: (ответ, текст страницы)
+        """
+        return self._fetch(url, timeout, timings, None)
+
+    def fetch_stream(self, url: str, timeout: float, timings: Dict[str, float],
+                     consumer: Callable[[str], None]) -> Tuple[requests.Response, Optional[str]]:
+        """
+        Загружает страницу, не накапливая тело ответа в памяти
+
+        Тело декодируется по частям и передается в consumer по мере загрузки,
+        поэтому время обработки фрагментов входит в замер фазы body.
+        JSON ответ в consumer не передается, а читается целиком для разбора
+
+        Args:
+            url (str): URL страницы
+            timeout (float): Таймаут запроса в секундах
+            timings (Dict[str, float]): Словарь для замеров в секундах
+            consumer (Callable[[str], None]): Обработчик декодированных фрагментов тела
+
+        Returns:
+            Tuple[requests.Response, Optional[str]]: (ответ, текст JSON ответа или None)
+        """
+        return self._fetch(url, timeout, timings, consumer)
+
+    def _fetch(self, url: str, timeout: float, timings: Dict[str, float],
+               consumer: Optional[Callable[[str], None]]) -> Tuple[requests.Response, Optional[str]]:
+        """
+        Выполняет запрос с замером фаз; тело читается целиком или передается в consumer
+        (JSON ответ всегда читается целиком)
+
+        Returns:
+            Tuple[requests.Response, Optional[str]]: (ответ, текст страницы или None при потоковой загрузке)
+        """
+        with self._measure(timings):
+            response = self._request('GET', url, timeout, timings, stream=True)
+
+            # Тело читаем отдельно, чтобы замерить время его загрузки
+            body_started = time.perf_counter()
+            if consumer is not None and is_json_response(response):
+                consumer = None
+            try:
+                if consumer is None:
+                    response._content = b''.join(response.iter_content(chunk_size=CHUNK_SIZE))
+                    decoded = len(response._content)
+                else:
+                    decoded = self._stream_body(response, consumer)
+            finally:
+                response.close()
+            timings['body'] += time.perf_counter() - body_started
+            self._count_transfer(timings, response, decoded)
+
+            return response, response.text if consumer is None else None
+
+    def fetch_status(self, url: str, timeout: float, timings: Dict[str, float]) -> Tuple[requests.Response, int]:
+        """
+        Проверяет доступность страницы, не загружая тело
+
+        Выполняет HEAD, а если сервер его не поддерживает - GET, соединение которого
+        закрывается после первых STATUS_PROBE_BYTES байт тела
+
+        Args:
+            url (str): URL страницы
+            timeout (float): Таймаут запроса в секундах
+            timings (Dict[str, float]): Словарь для замеров в секундах
+
+        Returns:
+            Tuple[requests.Response, int]: (ответ, сколько байт тела прочитано)
+        """
+        with self._measure(timings):
+            response = self._request('HEAD', url, timeout, timings)
+            response.close()
+            if response.status_code not in HEAD_UNSUPPORTED_CODES:
+                self._count_transfer(timings, response, 0)
+                return response, 0
+
+            response = self._request('GET', url, timeout, timings, stream=True)
+            body_started = time.perf_counter()
+            try:
+                received = len(response.raw.read(STATUS_PROBE_BYTES, decode_content=False) or b'')
+            finally:
+                # Закрытие недочитанного ответа разрывает соединение - остаток тела не передается
+                response.close()
+            timings['body'] += time.perf_counter() - body_started
+            # Прочитанное начало тела не распаковывается
+            self._count_transfer(timings, response, received)
+            return response, received
+
+    def _request(self, method: str, url: str, timeout: float, timings: Optional[Dict[str, float]],
+                 **kwargs) -> requests.Response:
+        """
+        Выполняет запрос с переходом по редиректам, начиная с конечного URL постоянных редиректов из кеша
+
+        Если конечный URL из кеша ответил ошибкой или недоступен (кроме таймаута), запись
+        удаляется и запрос повторяется по исходному URL. Тело ответа не читается
+
+        Args:
+            method (str): HTTP метод
+            url (str): Исходный URL сайта
+            timeout (float): Таймаут запроса в секундах
+            timings (Optional[Dict[str, float]]): Словарь замеров для счетчиков редиректов
+            **kwargs: Дополнительные параметры запроса
+
+        Returns:
+            requests.Response: Итоговый ответ
+        """
+        cached = self.redirects.resolve(url) if self.redirects else None
+        response = None
+        if cached:
+            target, cached_hops = cached
+            try:
+                response = self.session.request(method, target, timeout=timeout, allow_redirects=True, **kwargs)
+            except requests.exceptions.Timeout:
+                raise
+            except requests.exceptions.RequestException:
+                pass
+            if response is not None and response.status_code >= 400:
+                response.close()
+                response = None
+            if response is None:
+                self.redirects.invalidate(url)
+
+        if response is None:
+            cached_hops = 0
+            response = self.session.request(method, url, timeout=timeout, allow_redirects=True, **kwargs)
+
+        if self.redirects:
+            self.redirects.learn(url, response, cached_hops)
+        if timings is not None:
+            timings['redirects'] = timings.get('redirects', 0) + len(response.history)
+            timings['redirects_cached'] = timings.get('redirects_cached', 0) + cached_hops
+        return response
+
+    @staticmethod
+    def _count_transfer(timings: Dict[str, float], response: requests.Response, decoded: int):
+        """
+        Записывает в замеры объем тела ответа по сети и после распаковки
+
+        Тела ответов-редиректов requests читает сам - они учитываются в обоих счетчиках
+
+        Args:
+            timings (Dict[str, float]): Словарь замеров
+            response (requests.Response): Итоговый ответ
+            decoded (int): Сколько байт тела итогового ответа получено после распаковки
+        """
+        wire = response.raw.tell()
+        for redirect in response.history:
+            wire += redirect.raw.tell()
+            decoded += len(redirect._content or b'')
+        timings['wire_bytes'] = timings.get('wire_bytes', 0) + wire
+        timings['decoded_bytes'] = timings.get('decoded_bytes', 0) + decoded
+
+    @staticmethod
+    @contextmanager
+    def _measure(timings: Dict[str, float]):
+        """
+        Собирает замеры фаз запросов внутри блока и общее время в timings
+
+        Args:
+            timings (Dict[str, float]): Словарь для замеров в секундах
+        """
+        for phase in TIMING_PHASES:
+            timings.setdefault(phase, 0.0)
+
+        started = time.perf_counter()
+        _collector.timings = timings
+        try:
+            yield
+        finally:
+            _collector.timings = None
+            timings['total'] = time.perf_counter() - started
+            for phase in timings:
+                timings[phase] = round(timings[phase], 4)
+
+    @staticmethod
+    def _stream_body(response: requests.Response, consumer: Callable[[str], None]) -> int:
+        """
+        Декодирует тело ответа по частям и передает фрагменты в consumer
+
+        Сжатое тело распаковывается urllib3 по мере чтения, так что целиком
+        не хранится ни в сжатом, ни в распакованном виде. Кодировка берется
+        из заголовков ответа (как у response.text), а если ее там нет,
+        определяется по первому фрагменту тела
+
+        Args:
+            response (requests.Response): Ответ, открытый с stream=True
+            consumer (Callable[[str], None]): Обработчик декодированных фрагментов
+
+        Returns:
+            int: Объем распакованного тела в байтах
+        """
+        decoder = None
+        decoded = 0
+        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+            decoded += len(chunk)
+            if decoder is None:
+                encoding = response.encoding or chardet.detect(chunk)['encoding'] or 'utf-8'
+                try:
+                    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                except LookupError:
+                    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+            text = decoder.decode(chunk)
+            if text:
+                consumer(text)
+
+        if decoder is not None:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                consumer(tail)
+        return decoded
+
+    def probe(self, url: str, timeout: float) -> int:
+        """
+        Выполняет дешевый пробный запрос HEAD без загрузки тела страницы
+
+        Args:
+            url (str): URL страницы
+            timeout (float): Таймаут запроса в секундах
+
+        Returns:
+            int: HTTP статус ответа
+        """
+        response = self._request('HEAD', url, timeout, None)
+        response.close()
+        return response.status_code
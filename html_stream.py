@@ -0,0 +1,166 @@
+"""
+Модуль потокового извлечения текста из HTML
+Разбирает тело ответа по мере загрузки, не строя дерево документа: пропускает
+технические элементы, нормализует пробелы и обновляет хеш текста на лету
+"""
+import hashlib
+import time
+from html.parser import HTMLParser
+from typing import Iterable, Optional
+from bs4.dammit import EntitySubstitution
+
+# Элементы без содержимого (как в BeautifulSoup, закрываются сразу после открытия)
+VOID_TAGS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'keygen', 'link', 'menuitem',
+    'meta', 'param', 'source', 'track', 'wbr', 'basefont', 'bgsound', 'command', 'frame',
+    'image', 'isindex', 'nextid', 'spacer'
+))
+
+
+class StreamingTextExtractor(HTMLParser):
+    """
+    Потоковый извлекатель текста страницы
+
+    Дает тот же текст, что BeautifulSoup(...).get_text() с удалением технических
+    элементов и схлопыванием пробелов, но хранит только стек открытых тегов
+    и не более max_chars символов результата
+    """
+
+    def __init__(self, skip_tags: Iterable[str], hash_algorithm: str = 'sha256', max_chars: Optional[int] = None):
+        """
+        Инициализация извлекателя
+
+        Args:
+            skip_tags (Iterable[str]): Теги, текст которых (вместе с вложенными) пропускается
+            hash_algorithm (str): Алгоритм хеширования текста
+            max_chars (int): Сколько символов текста сохранять (None - без ограничения);
+                хеш и длина считаются по всему тексту
+        """
+        # Ссылки на символы разбираются вручную, как в BeautifulSoup
+        super().__init__(convert_charrefs=False)
+        self.skip_tags = frozenset(skip_tags)
+        self.max_chars = max_chars
+        self.raw_length = 0
+        self.length = 0
+        self.seconds = 0.0
+        self._hash = hashlib.new(hash_algorithm)
+        self._stack = []
+        self._skip_from = None
+        self._pieces = []
+        self._kept = 0
+        self._pending_space = False
+
+    @property
+    def truncated(self) -> bool:
+        """Текст длиннее max_chars и сохранен не полностью"""
+        return self._kept < self.length
+
+    @property
+    def text(self) -> str:
+        """Сохраненный текст страницы"""
+        return ''.join(self._pieces)
+
+    def hexdigest(self) -> str:
+        """Хеш всего текста в шестнадцатеричном виде"""
+        return self._hash.hexdigest()
+
+    def feed(self, data: str):
+        """
+        Передает очередной фрагмент HTML
+
+        Args:
+            data (str): Декодированный фрагмент тела ответа
+        """
+        started = time.perf_counter()
+        self.raw_length += len(data)
+        super().feed(data)
+        self.seconds += time.perf_counter() - started
+
+    def close(self):
+        """Завершает разбор, обрабатывая остаток буфера"""
+        started = time.perf_counter()
+        super().close()
+        self.seconds += time.perf_counter() - started
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        self._stack.append(tag)
+        if self._skip_from is None and tag in self.skip_tags:
+            self._skip_from = len(self._stack) - 1
+
+    def handle_startendtag(self, tag, attrs):
+        # Самозакрывающийся тег не содержит текста
+        pass
+
+    def handle_endtag(self, tag):
+        # Как и BeautifulSoup, закрываем ближайший открытый тег с этим именем
+        # вместе со всеми незакрытыми вложенными; лишний закрывающий тег игнорируется
+        for index in range(len(self._stack) - 1, -1, -1):
+            if self._stack[index] == tag:
+                del self._stack[index:]
+                if self._skip_from is not None and index <= self._skip_from:
+                    self._skip_from = None
+                return
+
+    def handle_data(self, data):
+        if self._skip_from is None:
+            self._emit(data)
+
+    def handle_charref(self, name):
+        if name.startswith(('x', 'X')):
+            code = int(name[1:].lstrip('xX'), 16)
+        else:
+            code = int(name)
+
+        data = None
+        if code < 256:
+            # Числовые ссылки часто указывают на символы windows-1252 (например, &#150;)
+            try:
+                data = bytearray([code]).decode('windows-1252')
+            except UnicodeDecodeError:
+                pass
+        # Суррогаты (в том числе записанные парой ссылок) и значения вне Unicode
+        # заменяются символом U+FFFD, как в html.unescape: их нельзя закодировать в UTF-8 для хеша
+        if not data and code <= 0x10FFFF and not 0xD800 <= code <= 0xDFFF:
+            data = chr(code)
+        self.handle_data(data or '\N{REPLACEMENT CHARACTER}')
+
+    def handle_entityref(self, name):
+        # Неизвестная именованная ссылка остается текстом "&name"
+        character = EntitySubstitution.HTML_ENTITY_TO_CHARACTER.get(name)
+        self.handle_data(character if character is not None else f"&{name}")
+
+    def unknown_decl(self, data):
+        # Секции CDATA входят в текст так же, как в BeautifulSoup
+        if data.startswith('CDATA[') and self._skip_from is None:
+            self._emit(data[len('CDATA['):])
+
+    def _emit(self, data: str):
+        """
+        Добавляет текст, схлопывая пробелы так же, как ' '.join(text.split())
+
+        Args:
+            data (str): Текстовый фрагмент
+        """
+        if not data:
+            return
+
+        words = data.split()
+        if not words:
+            self._pending_space = True
+            return
+
+        # Слово, разрезанное между фрагментами, склеивается без пробела
+        separator = ' ' if self.length and (self._pending_space or data[0].isspace()) else ''
+        piece = separator + ' '.join(words)
+        self._pending_space = data[-1].isspace()
+
+        self._hash.update(piece.encode('utf-8'))
+        self.length += len(piece)
+
+        if self.max_chars is None or self._kept < self.max_chars:
+            if self.max_chars is not None:
+                piece = piece[:self.max_chars - self._kept]
+            self._pieces.append(piece)
+            self._kept += len(piece)
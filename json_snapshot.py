@@ -0,0 +1,217 @@
+"""
+Модуль снимков JSON ответов
+Приводит JSON к каноническому виду, выбирает поля по селекторам в стиле JSONPath
+($.data.items[*].price) и сравнивает снимки полей без разбора HTML и посимвольного diff
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Префикс селектора полей JSON в правилах сайта (CSS и XPath с него не начинаются)
+JSON_PATH_PREFIX = '$'
+
+# Шаг селектора: .имя, .*, [номер], [*], ['имя'] или ["имя"]
+_STEP = re.compile(r"\.([A-Za-z_][\w-]*)|\.(\*)|\[(\d+|\*|'[^']*'|\"[^\"]*\")\]")
+
+# Имя поля, которое можно записать в пути через точку
+_PLAIN_NAME = re.compile(r'^[A-Za-z_][\w-]*$')
+
+
+def is_json_path(selector: str) -> bool:
+    """
+    Определяет, является ли селектор селектором полей JSON
+
+    Args:
+        selector (str): Селектор из правила
+
+    Returns:
+        bool: True для селектора вида $.поле
+    """
+    return selector.startswith(JSON_PATH_PREFIX)
+
+
+def parse_json_path(selector: str) -> List:
+    """
+    Разбирает селектор полей JSON
+
+    Args:
+        selector (str): Селектор вида $.data.items[*].price
+
+    Returns:
+        List: Шаги селектора (имя поля, номер элемента или '*')
+
+    Raises:
+        ValueError: Если селектор некорректен
+    """
+    if not is_json_path(selector):
+        raise ValueError(f"Селектор должен начинаться с {JSON_PATH_PREFIX}")
+
+    steps = []
+    position = len(JSON_PATH_PREFIX)
+    while position < len(selector):
+        step = _STEP.match(selector, position)
+        if not step:
+            raise ValueError(f"Некорректный шаг селектора в позиции {position}: {selector[position:]}")
+        name, star, bracket = step.groups()
+        if name is not None:
+            steps.append(name)
+        elif star is not None or bracket == '*':
+            steps.append('*')
+        elif bracket.isdigit():
+            steps.append(int(bracket))
+        else:
+            steps.append(bracket[1:-1])
+        position = step.end()
+    return steps
+
+
+def canonical_json(data: Any) -> str:
+    """
+    Каноническая запись JSON: отсортированные ключи, без лишних пробелов
+
+    Args:
+        data (Any): Разобранный JSON
+
+    Returns:
+        str: Каноническая строка
+    """
+    return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def _child_path(path: str, step) -> str:
+    """Путь дочернего элемента"""
+    if isinstance(step, int):
+        return f"{path}[{step}]"
+    if _PLAIN_NAME.match(step):
+        return f"{path}.{step}"
+    return f"{path}[{json.dumps(step, ensure_ascii=False)}]"
+
+
+def _children(path: str, value: Any) -> Iterable[Tuple[str, Any]]:
+    """Дочерние элементы объекта или массива"""
+    if isinstance(value, dict):
+        return ((_child_path(path, key), child) for key, child in value.items())
+    if isinstance(value, list):
+        return ((_child_path(path, index), child) for index, child in enumerate(value))
+    return ()
+
+
+def select(data: Any, selector: str) -> List[Tuple[str, Any]]:
+    """
+    Выбирает поля JSON по селектору
+
+    Args:
+        data (Any): Разобранный JSON
+        selector (str): Селектор вида $.data.items[*].price
+
+    Returns:
+        List[Tuple[str, Any]]: Пары (конкретный путь, значение)
+    """
+    nodes = [(JSON_PATH_PREFIX, data)]
+    for step in parse_json_path(selector):
+        selected = []
+        for path, value in nodes:
+            if step == '*':
+                selected.extend(_children(path, value))
+            elif isinstance(step, int):
+                if isinstance(value, list) and step < len(value):
+                    selected.append((_child_path(path, step), value[step]))
+            elif isinstance(value, dict) and step in value:
+                selected.append((_child_path(path, step), value[step]))
+        nodes = selected
+    return nodes
+
+
+def _leaves(path: str, value: Any, fields: Dict[str, Any]):
+    """Раскладывает значение на листовые поля (пустые объекты и массивы - тоже листья)"""
+    children = list(_children(path, value))
+    if not children:
+        fields[path] = value
+        return
+    for child_path, child in children:
+        _leaves(child_path, child, fields)
+
+
+def json_fields(data: Any, include: Iterable[str] = (), exclude: Iterable[str] = ()) -> Dict[str, Any]:
+    """
+    Формирует снимок полей JSON для сравнения
+
+    Без селекторов include снимок содержит все листовые поля документа,
+    с селекторами - только выбранные поля (объект или массив целиком как одно поле)
+
+    Args:
+        data (Any): Разобранный JSON
+        include (Iterable[str]): Селекторы учитываемых полей
+        exclude (Iterable[str]): Селекторы исключаемых полей
+
+    Returns:
+        Dict[str, Any]: Значения полей по путям
+    """
+    fields = {}
+    include = list(include)
+    if include:
+        for selector in include:
+            fields.update(select(data, selector))
+    else:
+        _leaves(JSON_PATH_PREFIX, data, fields)
+
+    excluded = [path for selector in exclude for path, _ in select(data, selector)]
+    if excluded:
+        prefixes = tuple(path + suffix for path in excluded for suffix in ('.', '['))
+        fields = {
+            path: value for path, value in fields.items()
+            if path not in excluded and not path.startswith(prefixes)
+        }
+    return fields
+
+
+def diff_fields(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Сравнивает снимки полей
+
+    Args:
+        old (Dict[str, Any]): Прошлый снимок
+        new (Dict[str, Any]): Текущий снимок
+
+    Returns:
+        Dict[str, List[str]]: Пути полей: changed, added и removed
+    """
+    return {
+        'changed': [path for path in new if path in old and canonical_json(old[path]) != canonical_json(new[path])],
+        'added': [path for path in new if path not in old],
+        'removed': [path for path in old if path not in new]
+    }
+
+
+def format_value(value: Any, limit: int = 80) -> str:
+    """
+    Короткая запись значения поля для уведомления
+
+    Args:
+        value (Any): Значение поля
+        limit (int): Предельная длина
+
+    Returns:
+        str: Запись значения
+    """
+    text = value if isinstance(value, str) else canonical_json(value)
+    return text if len(text) <= limit else text[:limit].rstrip() + '…'
+
+
+def load_snapshot(text: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Загружает сохраненный снимок полей
+
+    Args:
+        text (Optional[str]): Сохраненный контент сайта
+
+    Returns:
+        Optional[Dict[str, Any]]: Снимок или None, если сохранен не снимок JSON (например, текст HTML страницы)
+    """
+    if not text:
+        return None
+    try:
+        snapshot = json.loads(text)
+    except ValueError:
+        return None
+    return snapshot if isinstance(snapshot, dict) else None
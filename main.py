@@ -7,8 +7,7 @@ import sys
 import logging
 from datetime import datetime
 import config
-from database import SitesDatabase
-from site_monitor import SiteMonitor
+import metrics
 from telegram_bot import SiteMonitorBot
 from scheduler import MonitoringScheduler
 
@@ -26,9 +25,10 @@ class SiteMonitoringApp:
         
         # Инициализируем компоненты
         try:
-            self.database = SitesDatabase()
-            self.monitor = SiteMonitor(self.database)
+            # Бот, планировщик и проверки работают на одном event loop с общими базой и монитором
             self.bot = SiteMonitorBot()
+            self.database = self.bot.database
+            self.monitor = self.bot.monitor
             self.scheduler = MonitoringScheduler(self.bot)
             
             self.logger.info("Все компоненты успешно инициализированы")
@@ -89,7 +89,10 @@ class SiteMonitoringApp:
             if not config.TELEGRAM_BOT_TOKEN:
                 raise ValueError("TELEGRAM_BOT_TOKEN не найден в .env файле")
             
-            # Запускаем планировщик
+            # Запускаем эндпоинт метрик (если задан METRICS_PORT)
+            self.metrics_server = metrics.start_metrics_server(config.METRICS_PORT, config.METRICS_HOST)
+            
+            # Регистрируем планировщик (его цикл стартует вместе с ботом)
             self.scheduler.start_scheduler()
             self.logger.info("Планировщик запущен")
             
@@ -112,6 +115,10 @@ class SiteMonitoringApp:
                 self.scheduler.stop_scheduler()
                 self.logger.info("Планировщик остановлен")
             
+            # Останавливаем эндпоинт метрик
+            if getattr(self, 'metrics_server', None):
+                self.metrics_server.shutdown()
+            
             # Останавливаем бота
             if hasattr(self, 'bot') and self.bot.application:
                 self.bot.application.stop()
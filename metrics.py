@@ -0,0 +1,284 @@
+"""
+Модуль метрик мониторинга в формате Prometheus
+Собирает счетчики и гистограммы конвейера проверки и отдает их по HTTP
+"""
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Границы бакетов гистограмм по умолчанию (секунды)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _labels_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    """Преобразует метки в ключ словаря значений"""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    """Формирует строку меток в формате Prometheus"""
+    pairs = key + extra
+    if not pairs:
+        return ''
+    escaped = (
+        name + '="' + value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+class _Metric(ABC):
+    """
+    Базовый класс метрики
+    """
+    metric_type = 'untyped'
+
+    def __init__(self, name: str, documentation: str):
+        """
+        Инициализация метрики
+
+        Args:
+            name (str): Имя метрики
+            documentation (str): Описание метрики для HELP
+        """
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def render(self) -> List[str]:
+        """
+        Формирует строки метрики в текстовом формате Prometheus
+
+        Returns:
+            List[str]: Строки с HELP, TYPE и значениями
+        """
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            lines.extend(self._render_samples())
+        return lines
+
+    @abstractmethod
+    def _render_samples(self) -> List[str]:
+        """
+        Формирует строки значений метрики (вызывается под блокировкой метрики)
+
+        Returns:
+            List[str]: Строки значений без HELP и TYPE
+        """
+
+
+class Counter(_Metric):
+    """
+    Монотонно растущий счетчик
+    """
+    metric_type = 'counter'
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        """
+        Увеличивает счетчик
+
+        Args:
+            amount (float): Величина увеличения
+            **labels: Метки значения
+        """
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """
+    Значение, которое может как расти, так и уменьшаться
+    """
+    metric_type = 'gauge'
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: Dict[tuple, float] = {}
+
+    def set(self, value: float, **labels):
+        """
+        Устанавливает значение
+
+        Args:
+            value (float): Новое значение
+            **labels: Метки значения
+        """
+        with self._lock:
+            self._values[_labels_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        """Увеличивает значение"""
+        key = _labels_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        """Уменьшает значение"""
+        self.inc(-amount, **labels)
+
+    def _render_samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """
+    Гистограмма распределения значений (обычно длительностей в секундах)
+    """
+    metric_type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[tuple, Dict] = {}
+
+    def observe(self, value: float, **labels):
+        """
+        Добавляет наблюдение
+
+        Args:
+            value (float): Наблюдаемое значение
+            **labels: Метки значения
+        """
+        key = _labels_key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data['buckets'][i] += 1
+            data['sum'] += value
+            data['count'] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Контекстный менеджер, замеряющий длительность блока
+
+        Args:
+            **labels: Метки значения
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _render_samples(self) -> List[str]:
+        lines = []
+        for key, data in self._values.items():
+            for bound, count in zip(self.buckets, data['buckets']):
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', f'{bound:g}'),))} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, (('le', '+Inf'),))} {data['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {data['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {data['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр всех метрик приложения
+    """
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric):
+        """Добавляет метрику в реестр"""
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        """
+        Формирует текст всех метрик в формате Prometheus
+
+        Returns:
+            str: Текст для ответа на /metrics
+        """
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+# Метрики конвейера проверки сайтов
+CHECKS_TOTAL = Counter('site_monitor_checks_total', 'Количество проверок сайтов по статусу')
+FETCH_RETRIES_TOTAL = Counter('site_monitor_fetch_retries_total', 'Количество повторных загрузок страниц после временных ошибок')
+CIRCUIT_OPEN_HOSTS = Gauge('site_monitor_circuit_open_hosts', 'Количество хостов, проверки которых приостановлены после сбоев подряд')
+CLUSTER_WORKERS = Gauge('site_monitor_cluster_workers', 'Количество живых воркеров распределенной проверки')
+CLUSTER_TASKS_REBALANCED_TOTAL = Counter('site_monitor_cluster_tasks_rebalanced_total', 'Количество заданий, переназначенных при изменении состава воркеров')
+FETCH_SECONDS = Histogram('site_monitor_fetch_seconds', 'Время загрузки страницы')
+FETCH_BYTES_TOTAL = Counter('site_monitor_fetch_bytes_total', 'Объем тел загруженных ответов в байтах: по сети (wire) и после распаковки (decoded)')
+REDIRECTS_TOTAL = Counter('site_monitor_redirects_total', 'Количество редиректов при загрузке страниц: пройдено запросами (followed) и пропущено по кешу постоянных редиректов (cached)')
+PARSE_SECONDS = Histogram('site_monitor_parse_seconds', 'Время извлечения текста из HTML')
+DIFF_SECONDS = Histogram('site_monitor_diff_seconds', 'Время определения значительности изменений')
+WATCH_SCANS_TOTAL = Counter('site_monitor_watch_scans_total', 'Количество применений правил наблюдения по источнику результата (scan, cache, stored)')
+DB_READ_SECONDS = Histogram('site_monitor_db_read_seconds', 'Время чтения базы данных сайтов')
+DB_WRITE_SECONDS = Histogram('site_monitor_db_write_seconds', 'Время записи базы данных сайтов')
+NOTIFICATION_QUEUE_DEPTH = Gauge('site_monitor_notification_queue_depth', 'Количество уведомлений, ожидающих отправки')
+TELEGRAM_SEND_SECONDS = Histogram('site_monitor_telegram_send_seconds', 'Время отправки сообщения в Telegram')
+SCHEDULER_LAG_SECONDS = Histogram(
+    'site_monitor_scheduler_lag_seconds',
+    'Задержка фактического запуска плановой проверки относительно запланированного времени',
+    buckets=(0.1, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик HTTP запросов к эндпоинту метрик
+    """
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Не засоряем лог запросами Prometheus
+        pass
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1') -> Optional[ThreadingHTTPServer]:
+    """
+    Запускает HTTP сервер метрик в фоновом потоке
+
+    Args:
+        port (int): Порт сервера (0 - не запускать)
+        host (str): Адрес для прослушивания
+
+    Returns:
+        Optional[ThreadingHTTPServer]: Запущенный сервер или None если метрики отключены
+    """
+    if not port:
+        return None
+
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    logging.getLogger(__name__).info(f"Эндпоинт метрик доступен на http://{host}:{port}/metrics")
+    return server
@@ -0,0 +1,194 @@
+"""
+Модуль профилирования проверки сайтов
+Собирает разбивку времени (wall и CPU) по этапам проверки каждого сайта,
+опционально снимает cProfile или сэмплы стеков за весь прогон
+"""
+import cProfile
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Поддерживаемые режимы профилирования
+PROFILE_MODES = ('stages', 'cprofile', 'sample')
+
+# Ключ для этапов, относящихся ко всему прогону, а не к конкретному сайту
+RUN_KEY = '(прогон)'
+
+
+class CheckRunProfiler:
+    """
+    Профилировщик одного прогона проверки сайтов
+    """
+
+    def __init__(self, mode: str = 'stages', top_n: int = 10, output_dir: str = None,
+                 sample_interval: float = 0.01):
+        """
+        Инициализация профилировщика
+
+        Args:
+            mode (str): Режим ('stages' - только этапы, 'cprofile' - плюс дамп cProfile,
+                'sample' - плюс сэмплы стеков)
+            top_n (int): Сколько самых медленных сайтов и этапов выводить в лог
+            output_dir (str): Директория для дампов cProfile и сэмплов стеков
+            sample_interval (float): Интервал сэмплирования стеков в секундах
+        """
+        self.mode = mode if mode in PROFILE_MODES else 'stages'
+        self.top_n = top_n
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.logger = logging.getLogger(__name__)
+
+        # {сайт: {этап: {'wall': секунды, 'cpu': секунды}}}
+        self.sites: Dict[str, Dict[str, Dict[str, float]]] = {}
+        self.started_at = None
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.dump_file = None
+
+        self._profile = None
+        self._samples = Counter()
+        self._sampler = None
+        self._sampling = threading.Event()
+        self._target_thread = None
+        self._wall_started = 0.0
+        self._cpu_started = 0.0
+
+    def start(self):
+        """Начинает профилирование прогона"""
+        self.started_at = datetime.now()
+        self._wall_started = time.perf_counter()
+        self._cpu_started = time.process_time()
+
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        elif self.mode == 'sample':
+            self._target_thread = threading.get_ident()
+            self._sampling.set()
+            self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        """Завершает профилирование и сохраняет дампы, если они включены"""
+        self.wall_time = time.perf_counter() - self._wall_started
+        self.cpu_time = time.process_time() - self._cpu_started
+
+        if self._profile is not None:
+            self._profile.disable()
+            self.dump_file = self._output_path('prof')
+            if self.dump_file:
+                self._profile.dump_stats(self.dump_file)
+
+        if self._sampler is not None:
+            self._sampling.clear()
+            self._sampler.join()
+            self.dump_file = self._output_path('folded')
+            if self.dump_file:
+                # Формат "кадр;кадр;кадр количество" подходит для flamegraph.pl и speedscope
+                with open(self.dump_file, 'w', encoding='utf-8') as f:
+                    for stack, count in self._samples.most_common():
+                        f.write(f"{stack} {count}\n")
+
+    @contextmanager
+    def stage(self, site: Dict, name: str):
+        """
+        Контекстный менеджер, замеряющий этап проверки сайта
+
+        Args:
+            site (Dict): Данные сайта (None - этап всего прогона, например чтение базы)
+            name (str): Название этапа ('fetch', 'parse', 'hash', 'diff', 'db')
+        """
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield
+        finally:
+            key = f"{site['name']} ({site['url']})" if site else RUN_KEY
+            stages = self.sites.setdefault(key, {})
+            stage = stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            stage['wall'] += time.perf_counter() - wall_started
+            stage['cpu'] += time.thread_time() - cpu_started
+
+    def format_summary(self) -> str:
+        """
+        Формирует текстовую сводку по самым медленным сайтам и этапам
+
+        Returns:
+            str: Текст сводки для лога
+        """
+        lines = [
+            f"Профиль проверки ({self.mode}): {len(self.sites.keys() - {RUN_KEY})} сайтов, "
+            f"wall {self.wall_time:.2f}с, CPU {self.cpu_time:.2f}с"
+        ]
+
+        # Суммарное время по этапам
+        totals: Dict[str, Dict[str, float]] = {}
+        for stages in self.sites.values():
+            for name, stage in stages.items():
+                total = totals.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+                total['wall'] += stage['wall']
+                total['cpu'] += stage['cpu']
+
+        lines.append("Этапы:")
+        for name, total in sorted(totals.items(), key=lambda item: item[1]['wall'], reverse=True)[:self.top_n]:
+            lines.append(f"  {name}: wall {total['wall']:.3f}с, CPU {total['cpu']:.3f}с")
+
+        lines.append(f"Самые медленные сайты (топ-{self.top_n}):")
+        for site_name, stages in self._slowest_sites():
+            breakdown = ', '.join(
+                f"{name} {stage['wall']:.3f}/{stage['cpu']:.3f}"
+                for name, stage in sorted(stages.items(), key=lambda item: item[1]['wall'], reverse=True)
+            )
+            wall = sum(stage['wall'] for stage in stages.values())
+            lines.append(f"  {site_name}: {wall:.3f}с [{breakdown}]")
+
+        if self.dump_file:
+            lines.append(f"Дамп профиля: {self.dump_file}")
+
+        return '\n'.join(lines)
+
+    def _slowest_sites(self) -> List:
+        """Возвращает самые медленные сайты по суммарному wall-времени"""
+        return sorted(
+            self.sites.items(),
+            key=lambda item: sum(stage['wall'] for stage in item[1].values()),
+            reverse=True
+        )[:self.top_n]
+
+    def _sample_loop(self):
+        """Периодически снимает стек потока, выполняющего проверку"""
+        while self._sampling.is_set():
+            frame = sys._current_frames().get(self._target_thread)
+            if frame is not None:
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                self._samples[';'.join(reversed(stack))] += 1
+            time.sleep(self.sample_interval)
+
+    def _output_path(self, extension: str) -> Optional[str]:
+        """
+        Формирует путь к файлу дампа, создавая директорию при необходимости
+
+        Args:
+            extension (str): Расширение файла
+
+        Returns:
+            Optional[str]: Путь к файлу или None если директорию создать не удалось
+        """
+        if not self.output_dir:
+            return None
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+        except OSError as e:
+            self.logger.warning(f"Не удалось создать директорию профилей {self.output_dir}: {str(e)}")
+            return None
+        return os.path.join(self.output_dir, f"check-{self.started_at:%Y%m%d-%H%M%S}.{extension}")
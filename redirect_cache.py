@@ -0,0 +1,150 @@
+"""
+Модуль кеша постоянных редиректов
+Запоминает, куда ведут цепочки постоянных редиректов (301, 308), чтобы следующая
+проверка загружала конечный URL сразу, без лишних запросов к старым адресам
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Iterable, Optional, Tuple
+import requests
+import config
+
+# Статусы постоянных редиректов
+PERMANENT_REDIRECT_CODES = (301, 308)
+
+
+class RedirectCache:
+    """
+    Кеш постоянных редиректов по исходным URL сайтов
+
+    Исходный URL остается идентификатором сайта, кеш только подменяет адрес
+    загрузки. Запись действует REDIRECT_CACHE_TTL_HOURS часов, после чего
+    URL загружается по исходному адресу и цепочка редиректов проверяется заново
+    """
+
+    def __init__(self, state_file: str = None, ttl_hours: float = None):
+        """
+        Инициализация кеша
+
+        Args:
+            state_file (str): Путь к файлу кеша
+            ttl_hours (float): Время жизни записи в часах (0 - кеш отключен)
+        """
+        self.state_file = state_file or config.REDIRECT_CACHE_FILE
+        self.ttl_hours = config.REDIRECT_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours
+        self.entries = self._load_state()
+        self._lock = threading.Lock()
+
+    def _load_state(self) -> dict:
+        """
+        Загружает кеш из файла
+
+        Returns:
+            dict: Записи по исходным URL
+        """
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, FileNotFoundError):
+            return {}
+
+    def save(self):
+        """Сохраняет кеш в файл"""
+        state_dir = os.path.dirname(self.state_file)
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        with self._lock:
+            entries = dict(self.entries)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+
+    @property
+    def enabled(self) -> bool:
+        """Кеш включен (время жизни записи больше нуля)"""
+        return self.ttl_hours > 0
+
+    def resolve(self, url: str, now: datetime = None) -> Optional[Tuple[str, int]]:
+        """
+        Находит конечный URL постоянных редиректов
+
+        Args:
+            url (str): Исходный URL
+            now (datetime): Текущее время
+
+        Returns:
+            Optional[Tuple[str, int]]: (конечный URL, число пропускаемых редиректов)
+            или None, если записи нет или ее пора проверить заново
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self.entries.get(url)
+        if not entry:
+            return None
+
+        now = now or datetime.now()
+        if now - datetime.fromisoformat(entry['resolved_at']) >= timedelta(hours=self.ttl_hours):
+            return None
+        return entry['target'], entry['hops']
+
+    def learn(self, url: str, response: requests.Response, cached_hops: int = 0, now: datetime = None):
+        """
+        Запоминает постоянные редиректы из начала цепочки ответа
+
+        Редиректы после первого временного (302, 303, 307) не кешируются:
+        временный редирект нужно проходить при каждой проверке
+
+        Args:
+            url (str): Исходный URL
+            response (requests.Response): Итоговый ответ с историей редиректов
+            cached_hops (int): Сколько редиректов пропущено по кешу (запрос шел на конечный URL записи)
+            now (datetime): Текущее время
+        """
+        if not self.enabled or response.status_code >= 400:
+            return
+
+        urls = [redirect.url for redirect in response.history] + [response.url]
+        hops = 0
+        for redirect in response.history:
+            if redirect.status_code not in PERMANENT_REDIRECT_CODES:
+                break
+            hops += 1
+
+        with self._lock:
+            if hops:
+                # Время проверки обновляется только при загрузке по исходному URL:
+                # иначе запись никогда бы не проверялась заново
+                resolved_at = self.entries[url]['resolved_at'] if cached_hops and url in self.entries else None
+                self.entries[url] = {
+                    'target': urls[hops],
+                    'hops': cached_hops + hops,
+                    'resolved_at': resolved_at or (now or datetime.now()).isoformat()
+                }
+            elif not cached_hops:
+                # Исходный URL больше не перенаправляет постоянно
+                self.entries.pop(url, None)
+
+    def invalidate(self, url: str):
+        """
+        Удаляет запись (конечный URL перестал отвечать)
+
+        Args:
+            url (str): Исходный URL
+        """
+        with self._lock:
+            self.entries.pop(url, None)
+
+    def prune(self, urls: Iterable[str]):
+        """
+        Удаляет записи URL, которых больше нет среди проверяемых сайтов
+
+        Args:
+            urls (Iterable[str]): URL проверяемых сайтов
+        """
+        urls = set(urls)
+        with self._lock:
+            for url in list(self.entries):
+                if url not in urls:
+                    del self.entries[url]
@@ -0,0 +1,159 @@
+"""
+Модуль журнала прогона проверки
+Записывает ход прогона (результаты проверенных сайтов, подготовленные и отправленные
+уведомления и сводки) в JSON Lines файл, чтобы прерванный прогон можно было продолжить после перезапуска
+"""
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, Optional
+import config
+from alerts import AlertStateEngine
+
+
+class RunJournal:
+    """
+    Журнал текущего прогона проверки
+
+    Каждая запись дописывается отдельной строкой, поэтому сохранение результата
+    не требует перезаписи всего файла, а оборванная при сбое последняя строка
+    просто пропускается при чтении. После завершения прогона файл удаляется
+    """
+
+    def __init__(self, journal_file: str = None):
+        """
+        Инициализация журнала
+
+        Args:
+            journal_file (str): Путь к файлу журнала
+        """
+        self.journal_file = journal_file or config.RUN_JOURNAL_FILE
+
+    def load(self) -> Optional[Dict]:
+        """
+        Загружает незавершенный прогон
+
+        Returns:
+            Optional[Dict]: Прогон с ключами run_id, started_at, results (по ключам сайтов),
+            notifications (по пользователям, уже обработанным в прогоне), sent,
+            digests (None пока проверка не завершена) и digests_sent
+            или None если незавершенного прогона нет
+        """
+        try:
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return None
+
+        run = None
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Строка, которую не успели дописать до сбоя
+                continue
+
+            kind = record.pop('type', None)
+            if kind == 'start':
+                run = self._new_run(record['run_id'], record['started_at'])
+            elif run is None:
+                continue
+            elif kind == 'result':
+                run['results'][record.pop('site_key')] = record
+            elif kind == 'notifications':
+                run['notifications'].update((int(user_id), text) for user_id, text in record['items'].items())
+            elif kind == 'checked':
+                run['digests'] = {int(user_id): text for user_id, text in record['digests'].items()}
+            elif kind == 'sent':
+                run['digests_sent' if record.get('digest') else 'sent'].add(record['user_id'])
+
+        return run
+
+    @staticmethod
+    def _new_run(run_id: str, started_at: str) -> Dict:
+        """Пустой прогон в формате load()"""
+        return {
+            'run_id': run_id,
+            'started_at': started_at,
+            'results': {},
+            'notifications': {},
+            'sent': set(),
+            'digests': None,
+            'digests_sent': set()
+        }
+
+    def start(self) -> Dict:
+        """
+        Начинает новый прогон (предыдущий журнал перезаписывается)
+
+        Returns:
+            Dict: Пустой прогон в формате load()
+        """
+        journal_dir = os.path.dirname(self.journal_file)
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+
+        run = self._new_run(uuid.uuid4().hex, datetime.now().isoformat())
+        with open(self.journal_file, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'type': 'start', 'run_id': run['run_id'], 'started_at': run['started_at']}) + '\n')
+        return run
+
+    def record_result(self, status: str, result: Dict):
+        """
+        Записывает результат проверки сайта
+
+        Args:
+            status (str): Категория результата
+            result (Dict): Результат проверки с данными сайта
+        """
+        self._append({
+            'type': 'result',
+            'site_key': AlertStateEngine.site_key(result['site']),
+            'status': status,
+            'message': result['message'],
+            'content_hash': result['content_hash'],
+            'timings': result['timings'],
+            'retries': result.get('retries', 0)
+        })
+
+    def record_notifications(self, notifications: Dict[int, str]):
+        """
+        Записывает уведомления пользователей, чьи сайты уже проверены
+
+        Args:
+            notifications (Dict[int, str]): Тексты уведомлений по пользователям
+                (пустой текст - пользователь обработан, уведомлять не о чем)
+        """
+        self._append({'type': 'notifications', 'items': notifications})
+
+    def record_checked(self, digests: Dict[int, str]):
+        """
+        Отмечает завершение проверки всех сайтов и записывает подготовленные сводки
+
+        Args:
+            digests (Dict[int, str]): Тексты сводок по пользователям
+        """
+        self._append({'type': 'checked', 'digests': digests})
+
+    def record_sent(self, user_id: int, digest: bool = False):
+        """
+        Отмечает отправленное уведомление
+
+        Args:
+            user_id (int): ID пользователя
+            digest (bool): Отправлена сводка
+        """
+        self._append({'type': 'sent', 'user_id': user_id, 'digest': digest})
+
+    def finish(self):
+        """Завершает прогон и удаляет журнал"""
+        try:
+            os.remove(self.journal_file)
+        except FileNotFoundError:
+            pass
+
+    def _append(self, record: Dict):
+        """Дописывает запись в журнал"""
+        with open(self.journal_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
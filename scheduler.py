@@ -1,18 +1,22 @@
 """
 Модуль планировщика задач для автоматической проверки сайтов
 Запускает проверку каждые 6 часов и отправляет уведомления в Telegram
+Работает на event loop бота: ожидание следующего прогона, уведомления и учет
+состояний оповещений выполняются там же, где обрабатываются команды
 """
-import schedule
-import time
-import threading
-from datetime import datetime
+import asyncio
+import html
+from datetime import datetime, timedelta
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional
 import config
+import metrics
 from database import SitesDatabase
 from site_monitor import SiteMonitor
 from telegram_bot import SiteMonitorBot
-import asyncio
+from alerts import AlertStateEngine
+from cluster import ClusterCoordinator
+from run_journal import RunJournal
 
 class MonitoringScheduler:
     """
@@ -30,15 +34,23 @@ class MonitoringScheduler:
         self.database = bot.database
         self.monitor = bot.monitor
         self.running = False
+        self.next_run: Optional[datetime] = None
         
         # Настройка логирования
         self.logger = logging.getLogger(__name__)
         
-        # Словарь для отслеживания последних уведомлений об ошибках
-        self.last_error_notifications = {}
+        # Состояния сайтов для уведомлений только о переходах (ok→error, error→ok, изменения)
+        self.alerts = AlertStateEngine()
+        
+        # В режиме координатора проверки выполняют воркеры (python cluster.py)
+        self.coordinator = ClusterCoordinator(self.database, self.monitor) if config.CLUSTER_MODE == 'coordinator' else None
+        
+        # Журнал текущего прогона для продолжения после перезапуска
+        self.journal = RunJournal()
+        self._active_run: Optional[asyncio.Event] = None
     
     def start_scheduler(self):
-        """Запускает планировщик задач"""
+        """Запускает планировщик задач (цикл стартует вместе с event loop бота)"""
         if self.running:
             self.logger.warning("Планировщик уже запущен!")
             return
@@ -46,95 +58,325 @@ class MonitoringScheduler:
         self.running = True
         self.logger.info("Запускаю планировщик мониторинга...")
         
-        # Планируем задачу каждые 6 часов
-        schedule.every(config.CHECK_INTERVAL_HOURS).hours.do(self.run_monitoring_check)
-        
-        # Запускаем планировщик в отдельном потоке
-        scheduler_thread = threading.Thread(target=self._run_scheduler_loop, daemon=True)
-        scheduler_thread.start()
+        # Планируем задачу каждые 6 часов, а прерванный прогон продолжаем сразу
+        unfinished = self.journal.load()
+        if unfinished:
+            self.next_run = datetime.now()
+            self.logger.info(
+                f"Найден незавершенный прогон от {unfinished['started_at'][:19]} "
+                f"(проверено сайтов: {len(unfinished['results'])}), продолжаю его"
+            )
+        else:
+            self.next_run = datetime.now() + timedelta(hours=config.CHECK_INTERVAL_HOURS)
+        self.bot.add_background_job(self._run_scheduler_loop)
+        if config.AVAILABILITY_CHECK_INTERVAL_MINUTES > 0:
+            self.bot.add_background_job(self._run_availability_loop)
+        self.bot.add_shutdown_hook(self.drain)
         
-        self.logger.info(f"Планировщик запущен. Следующая проверка через {config.CHECK_INTERVAL_HOURS} часов")
+        self.logger.info(f"Планировщик запущен. Следующая проверка: {self.get_next_check_time()}")
     
     def stop_scheduler(self):
         """Останавливает планировщик задач"""
         self.running = False
-        schedule.clear()
         self.logger.info("Планировщик остановлен")
     
-    def _run_scheduler_loop(self):
+    async def drain(self):
+        """
+        Останавливает планировщик при завершении приложения: текущий прогон не начинает
+        новых загрузок и ждет завершения текущей не дольше SHUTDOWN_DRAIN_SECONDS.
+        Ход прогона остается в журнале и продолжается после перезапуска
+        """
+        self.stop_scheduler()
+        self.monitor.stop_event.set()
+        
+        if self._active_run is None or self._active_run.is_set():
+            return
+        
+        self.logger.info(f"Жду остановки текущего прогона (до {config.SHUTDOWN_DRAIN_SECONDS:g}с)...")
+        try:
+            await asyncio.wait_for(self._active_run.wait(), config.SHUTDOWN_DRAIN_SECONDS)
+        except asyncio.TimeoutError:
+            self.logger.warning("Прогон не остановился вовремя, он будет продолжен после перезапуска")
+    
+    async def _run_scheduler_loop(self):
         """Основной цикл планировщика"""
         while self.running:
-            schedule.run_pending()
-            time.sleep(60)  # Проверяем каждую минуту
+            await asyncio.sleep(max(0.0, (self.next_run - datetime.now()).total_seconds()))
+            if self.running:
+                await self._run_scheduled_check()
+    
+    async def _run_availability_loop(self):
+        """Цикл частой проверки сайтов в режиме availability"""
+        while self.running:
+            await asyncio.sleep(config.AVAILABILITY_CHECK_INTERVAL_MINUTES * 60)
+            if self.running:
+                await self.run_availability_check()
+    
+    def _in_main_run(self, site: Dict) -> bool:
+        """
+        Проверяет, входит ли сайт в основной прогон (сайты в режиме availability
+        при заданном AVAILABILITY_CHECK_INTERVAL_MINUTES проверяются своим циклом)
+        
+        Args:
+            site (Dict): Данные сайта
+            
+        Returns:
+            bool: True если сайт проверяется основным прогоном
+        """
+        return not (config.AVAILABILITY_CHECK_INTERVAL_MINUTES > 0 and self.monitor.check_mode(site) == 'availability')
+    
+    async def run_availability_check(self):
+        """
+        Проверяет доступность сайтов в режиме availability и уведомляет о сбоях и восстановлениях
+        
+        Такая проверка не загружает страницы и не ведет журнал прогона: прерванная
+        проверка просто повторится через AVAILABILITY_CHECK_INTERVAL_MINUTES
+        """
+        try:
+            results = await self.bot.run_check(
+                self.monitor.check_all_sites, lambda site: not self._in_main_run(site)
+            )
+            
+            results_by_user = {}
+            for status, status_results in results.items():
+                for result in status_results:
+                    user_id = result['site'].get('user_id')
+                    if user_id:
+                        results_by_user.setdefault(user_id, {status: [] for status in results})[status].append(result)
+            
+            for user_id, user_results in results_by_user.items():
+                notification = self._format_user_notification(self.alerts.process(user_id, user_results))
+                if notification:
+                    try:
+                        await self._send_telegram_notification(user_id, notification)
+                    except Exception as e:
+                        self.logger.error(f"Ошибка при отправке уведомления пользователю {user_id}: {str(e)}")
+            self.alerts.save()
+            
+        except Exception as e:
+            self.logger.error(f"Ошибка при проверке доступности: {str(e)}")
     
-    def run_monitoring_check(self):
+    async def _run_scheduled_check(self):
+        """
+        Запускает плановую проверку, замеряя задержку запуска относительно расписания
+        """
+        lag = (datetime.now() - self.next_run).total_seconds()
+        metrics.SCHEDULER_LAG_SECONDS.observe(max(lag, 0.0))
+        
+        await self.run_monitoring_check()
+        
+        # Как и раньше, интервал отсчитывается от завершения прогона
+        self.next_run = datetime.now() + timedelta(hours=config.CHECK_INTERVAL_HOURS)
+    
+    async def run_monitoring_check(self):
         """
         Выполняет проверку всех активных сайтов
         Эта функция вызывается планировщиком каждые 6 часов
+        
+        Уведомление пользователю отправляется, как только проверены все его сайты,
+        не дожидаясь конца прогона. Результаты сайтов, подготовленные и отправленные
+        уведомления записываются в журнал прогона; если предыдущий прогон был прерван,
+        проверяются только оставшиеся сайты и отправляются только неотправленные уведомления
         """
+        self._active_run = asyncio.Event()
         try:
-            self.logger.info("Запускаю плановую проверку сайтов...")
+            run = self.journal.load()
+            if run:
+                self.logger.info(f"Продолжаю прерванный прогон {run['run_id']}...")
+            else:
+                self.logger.info("Запускаю плановую проверку сайтов...")
+                run = self.journal.start()
             
             # Получаем все активные сайты
             active_sites = self.database.get_active_sites()
             
             if not active_sites:
                 self.logger.info("Нет активных сайтов для проверки")
+                self.journal.finish()
                 return
             
-            # Группируем сайты по пользователям для отправки уведомлений
-            sites_by_user = {}
-            for site in active_sites:
-                user_id = site.get('user_id')
-                if user_id:
-                    if user_id not in sites_by_user:
-                        sites_by_user[user_id] = []
-                    sites_by_user[user_id].append(site)
+            # Уведомления, подготовленные до перерыва, но не отправленные
+            await self._send_notifications({
+                user_id: text for user_id, text in run['notifications'].items()
+                if text and user_id not in run['sent']
+            })
             
-            # Проверяем все сайты
-            results = self.monitor.check_all_sites()
-            
-            # Отправляем уведомления пользователям
-            self._send_notifications_to_users(sites_by_user, results)
+            digests = run['digests']
+            if digests is None:
+                results = await self._check_sites([site for site in active_sites if self._in_main_run(site)], run)
+                if results is None:
+                    return
+                
+                self.logger.info(f"Плановая проверка завершена. Результаты: OK={len(results['ok'])}, Errors={len(results['error'])}, Changed={len(results['changed'])}, Slow={len(results['slow'])}")
+                
+                digests = self._prepare_digests()
+                self.journal.record_checked(digests)
+                self.alerts.prune(active_sites)
+                self.alerts.save()
             
-            self.logger.info(f"Плановая проверка завершена. Результаты: OK={len(results['ok'])}, Errors={len(results['error'])}, Changed={len(results['changed'])}")
+            # Отправляем сводки пользователям
+            await self._send_notifications(
+                {user_id: text for user_id, text in digests.items() if user_id not in run['digests_sent']},
+                digest=True
+            )
+            self.journal.finish()
             
         except Exception as e:
             self.logger.error(f"Ошибка при плановой проверке: {str(e)}")
+        
+        finally:
+            self._active_run.set()
     
-    def _send_notifications_to_users(self, sites_by_user: Dict[int, List], results: Dict[str, List]):
+    async def _check_sites(self, active_sites: List[Dict], run: Dict) -> Optional[Dict[str, List]]:
         """
-        Отправляет уведомления пользователям о результатах проверки
+        Проверяет сайты, еще не проверенные в текущем прогоне, и уведомляет каждого
+        пользователя, как только проверены все его сайты
         
         Args:
-            sites_by_user (Dict[int, List]): Сайты, сгруппированные по пользователям
-            results (Dict[str, List]): Результаты проверки
+            active_sites (List[Dict]): Активные сайты
+            run (Dict): Текущий прогон из журнала
+            
+        Returns:
+            Optional[Dict[str, List]]: Результаты всего прогона или None если прогон остановлен
         """
-        for user_id, user_sites in sites_by_user.items():
-            try:
-                # Фильтруем результаты для конкретного пользователя
-                user_results = {
-                    'ok': [r for r in results['ok'] if r['site']['user_id'] == user_id],
-                    'error': [r for r in results['error'] if r['site']['user_id'] == user_id],
-                    'changed': [r for r in results['changed'] if r['site']['user_id'] == user_id]
+        done = run['results']
+        results = {status: [] for status in ('ok', 'error', 'changed', 'slow')}
+        
+        # Результаты пользователей, еще не уведомленных в этом прогоне, и число их непроверенных сайтов
+        results_by_user = {}
+        remaining = {}
+        for site in active_sites:
+            entry = done.get(AlertStateEngine.site_key(site))
+            if entry:
+                # Результат, полученный до перерыва (для сайтов, которые еще отслеживаются)
+                status = entry['status']
+                entry = {
+                    'site': site,
+                    'message': entry['message'],
+                    'content_hash': entry['content_hash'],
+                    'timings': entry['timings'],
+                    'retries': entry['retries']
                 }
-                
-                # Формируем уведомление для пользователя
-                notification = self._format_user_notification(user_results)
-                
-                # Отправляем уведомление
-                if notification:
-                    self._send_telegram_notification(user_id, notification)
+                results[status].append(entry)
+            
+            user_id = site.get('user_id')
+            if not user_id or user_id in run['notifications']:
+                continue
+            user_results = results_by_user.setdefault(user_id, {status: [] for status in results})
+            remaining.setdefault(user_id, 0)
+            if entry:
+                user_results[status].append(entry)
+            else:
+                remaining[user_id] += 1
+        
+        loop = asyncio.get_running_loop()
+        notifications = []
+        
+        def notify(user_id: int):
+            notifications.append(asyncio.ensure_future(self._notify_user(user_id, results_by_user.pop(user_id))))
+        
+        def on_result(status: str, entry: Dict):
+            # Вызывается в потоке проверки: пишет журнал и передает event loop готовых пользователей
+            self.journal.record_result(status, entry)
+            user_id = entry['site'].get('user_id')
+            if remaining.get(user_id):
+                results_by_user[user_id][status].append(entry)
+                remaining[user_id] -= 1
+                if not remaining[user_id]:
+                    loop.call_soon_threadsafe(notify, user_id)
+        
+        for user_id in [user_id for user_id, count in remaining.items() if not count]:
+            notify(user_id)
+        
+        def site_filter(site: Dict) -> bool:
+            return self._in_main_run(site) and AlertStateEngine.site_key(site) not in done
+        
+        # Проверяем сайты (загрузка страниц блокирующая - выполняется в пуле потоков бота)
+        check = self.coordinator.check_all_sites if self.coordinator else self.monitor.check_all_sites
+        try:
+            checked = await self.bot.run_check(check, site_filter, on_result)
+        finally:
+            # Даем запланированным из потока проверки уведомлениям начаться и дожидаемся их
+            await asyncio.sleep(0)
+            await asyncio.gather(*notifications)
+        
+        if self.monitor.stop_event.is_set():
+            self.alerts.save()
+            self.logger.info("Прогон остановлен, он будет продолжен после перезапуска")
+            return None
+        
+        # Пользователи, часть сайтов которых не была проверена (например, удалена во время прогона)
+        await asyncio.gather(*(self._notify_user(user_id, user_results) for user_id, user_results in list(results_by_user.items())))
+        
+        for status, entries in checked.items():
+            results[status].extend(entries)
+        return results
+    
+    async def _notify_user(self, user_id: int, user_results: Dict[str, List]):
+        """
+        Уведомляет пользователя о результатах проверки его сайтов
+        
+        Уведомление отправляется только о переходах состояний сайтов (см. AlertStateEngine),
+        а в режиме сводок события копятся до сводки
+        
+        Args:
+            user_id (int): ID пользователя
+            user_results (Dict[str, List]): Результаты проверки сайтов пользователя
+        """
+        notification = self._format_user_notification(self.alerts.process(user_id, user_results))
+        
+        # Пустое уведомление тоже записывается: пользователь обработан и не будет обработан повторно
+        self.journal.record_notifications({user_id: notification})
+        if notification:
+            await self._send_notifications({user_id: notification})
+    
+    def _prepare_digests(self) -> Dict[int, str]:
+        """
+        Готовит сводки пользователям, у которых наступило время сводки (DIGEST_INTERVAL_HOURS)
+        
+        Returns:
+            Dict[int, str]: Тексты сводок по пользователям
+        """
+        digests = {}
+        for user_id, events in self.alerts.pop_due_digests().items():
+            digest = self._format_user_notification(events, digest=True)
+            if digest:
+                digests[user_id] = digest
+        return digests
+    
+    async def _send_notifications(self, notifications: Dict[int, str], digest: bool = False):
+        """
+        Отправляет подготовленные уведомления, отмечая в журнале прогона успешно отправленные
+        
+        Неотправленное уведомление остается в журнале и будет отправлено повторно,
+        если прогон продолжится после перезапуска
+        
+        Args:
+            notifications (Dict[int, str]): Тексты уведомлений по пользователям
+            digest (bool): Отправляются сводки
+        """
+        metrics.NOTIFICATION_QUEUE_DEPTH.inc(len(notifications))
+        
+        for user_id, notification in notifications.items():
+            try:
+                await self._send_telegram_notification(user_id, notification)
                 
             except Exception as e:
                 self.logger.error(f"Ошибка при отправке уведомления пользователю {user_id}: {str(e)}")
+            
+            else:
+                self.journal.record_sent(user_id, digest)
+            
+            finally:
+                metrics.NOTIFICATION_QUEUE_DEPTH.dec()
     
-    def _format_user_notification(self, user_results: Dict[str, List]) -> str:
+    def _format_user_notification(self, user_results: Dict[str, List], digest: bool = False) -> str:
         """
         Формирует текст уведомления для пользователя
         
         Args:
-            user_results (Dict[str, List]): Результаты проверки для пользователя
+            user_results (Dict[str, List]): События по видам ('error', 'recovered', 'changed', 'slow')
+            digest (bool): Уведомление является периодической сводкой
             
         Returns:
             str: Текст уведомления или пустая строка если нечего уведомлять
@@ -144,62 +386,64 @@ class MonitoringScheduler:
         if total_sites == 0:
             return ""
         
-        notification = f"🔔 Результаты проверки сайтов ({total_sites}):\n\n"
-        
-        # Добавляем информацию об ошибках
-        if user_results['error']:
-            notification += "❌ Проблемы с сайтами:\n"
-            for result in user_results['error']:
-                site = result['site']
-                notification += f"  • {site['name']}: {result['message']}\n"
-            notification += "\n"
+        if digest:
+            notification = f"📰 Сводка за {config.DIGEST_INTERVAL_HOURS:g} ч ({total_sites} событий):\n\n"
+        else:
+            notification = f"🔔 Изменения состояния сайтов ({total_sites}):\n\n"
         
-        # Добавляем информацию об изменениях
-        if user_results['changed']:
-            notification += "🔄 Сайты с изменениями:\n"
-            for result in user_results['changed']:
-                site = result['site']
-                notification += f"  • {site['name']}: {result['message']}\n"
-            notification += "\n"
+        sections = (
+            ('error', "❌ Проблемы с сайтами:"),
+            ('recovered', "✅ Снова доступны:"),
+            ('changed', "🔄 Сайты с изменениями:"),
+            # Превышено SLO по времени ответа
+            ('slow', "🐢 Медленные сайты:")
+        )
         
-        # Добавляем общую статистику
-        working_sites = len(user_results['ok'])
-        if working_sites > 0:
-            notification += f"✅ Работают нормально: {working_sites} сайтов\n"
+        for event, title in sections:
+            if user_results.get(event):
+                notification += f"{title}\n"
+                for result in user_results[event]:
+                    site = result['site']
+                    # Сообщение может содержать фрагмент текста страницы - экранируем для HTML разметки
+                    message = html.escape(result['message']).replace('\n', '\n    ')
+                    notification += f"  • {html.escape(site['name'])}: {message}\n"
+                notification += "\n"
         
-        notification += f"\n🕐 Следующая проверка через {config.CHECK_INTERVAL_HOURS} часов"
+        if not digest:
+            notification += f"🕐 Следующая проверка через {config.CHECK_INTERVAL_HOURS} часов"
         
-        return notification
+        return notification.rstrip()
     
-    def _send_telegram_notification(self, user_id: int, message: str):
+    async def _send_telegram_notification(self, user_id: int, message: str):
         """
         Отправляет уведомление в Telegram пользователю
         
         Args:
             user_id (int): ID пользователя в Telegram
             message (str): Текст уведомления
+            
+        Raises:
+            RuntimeError: Бот не инициализирован
+            telegram.error.TelegramError: Ошибка отправки сообщения
         """
-        try:
-            # Используем бота для отправки сообщения
-            if self.bot.application:
-                asyncio.run(self.bot.application.bot.send_message(
-                    chat_id=user_id,
-                    text=message,
-                    parse_mode='HTML'
-                ))
-                self.logger.info(f"Уведомление отправлено пользователю {user_id}")
-            else:
-                self.logger.warning("Бот не инициализирован, не могу отправить уведомление")
-                
-        except Exception as e:
-            self.logger.error(f"Ошибка при отправке уведомления пользователю {user_id}: {str(e)}")
+        # Используем бота для отправки сообщения
+        if not self.bot.application:
+            raise RuntimeError("Бот не инициализирован, не могу отправить уведомление")
+        
+        with metrics.TELEGRAM_SEND_SECONDS.time():
+            await self.bot.application.bot.send_message(
+                chat_id=user_id,
+                text=message,
+                parse_mode='HTML'
+            )
+        self.logger.info(f"Уведомление отправлено пользователю {user_id}")
     
-    def run_manual_check(self):
+    async def run_manual_check(self):
         """
         Запускает проверку вручную (для тестирования)
         """
         self.logger.info("Запускаю ручную проверку...")
-        self.run_monitoring_check()
+        await self.run_monitoring_check()
     
     def get_next_check_time(self) -> str:
         """
@@ -208,9 +452,8 @@ class MonitoringScheduler:
         Returns:
             str: Время следующей проверки в читаемом формате
         """
-        next_run = schedule.next_run()
-        if next_run:
-            return next_run.strftime("%Y-%m-%d %H:%M:%S")
+        if self.running and self.next_run:
+            return self.next_run.strftime("%Y-%m-%d %H:%M:%S")
         return "Не запланировано"
     
     def get_scheduler_status(self) -> Dict:
@@ -0,0 +1,177 @@
+"""
+Модуль импорта и экспорта списка сайтов
+Разбирает файлы со списком URL (txt, CSV, JSON) и формирует файл выгрузки
+"""
+import csv
+import io
+import json
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Поддерживаемые форматы выгрузки
+EXPORT_FORMATS = ('csv', 'json', 'txt')
+
+
+def normalize_url(url: str) -> Optional[str]:
+    """
+    Приводит URL к виду для мониторинга и проверяет его корректность
+
+    Args:
+        url (str): URL, введенный пользователем
+
+    Returns:
+        Optional[str]: URL со схемой или None если URL некорректен
+    """
+    url = url.strip()
+    if not url or any(char.isspace() for char in url):
+        return None
+
+    # Простая валидация URL
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+
+    try:
+        parts = urlsplit(url)
+        hostname = parts.hostname
+        # Обращение к port проверяет, что порт указан корректно
+        parts.port
+    except ValueError:
+        return None
+
+    if not hostname or ('.' not in hostname and hostname != 'localhost'):
+        return None
+
+    return url
+
+
+def parse_sites_file(data: bytes, filename: str = '') -> Tuple[List[Tuple[str, Optional[str]]], int]:
+    """
+    Разбирает файл со списком сайтов за один проход, отбрасывая некорректные URL и дубликаты
+
+    Поддерживаемые форматы:
+        txt  - URL и необязательное название через пробел, по одному сайту в строке
+        CSV  - URL в первой колонке, название во второй (строка заголовка пропускается)
+        JSON - список строк или объектов {"url": ..., "name": ...}
+
+    Args:
+        data (bytes): Содержимое файла
+        filename (str): Имя файла (по расширению определяется формат)
+
+    Returns:
+        Tuple[List[Tuple[str, Optional[str]]], int]: (пары (URL, название), количество отброшенных строк)
+
+    Raises:
+        ValueError: Если файл не удалось прочитать
+    """
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValueError("Файл должен быть в кодировке UTF-8")
+
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    stripped = text.lstrip()
+
+    if extension == 'json' or (not extension and stripped[:1] in ('[', '{')):
+        raw_entries = _parse_json(text)
+    elif extension == 'csv':
+        raw_entries = _parse_csv(text)
+    else:
+        raw_entries = _parse_txt(text)
+
+    entries = []
+    seen = set()
+    rejected = 0
+
+    for raw_url, name in raw_entries:
+        url = normalize_url(raw_url)
+        if not url:
+            rejected += 1
+            continue
+        if url in seen:
+            continue
+        seen.add(url)
+        entries.append((url, name or None))
+
+    return entries, rejected
+
+
+def _parse_json(text: str) -> List[Tuple[str, Optional[str]]]:
+    """Разбирает JSON список сайтов"""
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Некорректный JSON: {e.msg}")
+
+    if isinstance(items, dict):
+        items = items.get('sites', [])
+    if not isinstance(items, list):
+        raise ValueError("JSON должен содержать список сайтов")
+
+    entries = []
+    for item in items:
+        if isinstance(item, str):
+            entries.append((item, None))
+        elif isinstance(item, dict) and isinstance(item.get('url'), str):
+            name = item.get('name')
+            entries.append((item['url'], name if isinstance(name, str) else None))
+        else:
+            entries.append(('', None))
+    return entries
+
+
+def _parse_csv(text: str) -> List[Tuple[str, Optional[str]]]:
+    """Разбирает CSV список сайтов"""
+    entries = []
+    for index, row in enumerate(csv.reader(io.StringIO(text))):
+        if not row or not row[0].strip():
+            continue
+        if index == 0 and row[0].strip().lower() == 'url':
+            continue
+        entries.append((row[0], row[1].strip() if len(row) > 1 else None))
+    return entries
+
+
+def _parse_txt(text: str) -> List[Tuple[str, Optional[str]]]:
+    """Разбирает текстовый список сайтов"""
+    entries = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split(None, 1)
+        entries.append((parts[0], parts[1].strip() if len(parts) > 1 else None))
+    return entries
+
+
+def export_sites(sites: List[Dict], fmt: str = 'csv') -> Tuple[bytes, str]:
+    """
+    Формирует файл выгрузки сайтов пользователя
+
+    Args:
+        sites (List[Dict]): Сайты пользователя
+        fmt (str): Формат файла ('csv', 'json' или 'txt')
+
+    Returns:
+        Tuple[bytes, str]: (содержимое файла, имя файла)
+    """
+    if fmt == 'json':
+        payload = [
+            {'url': site['url'], 'name': site['name'], 'is_active': site.get('is_active', True)}
+            for site in sites
+        ]
+        return json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8'), 'sites.json'
+
+    if fmt == 'txt':
+        lines = [site['url'] if site['name'] == site['url'] else f"{site['url']} {site['name']}" for site in sites]
+        return ('\n'.join(lines) + '\n').encode('utf-8'), 'sites.txt'
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['url', 'name', 'is_active', 'last_status', 'last_check'])
+    for site in sites:
+        writer.writerow([
+            site['url'], site['name'], site.get('is_active', True),
+            site.get('last_status') or '', site.get('last_check') or ''
+        ])
+    # BOM, чтобы Excel открывал кириллицу корректно
+    return output.getvalue().encode('utf-8-sig'), 'sites.csv'
@@ -3,13 +3,46 @@
 Проверяет доступность сайтов и детектирует изменения в контенте
 """
 import hashlib
+import heapq
+import itertools
+import json
+import logging
+import math
+import random
 import requests
+import threading
 import time
-from typing import Dict, Tuple, Optional
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple, Optional
+from urllib.parse import urlsplit, urlunsplit
 from bs4 import BeautifulSoup
-import difflib
 import config
+import metrics
+from circuit_breaker import HostCircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from content_rules import extract_fragments, normalize_text
 from database import SitesDatabase
+from fair_queue import FairQueue
+from fetcher import PageFetcher, REDIRECT_COUNTERS, TRANSFER_COUNTERS, is_json_response
+from html_stream import StreamingTextExtractor
+from json_snapshot import canonical_json, diff_fields, format_value, is_json_path, json_fields, load_snapshot
+from text_diff import WordDiff, format_summary
+from watch_rules import WatchMatcher, watch_events
+from profiling import CheckRunProfiler
+from redirect_cache import RedirectCache
+
+# Порты по умолчанию, которые не различают URL при совместной загрузке
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# HTTP статусы временной недоступности, после которых загрузка повторяется
+RETRY_STATUS_CODES = (502, 503, 504)
+
+# Технические элементы страницы, текст которых не сравнивается
+SKIP_TAGS = ("script", "style", "nav", "header", "footer", "aside")
+
+# Режимы проверки сайта: content - изменения контента, availability - только доступность
+# (без загрузки тела страницы), keyword - наличие ключевых слов на странице
+CHECK_MODES = ('content', 'availability', 'keyword')
 
 class SiteMonitor:
     """
@@ -25,7 +58,25 @@ class SiteMonitor:
             database (SitesDatabase): Экземпляр базы данных сайтов
         """
         self.database = database
-        self.session = requests.Session()
+        # Постоянные редиректы запоминаются, чтобы загружать конечный URL без лишних запросов
+        self.redirects = RedirectCache()
+        self.fetcher = PageFetcher(redirects=self.redirects)
+        self.session = self.fetcher.session
+        self.logger = logging.getLogger(__name__)
+        
+        # Отключение хостов, которые подряд не отвечают
+        self.circuit_breaker = HostCircuitBreaker()
+        
+        # Профилирование прогонов проверки (включается через PROFILE_CHECKS или командой /profile)
+        self.profiling_enabled = config.PROFILE_CHECKS
+        self.profiler = None
+        
+        # Остановка прогона при завершении приложения: новые загрузки не начинаются
+        self.stop_event = threading.Event()
+        
+        # Результаты правил наблюдения по хешу текста страницы и набору правил
+        self._watch_cache = OrderedDict()
+        self._watch_lock = threading.Lock()
         
         # Настройка User-Agent для более надежных запросов
         self.session.headers.update({
@@ -41,55 +92,316 @@ class SiteMonitor:
             
         Returns:
             Tuple[str, str, Optional[str]]: (статус, сообщение, хеш_контента)
-            Статус может быть: 'ok', 'error', 'changed'
+            Статус может быть: 'ok', 'error', 'changed', 'slow'
+        """
+        result = self.check_site_detailed(site)
+        return result['status'], result['message'], result['content_hash']
+    
+    def check_site_detailed(self, site: Dict) -> Dict:
+        """
+        Проверяет один сайт и возвращает результат вместе с замерами времени ответа
+        
+        Args:
+            site (Dict): Данные сайта из базы данных
+            
+        Returns:
+            Dict: Результат проверки с ключами site, status, message, content_hash, timings
+        """
+        if self.check_mode(site) == 'availability':
+            return self._evaluate(site, self._fetch_page(site, status_only=True))
+        return self._evaluate(site, self._fetch_page(site, streaming=not self._needs_markup(site)))
+    
+    @staticmethod
+    def fetch_key(url: str) -> str:
+        """
+        Нормализует URL для поиска одинаковых страниц у разных пользователей
+        
+        Регистр схемы и хоста, порт по умолчанию, фрагмент и пустой путь
+        не влияют на загружаемую страницу и отбрасываются
+        
+        Args:
+            url (str): URL сайта
+            
+        Returns:
+            str: Нормализованный URL
+        """
+        try:
+            parts = urlsplit(url.strip())
+            port = parts.port
+        except ValueError:
+            return url
+        
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        if ':' in host:
+            host = f"[{host}]"
+        if port and DEFAULT_PORTS.get(scheme) != port:
+            host = f"{host}:{port}"
+        
+        return urlunsplit((scheme, host, parts.path or '/', parts.query, ''))
+    
+    @staticmethod
+    def check_mode(site: Dict) -> str:
+        """
+        Возвращает режим проверки сайта
+        
+        Args:
+            site (Dict): Данные сайта
+            
+        Returns:
+            str: Режим из CHECK_MODES (по умолчанию content)
+        """
+        return site.get('check_mode') or 'content'
+    
+    def _fetch_page(self, site: Dict, streaming: bool = False, status_only: bool = False) -> Dict:
+        """
+        Загружает страницу сайта
+        
+        Результат не зависит от пользователя и может использоваться для всех
+        сайтов с тем же URL; текст извлекается позже по правилам каждого сайта
+        
+        При потоковой загрузке HTML не сохраняется: текст извлекается и хешируется
+        по мере получения тела, а в памяти остается не более MAX_TEXT_LENGTH символов
+        текста. Такая страница подходит только для сайтов без правил фрагментов
+        
+        При проверке только статуса тело страницы не загружается (HEAD или GET
+        с закрытием соединения после первых байт) - страница подходит только
+        для сайтов в режиме availability
+        
+        JSON ответ (по Content-Type) не разбирается как HTML: он сохраняется
+        в странице разобранным (ключ json) для сравнения по полям
+        
+        Args:
+            site (Dict): Данные сайта (для замеров этапов относится к первому подписчику)
+            streaming (bool): Извлекать текст потоково, не сохраняя HTML
+            status_only (bool): Проверить только HTTP статус, не загружая тело
+            
+        Returns:
+            Dict: Страница с ключами error, retryable, status_code, content (или text, text_hash, text_length), texts, timings
         """
         url = site['url']
-        site_id = site['id']
+        timings = {}
+        page = {'error': None, 'retryable': False, 'status_code': None, 'content': None, 'texts': {}, 'timings': timings}
         
         try:
-            # Выполняем HTTP запрос с таймаутом
-            response = self.session.get(
-                url, 
-                timeout=config.REQUEST_TIMEOUT,
-                allow_redirects=True
-            )
+            # Выполняем HTTP запрос с таймаутом, замеряя фазы запроса
+            if status_only:
+                with self._stage(site, 'fetch'):
+                    response, content_length = self.fetcher.fetch_status(url, config.REQUEST_TIMEOUT, timings)
+            elif streaming:
+                extractor = StreamingTextExtractor(SKIP_TAGS, config.CONTENT_HASH_ALGORITHM, config.MAX_TEXT_LENGTH)
+                with self._stage(site, 'fetch'):
+                    response, content = self.fetcher.fetch_stream(url, config.REQUEST_TIMEOUT, timings, extractor.feed)
+                    extractor.close()
+                self._exclude_parse_time(timings, extractor.seconds)
+                metrics.PARSE_SECONDS.observe(extractor.seconds)
+                content_length = extractor.raw_length if content is None else len(content)
+            else:
+                with self._stage(site, 'fetch'):
+                    response, content = self.fetcher.fetch(url, config.REQUEST_TIMEOUT, timings)
+                content_length = len(content)
+            is_json = not status_only and is_json_response(response)
             
             # Проверяем HTTP статус код
+            page['status_code'] = response.status_code
             if response.status_code != 200:
-                error_msg = f"HTTP ошибка: {response.status_code}"
-                self.database.update_site_status(site_id, 'error', error_message=error_msg)
-                return 'error', error_msg, None
+                page['error'] = f"HTTP ошибка: {response.status_code}"
+                page['retryable'] = response.status_code in RETRY_STATUS_CODES
             
-            # Получаем содержимое страницы
-            content = response.text
+            elif status_only:
+                pass
+            
+            elif is_json:
+                # JSON разбираем сразу: подписчики выбирают поля из одного разобранного документа
+                try:
+                    with metrics.PARSE_SECONDS.time(), self._stage(site, 'parse'):
+                        page['json'] = json.loads(content)
+                except ValueError as e:
+                    page['error'] = f"Некорректный JSON: {e}"
             
             # Проверяем минимальную длину контента
-            if len(content) < config.MIN_CONTENT_LENGTH:
-                error_msg = f"Слишком короткий контент: {len(content)} символов"
-                self.database.update_site_status(site_id, 'error', error_message=error_msg)
-                return 'error', error_msg, None
+            elif content_length < config.MIN_CONTENT_LENGTH:
+                page['error'] = f"Слишком короткий контент: {content_length} символов"
+            
+            elif streaming:
+                page['text'] = extractor.text
+                page['text_hash'] = extractor.hexdigest()
+                page['text_length'] = extractor.length
             
-            # Извлекаем основной контент (убираем HTML теги)
-            soup = BeautifulSoup(content, 'html.parser')
+            else:
+                page['content'] = content
+                
+        except requests.exceptions.Timeout:
+            page['error'] = f"Таймаут запроса (>{config.REQUEST_TIMEOUT}с)"
+            page['retryable'] = True
             
-            # Убираем скрипты, стили и другие технические элементы
-            for script in soup(["script", "style", "nav", "header", "footer", "aside"]):
-                script.decompose()
+        except requests.exceptions.ConnectionError as e:
+            page['error'] = "Ошибка подключения к сайту"
+            # Ошибка сертификата при повторе не исчезнет
+            page['retryable'] = not isinstance(e, requests.exceptions.SSLError)
+            
+        except requests.exceptions.RequestException as e:
+            page['error'] = f"Ошибка запроса: {str(e)}"
+            # Обрыв соединения при чтении тела ответа
+            page['retryable'] = isinstance(e, requests.exceptions.ChunkedEncodingError)
             
-            # Получаем чистый текст
-            clean_text = soup.get_text()
+        except Exception as e:
+            page['error'] = f"Неожиданная ошибка: {str(e)}"
+        
+        if 'total' in timings:
+            metrics.FETCH_SECONDS.observe(timings['total'])
+        if 'wire_bytes' in timings:
+            metrics.FETCH_BYTES_TOTAL.inc(timings['wire_bytes'], kind='wire')
+            metrics.FETCH_BYTES_TOTAL.inc(timings['decoded_bytes'], kind='decoded')
+        if timings.get('redirects') or timings.get('redirects_cached'):
+            metrics.REDIRECTS_TOTAL.inc(timings['redirects'], source='followed')
+            metrics.REDIRECTS_TOTAL.inc(timings['redirects_cached'], source='cached')
+        
+        return page
+    
+    def _page_text(self, site: Dict, page: Dict) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        Извлекает текст страницы по правилам сайта и вычисляет его хеш
+        
+        Результат запоминается в странице, поэтому подписчики с одинаковыми
+        правилами разбирают страницу один раз
+        
+        Args:
+            site (Dict): Данные сайта
+            page (Dict): Результат _fetch_page
             
-            # Убираем лишние пробелы и переносы строк
-            clean_text = ' '.join(clean_text.split())
+        Returns:
+            Tuple[Optional[str], Optional[str], Optional[str]]: (текст, хеш, сообщение об ошибке)
+        """
+        rules = site.get('rules') or {}
+        key = json.dumps(rules, sort_keys=True)
+        
+        if key not in page['texts'] and 'json' in page:
+            page['texts'][key] = self._json_text(site, page['json'], rules)
+        
+        if key not in page['texts']:
+            normalizers = rules.get('normalize', [])
             
-            # Проверяем минимальную длину очищенного текста
-            if len(clean_text) < config.MIN_CONTENT_LENGTH:
-                error_msg = f"Слишком мало текстового контента: {len(clean_text)} символов"
-                self.database.update_site_status(site_id, 'error', error_message=error_msg)
-                return 'error', error_msg, None
+            if page['content'] is None:
+                # Страница разобрана потоково - остается только нормализовать текст
+                clean_text, content_hash, text_length = page['text'], page['text_hash'], page['text_length']
+                if normalizers:
+                    clean_text = normalize_text(clean_text, normalizers)
+                    content_hash, text_length = None, len(clean_text)
+            else:
+                with metrics.PARSE_SECONDS.time(), self._stage(site, 'parse'):
+                    clean_text = self.extract_text(page['content'], rules)
+                content_hash, text_length = None, len(clean_text)
             
-            # Вычисляем хеш контента
-            content_hash = hashlib.sha256(clean_text.encode('utf-8')).hexdigest()
+            # Проверяем минимальную длину очищенного текста (для фрагментов достаточно непустого текста)
+            min_length = 1 if rules.get('include') else config.MIN_CONTENT_LENGTH
+            if text_length < min_length:
+                page['texts'][key] = (None, None, f"Слишком мало текстового контента: {text_length} символов")
+            else:
+                if content_hash is None:
+                    # Вычисляем хеш контента
+                    with self._stage(site, 'hash'):
+                        content_hash = self.hash_text(clean_text)
+                page['texts'][key] = (clean_text, content_hash, None)
+        
+        return page['texts'][key]
+    
+    def _json_text(self, site: Dict, data, rules: Dict) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        Формирует снимок полей JSON ответа по селекторам сайта
+        
+        Текстом страницы служит каноническая запись снимка (ключи отсортированы,
+        пробелы убраны), поэтому перестановка ключей и форматирование ответа
+        не меняют хеш, а ключевые слова и правила наблюдения ищутся в значениях полей
+        
+        Args:
+            site (Dict): Данные сайта
+            data: Разобранный JSON
+            rules (Dict): Правила сайта (учитываются только селекторы вида $.поле)
+            
+        Returns:
+            Tuple[Optional[str], Optional[str], Optional[str]]: (снимок, хеш, сообщение об ошибке)
+        """
+        include = [selector for selector in rules.get('include', []) if is_json_path(selector)]
+        exclude = [selector for selector in rules.get('exclude', []) if is_json_path(selector)]
+        fields = json_fields(data, include, exclude)
+        if include and not fields:
+            return None, None, "Поля по селекторам JSON не найдены"
+        
+        snapshot = canonical_json(fields)
+        with self._stage(site, 'hash'):
+            return snapshot, self.hash_text(snapshot), None
+    
+    def _evaluate(self, site: Dict, page: Dict) -> Dict:
+        """
+        Сравнивает загруженную страницу с сохраненным состоянием сайта и записывает результат
+        
+        Каждый сайт сравнивается со своим последним сохраненным контентом,
+        поэтому одна загрузка страницы корректно обслуживает всех подписчиков
+        
+        Args:
+            site (Dict): Данные сайта из базы данных
+            page (Dict): Результат _fetch_page
+            
+        Returns:
+            Dict: Результат проверки с ключами site, status, message, content_hash, timings, retries
+        """
+        # Копия замеров, чтобы результаты подписчиков не делили один словарь
+        result = self._compare(site, page, dict(page['timings']))
+        result['retries'] = page.get('retries', 0)
+        return result
+    
+    def _compare(self, site: Dict, page: Dict, timings: Dict) -> Dict:
+        """
+        Определяет статус сайта по загруженной странице
+        
+        Args:
+            site (Dict): Данные сайта из базы данных
+            page (Dict): Результат _fetch_page
+            timings (Dict): Замеры фаз запроса для результата
+            
+        Returns:
+            Dict: Результат проверки
+        """
+        try:
+            mode = self.check_mode(site)
+            if mode == 'availability':
+                # Короткий контент не важен: достаточно ответа 200 (страница могла быть загружена для соседей по URL)
+                if page['status_code'] == 200:
+                    return self._finish(site, 'ok', 'Сайт доступен', timings=timings)
+                return self._finish(site, 'error', page['error'], timings=timings)
+            
+            if page['error']:
+                return self._finish(site, 'error', page['error'], timings=timings)
+            
+            clean_text, content_hash, error = self._page_text(site, page)
+            if error:
+                return self._finish(site, 'error', error, timings=timings)
+            
+            watch = None
+            if self.watch_patterns(site):
+                matches = self._watch_matches(site, page, clean_text, content_hash)
+                watch = {'hash': content_hash, 'matches': {pattern: matches[pattern] for pattern in self.watch_patterns(site)}}
+            
+            if mode == 'keyword':
+                # Без сравнения с прошлым контентом: важно только наличие ключевых слов
+                missing = self._missing_keywords(site, (watch or {}).get('matches', {}))
+                if missing:
+                    return self._finish(site, 'error', f"Не найдены ключевые слова: {', '.join(missing)}", timings=timings,
+                                        watch=watch)
+            
+            if site.get('watch'):
+                # Правила наблюдения заменяют сравнение текста: уведомление только об их срабатывании
+                events = watch_events(site['watch'], (site.get('last_watch') or {}).get('matches', {}), watch['matches'])
+                if events:
+                    message = "Сработали правила наблюдения:\n" + '\n'.join(f"• {event}" for event in events)
+                    return self._finish(site, 'changed', message, content_hash, timings=timings, watch=watch)
+                return self._finish(site, 'ok', 'Сайт доступен, правила наблюдения не сработали', content_hash,
+                                    timings=timings, watch=watch)
+            
+            if mode == 'keyword':
+                return self._finish(site, 'ok', 'Сайт доступен, ключевые слова найдены', content_hash, timings=timings,
+                                    watch=watch)
             
             # Проверяем, изменился ли контент
             last_hash = site.get('last_content_hash')
@@ -97,80 +409,624 @@ class SiteMonitor:
             
             if last_hash is None:
                 # Первая проверка - просто сохраняем хеш и контент
-                self.database.update_site_status(site_id, 'ok', content_hash, clean_text)
-                return 'ok', 'Сайт доступен, контент сохранен', content_hash
+                return self._finish(site, 'ok', 'Сайт доступен, контент сохранен', content_hash, clean_text, timings)
+            
+            elif last_hash != content_hash and 'json' in page:
+                # JSON сравниваем по полям снимка, без посимвольного diff
+                with metrics.DIFF_SECONDS.time(), self._stage(site, 'diff'):
+                    is_significant, message, change_summary = self._compare_json(site, last_content, clean_text)
+                if is_significant:
+                    return self._finish(site, 'changed', message, content_hash, clean_text, timings,
+                                        change_summary=change_summary)
+                return self._finish(site, 'ok', message, last_hash, last_content, timings, stored_status='minor_change')
             
             elif last_hash != content_hash:
                 # Контент изменился - проверяем значительность изменений
-                is_significant, change_description = self._is_significant_change(last_content, clean_text)
+                with metrics.DIFF_SECONDS.time(), self._stage(site, 'diff'):
+                    is_significant, change_description, diff = self._analyze_change(last_content, clean_text)
+                    if is_significant and diff is None and last_content and clean_text:
+                        # Длина изменилась настолько, что diff для оценки не понадобился - строим его для сводки
+                        diff = WordDiff(last_content, clean_text)
                 
                 if is_significant:
-                    # Значительные изменения - обновляем хеш и контент, отправляем уведомление
-                    self.database.update_site_status(site_id, 'changed', content_hash, clean_text)
-                    return 'changed', f'Сайт доступен: {change_description}', content_hash
+                    # Значительные изменения - обновляем хеш и контент, отправляем уведомление со сводкой изменений
+                    message = f'Сайт доступен: {change_description}'
+                    change_summary = None
+                    if diff:
+                        change_summary = diff.summary(config.CHANGE_SUMMARY_PASSAGES, config.CHANGE_SUMMARY_WORDS)
+                        change_summary['description'] = change_description
+                        summary_text = format_summary(change_summary)
+                        if summary_text:
+                            message += f"\n{summary_text}"
+                    return self._finish(site, 'changed', message, content_hash, clean_text, timings,
+                                        change_summary=change_summary)
                 else:
                     # Незначительные изменения - НЕ обновляем хеш, НЕ отправляем уведомление
-                    self.database.update_site_status(site_id, 'minor_change', last_hash, last_content)
-                    return 'ok', f'Сайт доступен: {change_description}', last_hash
+                    return self._finish(site, 'ok', f'Сайт доступен: {change_description}', last_hash, last_content, timings,
+                                        stored_status='minor_change')
             
             else:
                 # Контент не изменился
-                self.database.update_site_status(site_id, 'ok', content_hash, clean_text)
-                return 'ok', 'Сайт доступен, контент не изменился', content_hash
+                return self._finish(site, 'ok', 'Сайт доступен, контент не изменился', content_hash, clean_text, timings)
                 
-        except requests.exceptions.Timeout:
-            error_msg = f"Таймаут запроса (>{config.REQUEST_TIMEOUT}с)"
-            self.database.update_site_status(site_id, 'error', error_message=error_msg)
-            return 'error', error_msg, None
+        except Exception as e:
+            return self._finish(site, 'error', f"Неожиданная ошибка: {str(e)}", timings=timings)
+    
+    @staticmethod
+    def _compare_json(site: Dict, old_snapshot: str, new_snapshot: str) -> Tuple[bool, str, Optional[Dict]]:
+        """
+        Сравнивает снимки полей JSON ответа
+        
+        С селекторами include значимо любое изменение выбранных полей, без них -
+        изменение доли полей не меньше SIGNIFICANT_CHANGE_THRESHOLD
+        
+        Args:
+            site (Dict): Данные сайта
+            old_snapshot (str): Сохраненный снимок (или текст HTML, если сайт раньше отдавал HTML)
+            new_snapshot (str): Текущий снимок
             
-        except requests.exceptions.ConnectionError:
-            error_msg = "Ошибка подключения к сайту"
-            self.database.update_site_status(site_id, 'error', error_message=error_msg)
-            return 'error', error_msg, None
+        Returns:
+            Tuple[bool, str, Optional[Dict]]: (значимо ли изменение, сообщение, сводка изменений)
+        """
+        old_fields = load_snapshot(old_snapshot)
+        if old_fields is None:
+            return True, 'Сайт доступен: ответ стал JSON', None
+        
+        new_fields = json.loads(new_snapshot)
+        diff = diff_fields(old_fields, new_fields)
+        changed_count = sum(len(paths) for paths in diff.values())
+        total = max(len(old_fields), len(new_fields), 1)
+        description = f"изменено полей: {changed_count} из {total}"
+        
+        rules = (site.get('rules') or {}).get('include', [])
+        if not any(is_json_path(selector) for selector in rules) and changed_count / total < config.SIGNIFICANT_CHANGE_THRESHOLD:
+            return False, f'Сайт доступен: Незначительные изменения: {description}', None
+        
+        # Измененное поле показываем как удаление старого и добавление нового значения
+        added = [f"{path} = {format_value(new_fields[path])}" for path in diff['changed'] + diff['added']]
+        removed = [f"{path} = {format_value(old_fields[path])}" for path in diff['changed'] + diff['removed']]
+        limit = config.CHANGE_SUMMARY_PASSAGES
+        change_summary = {
+            'added': added[:limit],
+            'removed': removed[:limit],
+            'omitted': max(0, len(added) - limit) + max(0, len(removed) - limit),
+            'description': description
+        }
+        message = f'Сайт доступен: {description}'
+        summary_text = format_summary(change_summary)
+        if summary_text:
+            message += f"\n{summary_text}"
+        return True, message, change_summary
+    
+    @staticmethod
+    def watch_patterns(site: Dict) -> List[str]:
+        """
+        Возвращает правила, которые нужно применить к тексту страницы сайта:
+        правила наблюдения и ключевые слова режима keyword
+        
+        Args:
+            site (Dict): Данные сайта
             
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Ошибка запроса: {str(e)}"
-            self.database.update_site_status(site_id, 'error', error_message=error_msg)
-            return 'error', error_msg, None
+        Returns:
+            List[str]: Правила
+        """
+        patterns = list(site.get('watch') or [])
+        if SiteMonitor.check_mode(site) == 'keyword':
+            patterns += [keyword for keyword in site.get('keywords') or [] if keyword not in patterns]
+        return patterns
+    
+    def _watch_matches(self, site: Dict, page: Dict, text: str, text_hash: str) -> Dict[str, Optional[str]]:
+        """
+        Применяет к тексту страницы правила всех подписчиков ее URL одним сопоставителем
+        
+        Результат запоминается по хешу текста, поэтому неизменившаяся страница
+        повторно не просматривается ни для других подписчиков, ни в следующих прогонах
+        
+        Args:
+            site (Dict): Данные сайта
+            page (Dict): Результат _fetch_page (watch_patterns - правила всех подписчиков)
+            text (str): Текст страницы по правилам сайта
+            text_hash (str): Хеш текста
             
-        except Exception as e:
-            error_msg = f"Неожиданная ошибка: {str(e)}"
-            self.database.update_site_status(site_id, 'error', error_message=error_msg)
-            return 'error', error_msg, None
+        Returns:
+            Dict[str, Optional[str]]: Результаты правил (None - не найдено)
+        """
+        patterns = tuple(sorted(set(page.get('watch_patterns') or self.watch_patterns(site))))
+        key = (text_hash, patterns)
+        
+        with self._watch_lock:
+            matches = self._watch_cache.get(key)
+            if matches is not None:
+                self._watch_cache.move_to_end(key)
+                metrics.WATCH_SCANS_TOTAL.inc(source='cache')
+                return matches
+        
+        # Текст не изменился с прошлой проверки сайта - берем сохраненные результаты
+        last_watch = site.get('last_watch') or {}
+        if last_watch.get('hash') == text_hash and all(pattern in last_watch['matches'] for pattern in patterns):
+            matches = last_watch['matches']
+            metrics.WATCH_SCANS_TOTAL.inc(source='stored')
+        else:
+            with self._stage(site, 'watch'):
+                matches = WatchMatcher(patterns).match(text)
+            metrics.WATCH_SCANS_TOTAL.inc(source='scan')
+        
+        with self._watch_lock:
+            self._watch_cache[key] = matches
+            while len(self._watch_cache) > config.WATCH_CACHE_SIZE:
+                self._watch_cache.popitem(last=False)
+        return matches
+    
+    @staticmethod
+    def _missing_keywords(site: Dict, matches: Dict[str, Optional[str]]) -> List[str]:
+        """
+        Находит ключевые слова сайта, которых нет на странице
+        
+        Args:
+            site (Dict): Данные сайта
+            matches (Dict[str, Optional[str]]): Результаты правил для текста страницы
+            
+        Returns:
+            List[str]: Ненайденные ключевые слова
+        """
+        return [keyword for keyword in site.get('keywords') or [] if matches.get(keyword) is None]
+    
+    def extract_text(self, content: str, rules: Optional[Dict] = None) -> str:
+        """
+        Извлекает из HTML основной текст страницы для сравнения
+        
+        Args:
+            content (str): HTML страницы
+            rules (Dict): Правила сайта: фрагменты include/exclude и нормализаторы normalize
+            
+        Returns:
+            str: Текст без тегов и технических элементов с нормализованными пробелами
+        """
+        if rules:
+            clean_text = extract_fragments(content, rules, SKIP_TAGS)
+            return normalize_text(clean_text, rules.get('normalize', []))
+        
+        # Извлекаем основной контент (убираем HTML теги)
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        # Убираем скрипты, стили и другие технические элементы
+        for script in soup(list(SKIP_TAGS)):
+            script.decompose()
+        
+        # Получаем чистый текст
+        clean_text = soup.get_text()
+        
+        # Убираем лишние пробелы и переносы строк
+        return ' '.join(clean_text.split())
+    
+    def hash_text(self, text: str) -> str:
+        """
+        Вычисляет хеш текста страницы
+        
+        Args:
+            text (str): Очищенный текст страницы
+            
+        Returns:
+            str: Хеш в шестнадцатеричном виде
+        """
+        return hashlib.new(config.CONTENT_HASH_ALGORITHM, text.encode('utf-8')).hexdigest()
+    
+    def _finish(self, site: Dict, status: str, message: str, content_hash: str = None, content: str = None,
+                timings: Dict = None, stored_status: str = None, change_summary: Dict = None,
+                watch: Dict = None) -> Dict:
+        """
+        Сохраняет результат проверки в базу данных и формирует словарь результата
+        
+        Если сайт доступен, но время ответа превышает SLO, статус 'ok' меняется на 'slow'
+        
+        Args:
+            site (Dict): Данные сайта
+            status (str): Статус проверки
+            message (str): Сообщение для пользователя
+            content_hash (str): Хеш содержимого страницы
+            content (str): Содержимое страницы для сравнения
+            timings (Dict): Замеры фаз запроса в секундах
+            stored_status (str): Статус для записи в базу, если отличается от возвращаемого
+            change_summary (Dict): Сводка изменений для сохранения вместе со снимком страницы
+            watch (Dict): Результаты правил наблюдения для сохранения
+            
+        Returns:
+            Dict: Результат проверки
+        """
+        timings = timings or {}
+        
+        if status == 'ok' and self._is_slow(timings):
+            status = stored_status = 'slow'
+            message += f" (медленный ответ: {timings['total']:.2f}с > {config.SLOW_RESPONSE_THRESHOLD:g}с)"
+        elif status == 'changed' and self._is_slow(timings):
+            # Отметка о медленном ответе идет в первую строку, перед сводкой изменений
+            first_line, separator, details = message.partition('\n')
+            message = f"{first_line} (медленный ответ: {timings['total']:.2f}с){separator}{details}"
+        
+        with self._stage(site, 'db'):
+            self.database.update_site_status(
+                site['id'], stored_status or status, content_hash, content,
+                error_message=message if status == 'error' else None,
+                timings=timings,
+                change_summary=change_summary,
+                watch=watch
+            )
+        
+        metrics.CHECKS_TOTAL.inc(status=status)
+        
+        return {
+            'site': site,
+            'status': status,
+            'message': message,
+            'content_hash': content_hash if status != 'error' else None,
+            'timings': timings
+        }
+    
+    def _is_slow(self, timings: Dict) -> bool:
+        """
+        Проверяет, превышено ли SLO по времени ответа
+        
+        Args:
+            timings (Dict): Замеры фаз запроса в секундах
+            
+        Returns:
+            bool: True если ответ медленнее порога SLOW_RESPONSE_THRESHOLD
+        """
+        threshold = config.SLOW_RESPONSE_THRESHOLD
+        return threshold > 0 and timings.get('total', 0) > threshold
+    
+    @staticmethod
+    def _needs_markup(site: Dict) -> bool:
+        """
+        Проверяет, нужен ли сайту HTML страницы целиком (правила фрагментов)
+        
+        Args:
+            site (Dict): Данные сайта
+            
+        Returns:
+            bool: True если у сайта есть правила include или exclude (кроме селекторов полей JSON)
+        """
+        rules = site.get('rules') or {}
+        selectors = rules.get('include', []) + rules.get('exclude', [])
+        return any(not is_json_path(selector) for selector in selectors)
+    
+    @staticmethod
+    def _exclude_parse_time(timings: Dict, seconds: float):
+        """
+        Вычитает из замеров загрузки время потокового разбора, чтобы оно не влияло на SLO
+        
+        Args:
+            timings (Dict): Замеры фаз запроса в секундах
+            seconds (float): Время разбора в секундах
+        """
+        for phase in ('body', 'total'):
+            if phase in timings:
+                timings[phase] = round(max(0.0, timings[phase] - seconds), 4)
+    
+    def _probe(self, url: str) -> bool:
+        """
+        Проверяет пробным запросом, ответил ли отключенный хост
+        
+        Args:
+            url (str): URL сайта
+            
+        Returns:
+            bool: True если хост ответил без ошибки сервера
+        """
+        try:
+            status_code = self.fetcher.probe(url, config.CIRCUIT_PROBE_TIMEOUT)
+        except requests.exceptions.RequestException:
+            return False
+        return not self._host_failed(status_code)
+    
+    @staticmethod
+    def _host_failed(status_code: Optional[int]) -> bool:
+        """
+        Определяет, считается ли результат загрузки сбоем хоста для circuit breaker
+        
+        Args:
+            status_code (Optional[int]): HTTP статус ответа (None - ответа нет: таймаут,
+                ошибка подключения или сертификата, неожиданная ошибка)
+            
+        Returns:
+            bool: True если ответа нет, сервер ответил ошибкой 5xx или ограничил запросы (429)
+        """
+        return status_code is None or status_code >= 500 or status_code == 429
+    
+    def _suspended_page(self, host: str) -> Dict:
+        """
+        Формирует результат загрузки для отключенного хоста без обращения к сети
+        
+        Args:
+            host (str): Ключ хоста
+            
+        Returns:
+            Dict: Страница с ошибкой в формате _fetch_page
+        """
+        next_probe_at = self.circuit_breaker.next_probe_at(host)
+        return {
+            'error': f"Хост не отвечает, проверки приостановлены до {next_probe_at:%d.%m %H:%M}",
+            'retryable': False,
+            'status_code': None,
+            'content': None,
+            'texts': {},
+            'timings': {}
+        }
+    
+    @staticmethod
+    def _retry_delay(attempt: int) -> float:
+        """
+        Вычисляет задержку перед повтором: экспоненциальный рост со случайной добавкой
+        
+        Args:
+            attempt (int): Номер повтора (начиная с 1)
+            
+        Returns:
+            float: Задержка в секундах
+        """
+        delay = min(config.RETRY_BACKOFF_MAX, config.RETRY_BACKOFF_BASE * 2 ** (attempt - 1))
+        # Джиттер, чтобы повторы к сайтам после общего сбоя не приходили одновременно
+        return delay / 2 + random.uniform(0, delay / 2)
+    
+    @contextmanager
+    def _stage(self, site: Dict, name: str):
+        """
+        Замеряет этап проверки сайта, если прогон профилируется
+        
+        Args:
+            site (Dict): Данные сайта (None - этап всего прогона)
+            name (str): Название этапа
+        """
+        if self.profiler is None:
+            yield
+            return
+        
+        with self.profiler.stage(site, name):
+            yield
     
-    def check_all_sites(self) -> Dict[str, list]:
+    def check_all_sites(self, site_filter: Callable[[Dict], bool] = None,
+                        on_result: Callable[[str, Dict], None] = None) -> Dict[str, list]:
         """
         Проверяет все активные сайты
         
+        В режиме профилирования замеряет этапы проверки каждого сайта
+        и пишет в лог сводку по самым медленным сайтам и этапам
+        
+        Args:
+            site_filter (Callable[[Dict], bool]): Какие сайты проверять (например, кроме уже
+                проверенных прерванным прогоном)
+            on_result (Callable[[str, Dict], None]): Вызывается с категорией и результатом каждого сайта
+        
+        Returns:
+            Dict[str, list]: Результаты проверки по категориям
+        """
+        if not self.profiling_enabled:
+            return self._check_all_sites(site_filter, on_result)
+        
+        profiler = CheckRunProfiler(
+            mode=config.PROFILE_MODE,
+            top_n=config.PROFILE_TOP_N,
+            output_dir=config.PROFILE_OUTPUT_DIR,
+            sample_interval=config.PROFILE_SAMPLE_INTERVAL
+        )
+        self.profiler = profiler
+        profiler.start()
+        try:
+            return self._check_all_sites(site_filter, on_result)
+        finally:
+            self.profiler = None
+            profiler.stop()
+            self.logger.info(profiler.format_summary())
+    
+    @staticmethod
+    def fair_queue() -> FairQueue:
+        """
+        Создает справедливую очередь групп сайтов с весами и квотами пользователей из настроек
+        
+        Returns:
+            FairQueue: Пустая очередь
+        """
+        return FairQueue(config.USER_WEIGHTS, config.USER_FETCH_RATES, config.USER_FETCH_RATE)
+    
+    def _check_all_sites(self, site_filter: Callable[[Dict], bool] = None,
+                         on_result: Callable[[str, Dict], None] = None) -> Dict[str, list]:
+        """
+        Проверяет все активные сайты без профилирования прогона
+        
+        Args:
+            site_filter (Callable[[Dict], bool]): Какие сайты проверять
+            on_result (Callable[[str, Dict], None]): Обработчик результата каждого сайта
+        
+        Returns:
+            Dict[str, list]: Результаты проверки по категориям
+        """
+        with self._stage(None, 'db'):
+            active_sites = self.database.get_active_sites()
+        self.circuit_breaker.prune(site['url'] for site in active_sites)
+        self.redirects.prune(site['url'] for site in active_sites)
+        if site_filter:
+            active_sites = [site for site in active_sites if site_filter(site)]
+        return self.check_sites(active_sites, on_result=on_result)
+    
+    def check_sites(self, sites: List[Dict], pause: bool = True,
+                    on_result: Callable[[str, Dict], None] = None) -> Dict[str, list]:
+        """
+        Проверяет список сайтов, загружая каждый уникальный URL один раз
+        
+        Сайты разных пользователей с одинаковым нормализованным URL получают
+        результат одной загрузки, а изменения определяются по базовому
+        контенту каждого сайта отдельно
+        
+        Загрузки, завершившиеся временной ошибкой (таймаут, обрыв соединения,
+        HTTP 502/503/504), повторяются с экспоненциальной задержкой не более
+        MAX_RETRIES раз в пределах бюджета повторов прогона
+        
+        Хосты, не ответившие CIRCUIT_FAILURE_THRESHOLD раз подряд, отключаются:
+        вместо полной загрузки им по расписанию с нарастающей задержкой
+        отправляется пробный HEAD запрос, а после ответа проверка возобновляется
+        
+        Группы разных пользователей чередуются справедливой очередью (веса USER_WEIGHTS,
+        квоты USER_FETCH_RATE/USER_FETCH_RATES), поэтому пользователь с большим числом
+        сайтов не задерживает проверку остальных
+        
+        После установки stop_event новые загрузки не начинаются: текущая завершается,
+        а непроверенные сайты остаются для следующего прогона
+        
+        Args:
+            sites (List[Dict]): Сайты для проверки
+            pause (bool): Делать паузу CHECK_PAUSE_SECONDS между загрузками
+            on_result (Callable[[str, Dict], None]): Вызывается с категорией и результатом каждого сайта
+            
         Returns:
             Dict[str, list]: Результаты проверки по категориям
         """
-        active_sites = self.database.get_active_sites()
         results = {
             'ok': [],
             'error': [],
-            'changed': []
+            'changed': [],
+            'slow': []
         }
         
-        print(f"Начинаю проверку {len(active_sites)} сайтов...")
+        # Группируем подписчиков по URL, чтобы загруженная страница
+        # хранилась в памяти только пока обрабатывается ее группа
+        subscribers_by_url = {}
+        for site in sites:
+            subscribers_by_url.setdefault(self.fetch_key(site['url']), []).append(site)
         
-        for site in active_sites:
-            print(f"Проверяю {site['name']} ({site['url']})...")
-            
-            status, message, content_hash = self.check_site(site)
-            results[status].append({
-                'site': site,
-                'message': message,
-                'content_hash': content_hash
-            })
+        print(f"Начинаю проверку {len(sites)} сайтов ({len(subscribers_by_url)} уникальных URL)...")
+        
+        pending = self.fair_queue()
+        for subscribers in subscribers_by_url.values():
+            pending.add((site.get('user_id') for site in subscribers), subscribers)
+        
+        # Повторы после временных ошибок ждут своего времени в куче и не блокируют
+        # проверку остальных сайтов. Бюджет ограничивает число повторов за прогон,
+        # чтобы массовый сбой не умножал нагрузку
+        retry_queue = []
+        retry_order = itertools.count()
+        retry_budget = max(config.MAX_RETRIES, math.ceil(len(subscribers_by_url) * config.RETRY_BUDGET_RATIO))
+        fetches = 0
+        transferred = dict.fromkeys(TRANSFER_COUNTERS + REDIRECT_COUNTERS, 0)
+        
+        while pending or retry_queue:
+            if self.stop_event.is_set():
+                self.logger.info(f"Проверка остановлена, не проверено URL: {len(pending) + len(retry_queue)}")
+                break
             
             # Небольшая пауза между запросами чтобы не перегружать серверы
-            time.sleep(1)
+            delay = config.CHECK_PAUSE_SECONDS if pause and fetches else 0
+            
+            if retry_queue and (not pending or retry_queue[0][0] <= time.monotonic()):
+                due, _, subscribers, attempt = heapq.heappop(retry_queue)
+                delay = max(delay, due - time.monotonic())
+            else:
+                (subscribers, wait), attempt = pending.pop(), 0
+                if subscribers is None:
+                    # У всех пользователей с непроверенными сайтами исчерпана квота - ждем
+                    # ближайшую квоту или повтор
+                    if retry_queue:
+                        wait = min(wait, retry_queue[0][0] - time.monotonic())
+                    self.stop_event.wait(max(wait, 0))
+                    continue
+            
+            host = self.circuit_breaker.host_key(subscribers[0]['url'])
+            circuit = self.circuit_breaker.state(host)
+            
+            if circuit != OPEN:
+                # Ожидание прерывается остановкой, а загрузка группы уходит в следующий прогон
+                if delay > 0 and self.stop_event.wait(delay):
+                    continue
+                fetches += 1
+            
+            if circuit == HALF_OPEN and not self._probe(subscribers[0]['url']):
+                self.circuit_breaker.record_failure(host)
+                circuit = OPEN
+            
+            if circuit == OPEN:
+                page = self._suspended_page(host)
+            else:
+                # Тело страницы загружается, только если оно нужно хотя бы одному подписчику
+                status_only = all(self.check_mode(site) == 'availability' for site in subscribers)
+                streaming = not any(self._needs_markup(site) for site in subscribers)
+                page = self._fetch_page(subscribers[0], streaming, status_only)
+                for counter in transferred:
+                    transferred[counter] += page['timings'].get(counter, 0)
+                # Сбой хоста - нет ответа или 5xx/429; ответ 4xx относится к странице и счетчик не меняет
+                if self._host_failed(page['status_code']):
+                    self.circuit_breaker.record_failure(host)
+                elif page['status_code'] < 400:
+                    self.circuit_breaker.record_success(host)
+            
+            if (page['retryable'] and attempt < config.MAX_RETRIES and retry_budget > 0
+                    and self.circuit_breaker.state(host) == CLOSED):
+                retry_budget -= 1
+                retry_delay = self._retry_delay(attempt + 1)
+                metrics.FETCH_RETRIES_TOTAL.inc()
+                self.logger.info(
+                    f"Повтор {attempt + 1}/{config.MAX_RETRIES} для {subscribers[0]['url']} "
+                    f"через {retry_delay:.1f}с: {page['error']}"
+                )
+                heapq.heappush(retry_queue, (time.monotonic() + retry_delay, next(retry_order), subscribers, attempt + 1))
+                continue
+            
+            page['retries'] = attempt
+            if page['error'] and attempt:
+                page['error'] += f" (попыток: {attempt + 1})"
+            
+            # Правила наблюдения всех подписчиков применяются к странице одним сопоставителем
+            page['watch_patterns'] = [pattern for site in subscribers for pattern in self.watch_patterns(site)]
+            
+            for site in subscribers:
+                print(f"Проверяю {site['name']} ({site['url']})...")
+                
+                result = self._evaluate(site, page)
+                entry = {
+                    'site': site,
+                    'message': result['message'],
+                    'content_hash': result['content_hash'],
+                    'timings': result['timings'],
+                    'retries': result['retries']
+                }
+                results[result['status']].append(entry)
+                if on_result:
+                    on_result(result['status'], entry)
+        
+        self.circuit_breaker.save()
+        self.redirects.save()
+        metrics.CIRCUIT_OPEN_HOSTS.set(self.circuit_breaker.open_hosts())
         
-        print(f"Проверка завершена. Результаты: OK={len(results['ok'])}, Errors={len(results['error'])}, Changed={len(results['changed'])}")
+        print(f"Проверка завершена. Результаты: OK={len(results['ok'])}, Errors={len(results['error'])}, Changed={len(results['changed'])}, Slow={len(results['slow'])}")
+        if transferred['decoded_bytes']:
+            saved = 1 - transferred['wire_bytes'] / transferred['decoded_bytes']
+            self.logger.info(
+                f"Загружено по сети {self._format_bytes(transferred['wire_bytes'])} "
+                f"(после распаковки {self._format_bytes(transferred['decoded_bytes'])}, сжатие сэкономило {saved:.0%})"
+            )
+        if transferred['redirects'] or transferred['redirects_cached']:
+            self.logger.info(
+                f"Редиректов пройдено: {transferred['redirects']}, "
+                f"пропущено по кешу постоянных редиректов: {transferred['redirects_cached']}"
+            )
         
         return results
     
+    @staticmethod
+    def _format_bytes(size: int) -> str:
+        """
+        Форматирует объем данных для лога и /status
+        
+        Args:
+            size (int): Объем в байтах
+            
+        Returns:
+            str: Объем в байтах, КБ или МБ
+        """
+        if size < 1024:
+            return f"{size} Б"
+        if size < 1024 * 1024:
+            return f"{size / 1024:.1f} КБ"
+        return f"{size / (1024 * 1024):.1f} МБ"
+    
     def _is_significant_change(self, old_content: str, new_content: str) -> Tuple[bool, str]:
         """
         Определяет, является ли изменение контента значительным
@@ -182,8 +1038,23 @@ class SiteMonitor:
         Returns:
             Tuple[bool, str]: (является_ли_значительным, описание_изменений)
         """
+        is_significant, description, _ = self._analyze_change(old_content, new_content)
+        return is_significant, description
+    
+    def _analyze_change(self, old_content: str, new_content: str) -> Tuple[bool, str, Optional[WordDiff]]:
+        """
+        Сравнивает тексты пословно и оценивает значительность изменений
+        
+        Args:
+            old_content (str): Старый контент
+            new_content (str): Новый контент
+            
+        Returns:
+            Tuple[bool, str, Optional[WordDiff]]: (является_ли_значительным, описание_изменений,
+            пословный diff или None если сравнение не понадобилось)
+        """
         if not old_content or not new_content:
-            return True, "Контент полностью изменился"
+            return True, "Контент полностью изменился", None
         
         # 1. Проверяем изменение длины контента
         old_len = len(old_content)
@@ -192,22 +1063,14 @@ class SiteMonitor:
         
         if length_change_ratio > config.MAX_LENGTH_CHANGE_RATIO:
             percentage = length_change_ratio * 100
-            return True, f"Значительное изменение длины контента: {percentage:.1f}%"
-        
-        # 2. Вычисляем процент различий между текстами
-        differ = difflib.SequenceMatcher(None, old_content, new_content)
-        similarity_ratio = differ.ratio()
-        change_ratio = 1 - similarity_ratio
+            return True, f"Значительное изменение длины контента: {percentage:.1f}%", None
         
-        # 3. Подсчитываем количество измененных символов
-        old_words = set(old_content.split())
-        new_words = set(new_content.split())
+        # 2. Пословный diff: процент различий и количество измененных символов за один проход
+        diff = WordDiff(old_content, new_content)
+        change_ratio = 1 - diff.ratio
+        changed_chars = diff.changed_chars
         
-        added_words = new_words - old_words
-        removed_words = old_words - new_words
-        changed_chars = len(' '.join(added_words)) + len(' '.join(removed_words))
-        
-        # 4. Определяем значительность по нескольким критериям
+        # 3. Определяем значительность по нескольким критериям
         is_significant = False
         reasons = []
         
@@ -219,17 +1082,13 @@ class SiteMonitor:
             is_significant = True
             reasons.append(f"{changed_chars} измененных символов")
         
-        if length_change_ratio > config.MAX_LENGTH_CHANGE_RATIO:
-            is_significant = True
-            reasons.append(f"изменение длины на {length_change_ratio*100:.1f}%")
-        
         # Формируем описание изменений
         if is_significant:
             description = "Значительные изменения: " + ", ".join(reasons)
         else:
             description = f"Незначительные изменения: {change_ratio*100:.1f}% контента, {changed_chars} символов"
         
-        return is_significant, description
+        return is_significant, description, diff
     
     def get_site_summary(self, site: Dict) -> str:
         """
@@ -250,6 +1109,10 @@ class SiteMonitor:
         
         summary = f"🌐 {name}\n"
         summary += f"🔗 {url}\n"
+        if self.check_mode(site) == 'availability':
+            summary += "🔎 Режим: только доступность\n"
+        elif self.check_mode(site) == 'keyword':
+            summary += f"🔎 Режим: ключевые слова ({', '.join(site.get('keywords') or [])})\n"
         summary += f"📊 Проверок: {check_count}\n"
         summary += f"❌ Ошибок: {error_count}\n"
         
@@ -260,8 +1123,41 @@ class SiteMonitor:
             status_emoji = {
                 'ok': '✅',
                 'error': '❌',
-                'changed': '🔄'
+                'changed': '🔄',
+                'slow': '🐢'
             }
             summary += f"📈 Статус: {status_emoji.get(last_status, '❓')} {last_status}\n"
         
+        timings = site.get('last_timings')
+        if timings and timings.get('total') is not None:
+            summary += (
+                f"⏱️ Время ответа: {timings['total']:.2f}с "
+                f"(DNS {timings.get('dns', 0):.2f}, подключение {timings.get('connect', 0):.2f}, "
+                f"TLS {timings.get('tls', 0):.2f}, TTFB {timings.get('ttfb', 0):.2f}, "
+                f"тело {timings.get('body', 0):.2f})\n"
+            )
+        if timings and timings.get('decoded_bytes'):
+            summary += (
+                f"📦 Размер ответа: {self._format_bytes(timings['wire_bytes'])} по сети, "
+                f"{self._format_bytes(timings['decoded_bytes'])} после распаковки\n"
+            )
+        if timings and (timings.get('redirects') or timings.get('redirects_cached')):
+            summary += f"↪️ Редиректов: {timings['redirects'] + timings['redirects_cached']}"
+            if timings['redirects_cached']:
+                summary += f" (из них по кешу, без запросов: {timings['redirects_cached']})"
+            summary += "\n"
+        
+        if site.get('watch'):
+            matches = (site.get('last_watch') or {}).get('matches', {})
+            summary += "👀 Правила наблюдения:\n"
+            summary += ''.join(
+                f"    {pattern}: {'«' + matches[pattern] + '»' if matches.get(pattern) else 'не найдено'}\n"
+                for pattern in site['watch']
+            )
+        
+        change = site.get('last_change_summary')
+        if change:
+            summary += f"📝 Последнее изменение ({change['at'][:16].replace('T', ' ')}): {change.get('description', '')}\n"
+            summary += ''.join(f"    {line}\n" for line in format_summary(change).split('\n') if line)
+        
         return summary
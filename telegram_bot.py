@@ -2,24 +2,77 @@
 Telegram бот для управления мониторингом сайтов
 Предоставляет интерфейс для добавления, удаления и просмотра сайтов
 """
+import asyncio
+import functools
 import logging
+import secrets
+import signal
+from collections import OrderedDict
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, filters, ContextTypes
-from typing import Dict, List
+from urllib.parse import urlsplit
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 import config
 from database import SitesDatabase
-from site_monitor import SiteMonitor
+from site_monitor import CHECK_MODES, SiteMonitor
+from content_rules import NORMALIZERS, RULE_KINDS, format_rules, validate_rule
+from site_import import EXPORT_FORMATS, export_sites, normalize_url, parse_sites_file
+from watch_rules import validate_watch_rule
+from webhook import WebhookServer
 
 class SiteMonitorBot:
     """
     Telegram бот для управления мониторингом сайтов
     """
     
+    # Максимальная длина сообщения Telegram
+    MAX_MESSAGE_LENGTH = 4096
+    
+    # Представления с постраничным выводом
+    PAGE_VIEWS = ('list', 'status')
+    
+    # Группы статусов в /list (в порядке вывода)
+    STATUS_EMOJI = {
+        'ok': '✅',
+        'slow': '🐢',
+        'error': '❌',
+        'changed': '🔄',
+        'unknown': '❓'
+    }
+    STATUS_NAMES = {
+        'ok': 'Работают',
+        'slow': 'Медленные',
+        'error': 'Ошибки',
+        'changed': 'Изменения',
+        'unknown': 'Не проверялись'
+    }
+    # Поля сайта, которые выводятся на страницах /list и /status (SiteMonitor.get_site_summary)
+    PAGE_FIELDS = {
+        'list': ('id', 'name', 'url', 'last_status'),
+        'status': ('id', 'name', 'url', 'check_mode', 'keywords', 'check_count', 'error_count', 'last_check',
+                   'last_status', 'last_timings', 'watch', 'last_watch', 'last_change_summary')
+    }
+    
     def __init__(self):
         """Инициализация бота"""
         self.database = SitesDatabase()
         self.monitor = SiteMonitor(self.database)
         self.application = None
+        self.webhook_server = None
+        
+        # Фоновые задачи (планировщик), запускаемые на event loop бота, и их asyncio задачи
+        self._background_jobs: List[Callable[[], Awaitable]] = []
+        self._background_tasks: List[asyncio.Task] = []
+        self._shutdown_hooks: List[Callable[[], Awaitable]] = []
+        
+        # Ограничение одновременных прогонов проверки: у /check свои слоты,
+        # чтобы ручная проверка не ждала окончания многочасового планового прогона
+        self._check_slots = asyncio.Semaphore(config.CHECK_RUN_CONCURRENCY)
+        self._manual_check_slots = asyncio.Semaphore(config.MANUAL_CHECK_CONCURRENCY)
+        
+        # Кеш страниц /list и /status: (user_id, представление) -> страницы (LRU на PAGE_CACHE_SIZE записей)
+        self._page_cache: OrderedDict = OrderedDict()
         
         # Настройка логирования
         logging.basicConfig(
@@ -28,6 +81,61 @@ class SiteMonitorBot:
         )
         self.logger = logging.getLogger(__name__)
     
+    def add_background_job(self, job: Callable[[], Awaitable]):
+        """
+        Регистрирует фоновую задачу, которая запустится на event loop бота
+        
+        Args:
+            job (Callable[[], Awaitable]): Асинхронная функция без аргументов
+        """
+        self._background_jobs.append(job)
+    
+    def add_shutdown_hook(self, hook: Callable[[], Awaitable]):
+        """
+        Регистрирует асинхронную функцию, которая выполняется при остановке бота
+        до отмены фоновых задач (например, чтобы дать прогону проверки остановиться)
+        
+        Args:
+            hook (Callable[[], Awaitable]): Асинхронная функция без аргументов
+        """
+        self._shutdown_hooks.append(hook)
+    
+    async def run_check(self, check: Callable, *args, manual: bool = False, **kwargs):
+        """
+        Выполняет блокирующую проверку сайтов в пуле потоков, не останавливая
+        обработку команд; одновременно выполняется не больше CHECK_RUN_CONCURRENCY плановых
+        прогонов и MANUAL_CHECK_CONCURRENCY проверок /check, остальные ждут своей очереди
+        
+        Args:
+            check (Callable): Функция проверки (например, SiteMonitor.check_sites)
+            *args, **kwargs: Аргументы функции
+            manual (bool): Проверка запущена пользователем (/check)
+            
+        Returns:
+            Результат функции проверки
+        """
+        async with self._manual_check_slots if manual else self._check_slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, functools.partial(check, *args, **kwargs))
+    
+    async def _post_init(self, application: Application):
+        """Запускает фоновые задачи после инициализации приложения"""
+        for job in self._background_jobs:
+            self._background_tasks.append(application.create_task(job()))
+    
+    async def _post_stop(self, application: Application):
+        """Останавливает фоновые задачи при остановке приложения"""
+        for hook in self._shutdown_hooks:
+            try:
+                await hook()
+            except Exception as e:
+                self.logger.error(f"Ошибка при остановке: {str(e)}")
+        
+        for task in self._background_tasks:
+            task.cancel()
+        await asyncio.gather(*self._background_tasks, return_exceptions=True)
+        self._background_tasks.clear()
+    
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         Обработчик команды /start
@@ -48,6 +156,11 @@ class SiteMonitorBot:
         welcome_text += "/remove - Удалить сайт\n"
         welcome_text += "/status - Статус всех сайтов\n"
         welcome_text += "/check - Запустить проверку сейчас\n"
+        welcome_text += "/rules - Настроить отслеживаемые фрагменты страницы\n"
+        welcome_text += "/mode - Выбрать режим проверки сайта\n"
+        welcome_text += "/watch - Уведомлять о появлении слов или изменении значений\n"
+        welcome_text += "/import - Добавить сайты из файла\n"
+        welcome_text += "/export - Выгрузить сайты в файл\n"
         welcome_text += "/help - Показать справку\n\n"
         welcome_text += "💡 Чтобы добавить сайт, используйте команду /add"
         
@@ -69,6 +182,15 @@ class SiteMonitorBot:
         help_text += "   Пример: /remove 1\n\n"
         help_text += "📊 /status - Показать статус всех сайтов\n\n"
         help_text += "🔍 /check - Запустить проверку всех сайтов сейчас\n\n"
+        help_text += "🎯 /rules - Отслеживать только нужные фрагменты страницы\n"
+        help_text += "   Пример: /rules 1 include #price\n\n"
+        help_text += "🔎 /mode - Режим проверки: content, availability или keyword\n"
+        help_text += "   Пример: /mode 1 keyword В наличии, Купить\n\n"
+        help_text += "👀 /watch - Уведомлять о появлении слова или изменении значения\n"
+        help_text += "   Пример: /watch 1 re:(\\d+) руб\n\n"
+        help_text += "📥 /import - Добавить сайты из файла (txt, CSV, JSON)\n\n"
+        help_text += "📤 /export - Выгрузить сайты в файл\n"
+        help_text += "   Пример: /export json\n\n"
         help_text += "❓ /help - Показать эту справку\n\n"
         help_text += "💡 Сайты проверяются автоматически каждые 6 часов"
         
@@ -92,12 +214,13 @@ class SiteMonitorBot:
             )
             return
         
-        url = context.args[0]
-        name = ' '.join(context.args[1:]) if len(context.args) > 1 else url
+        url = normalize_url(context.args[0])
+        
+        if not url:
+            await update.message.reply_text(f"❌ Некорректный URL: {context.args[0]}")
+            return
         
-        # Простая валидация URL
-        if not url.startswith(('http://', 'https://')):
-            url = 'https://' + url
+        name = ' '.join(context.args[1:]) if len(context.args) > 1 else url
         
         # Добавляем сайт в базу данных
         success = self.database.add_site(url, name, user_id)
@@ -111,7 +234,7 @@ class SiteMonitorBot:
             )
         else:
             await update.message.reply_text(
-                f"❌ Ошибка! Сайт {url} уже существует в базе данных."
+                f"❌ Ошибка! Сайт {url} уже есть в вашем списке."
             )
     
     async def list_sites(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -122,61 +245,122 @@ class SiteMonitorBot:
             update (Update): Обновление от Telegram
             context (ContextTypes.DEFAULT_TYPE): Контекст бота
         """
+        await self._send_first_page(update, 'list')
+    
+    async def import_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /import для массового добавления сайтов из файла
+        
+        Если команда отправлена ответом на сообщение с файлом, импортирует этот файл,
+        иначе ждет следующий файл от пользователя
+        
+        Args:
+            update (Update): Обновление от Telegram
+            context (ContextTypes.DEFAULT_TYPE): Контекст бота
+        """
+        replied = update.message.reply_to_message
+        if replied and replied.document:
+            await self._import_document(update, replied.document)
+            return
+        
+        context.user_data['awaiting_import'] = True
+        await update.message.reply_text(
+            "📥 Отправьте файл со списком сайтов (txt, CSV или JSON).\n\n"
+            "📝 txt: по одному URL в строке, через пробел можно указать название\n"
+            "📝 CSV: URL в первой колонке, название во второй\n"
+            "📝 JSON: список URL или объектов {\"url\": ..., \"name\": ...}\n\n"
+            f"💡 Не больше {config.IMPORT_MAX_SITES} сайтов за раз"
+        )
+    
+    async def document_received(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик присланных файлов: импортирует их после /import или с подписью /import
+        
+        Args:
+            update (Update): Обновление от Telegram
+            context (ContextTypes.DEFAULT_TYPE): Контекст бота
+        """
+        caption = update.message.caption or ''
+        awaiting = context.user_data.pop('awaiting_import', False)
+        
+        if awaiting or caption.startswith('/import'):
+            await self._import_document(update, update.message.document)
+    
+    async def _import_document(self, update: Update, document):
+        """
+        Скачивает файл, разбирает его и добавляет сайты одной записью в базу
+        
+        Args:
+            update (Update): Обновление от Telegram
+            document (Document): Файл со списком сайтов
+        """
         user_id = update.effective_user.id
-        user_sites = self.database.get_sites_by_user(user_id)
         
-        if not user_sites:
+        if document.file_size and document.file_size > config.IMPORT_MAX_FILE_SIZE:
             await update.message.reply_text(
-                "📭 У вас пока нет добавленных сайтов.\n\n"
-                "💡 Используйте команду /add чтобы добавить первый сайт!"
+                f"❌ Файл слишком большой (максимум {config.IMPORT_MAX_FILE_SIZE // 1024} КБ)"
             )
             return
         
-        # Группируем сайты по статусу
-        sites_by_status = {'ok': [], 'error': [], 'changed': [], 'unknown': []}
+        try:
+            telegram_file = await document.get_file()
+            data = bytes(await telegram_file.download_as_bytearray())
+            entries, rejected = parse_sites_file(data, document.file_name or '')
+        except ValueError as e:
+            await update.message.reply_text(f"❌ Не удалось прочитать файл: {str(e)}")
+            return
         
-        for site in user_sites:
-            status = site.get('last_status', 'unknown')
-            if status in sites_by_status:
-                sites_by_status[status].append(site)
-            else:
-                sites_by_status['unknown'].append(site)
-        
-        # Формируем сообщение
-        message = f"📋 Ваши сайты ({len(user_sites)}):\n\n"
-        
-        for status, sites in sites_by_status.items():
-            if sites:
-                status_emoji = {
-                    'ok': '✅',
-                    'error': '❌',
-                    'changed': '🔄',
-                    'unknown': '❓'
-                }
-                status_name = {
-                    'ok': 'Работают',
-                    'error': 'Ошибки',
-                    'changed': 'Изменения',
-                    'unknown': 'Не проверялись'
-                }
-                
-                message += f"{status_emoji[status]} {status_name[status]}:\n"
-                
-                for site in sites:
-                    message += f"  {site['id']}. {site['name']}\n"
-                    message += f"     {site['url']}\n"
-                
-                message += "\n"
-        
-        message += "💡 Используйте /status для подробной информации"
-        
-        # Разбиваем длинное сообщение если нужно
-        if len(message) > 4096:
-            parts = [message[i:i+4096] for i in range(0, len(message), 4096)]
-            for i, part in enumerate(parts):
-                await update.message.reply_text(f"{part}\n\nЧасть {i+1}/{len(parts)}")
-        else:
-            await update.message.reply_text(message)
+        if not entries:
+            await update.message.reply_text("❌ В файле не найдено корректных URL")
+            return
+        
+        if len(entries) > config.IMPORT_MAX_SITES:
+            await update.message.reply_text(
+                f"❌ Слишком много сайтов: {len(entries)} (максимум {config.IMPORT_MAX_SITES})"
+            )
+            return
+        
+        added, duplicates = self.database.add_sites(entries, user_id)
+        
+        report = f"📥 Импорт завершен!\n\n"
+        report += f"✅ Добавлено: {added}\n"
+        report += f"🔁 Уже в базе: {duplicates}\n"
+        if rejected:
+            report += f"❌ Некорректных строк: {rejected}\n"
+        report += "\n📊 Сайты будут проверяться каждые 6 часов"
+        
+        await update.message.reply_text(report)
+    
+    async def export_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /export для выгрузки сайтов пользователя в файл
+        
+        Args:
+            update (Update): Обновление от Telegram
+            context (ContextTypes.DEFAULT_TYPE): Контекст бота
+        """
+        user_id = update.effective_user.id
+        fmt = context.args[0].lower() if context.args else 'csv'
+        
+        if fmt not in EXPORT_FORMATS:
+            await update.message.reply_text(
+                "❌ Неверный формат!\n\n"
+                f"📝 Используйте: /export [{'|'.join(EXPORT_FORMATS)}]"
+            )
+            return
+        
+        user_sites = self.database.get_sites_by_user(user_id)
+        
+        if not user_sites:
+            await update.message.reply_text("📭 У вас пока нет добавленных сайтов.")
+            return
+        
+        data, filename = export_sites(user_sites, fmt)
+        await update.message.reply_document(
+            document=data,
+            filename=filename,
+            caption=f"📤 Ваши сайты ({len(user_sites)})"
+        )
     
     async def remove_site(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -223,6 +407,189 @@ class SiteMonitorBot:
                 f"❌ Ошибка при удалении сайта '{site['name']}'"
             )
     
+    async def rules_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /rules для настройки отслеживаемых фрагментов страницы
+        
+        Args:
+            update (Update): Обновление от Telegram
+            context (ContextTypes.DEFAULT_TYPE): Контекст бота
+        """
+        user_id = update.effective_user.id
+        
+        if not context.args:
+            await update.message.reply_text(
+                "❌ Неверный формат команды!\n\n"
+                "📝 Используйте:\n"
+                "/rules <ID> - показать правила\n"
+                "/rules <ID> include <селектор> - учитывать только фрагмент\n"
+                "/rules <ID> exclude <селектор> - не учитывать фрагмент\n"
+                f"/rules <ID> normalize <{'|'.join(NORMALIZERS)}|re:выражение> - заменять изменчивые значения\n"
+                "/rules <ID> clear - удалить все правила\n\n"
+                "💡 Селектор - CSS (например, div.price), XPath (например, //main//table) или поля JSON ответа (например, $.data.price)"
+            )
+            return
+        
+        try:
+            site_id = int(context.args[0])
+        except ValueError:
+            await update.message.reply_text("❌ ID сайта должен быть числом!")
+            return
+        
+        # Проверяем, принадлежит ли сайт пользователю
+        site = self.database.get_site_by_id(site_id)
+        if not site or site.get('user_id') != user_id:
+            await update.message.reply_text(
+                f"❌ Сайт с ID {site_id} не найден или не принадлежит вам!"
+            )
+            return
+        
+        rules = {kind: list(values) for kind, values in (site.get('rules') or {}).items()}
+        action = context.args[1].lower() if len(context.args) > 1 else None
+        
+        if action is None:
+            await update.message.reply_text(f"🎯 Правила для {site['name']}:\n\n{format_rules(rules)}")
+            return
+        
+        if action == 'clear':
+            rules = {}
+        else:
+            value = ' '.join(context.args[2:])
+            error = validate_rule(action, value)
+            if not error and not value:
+                error = "Не указан селектор или нормализатор"
+            if error:
+                await update.message.reply_text(f"❌ {error}")
+                return
+            if action in RULE_KINDS and value not in rules.setdefault(action, []):
+                rules[action].append(value)
+        
+        self.database.set_site_rules(site_id, rules)
+        await update.message.reply_text(
+            f"✅ Правила для {site['name']} обновлены:\n\n{format_rules(rules)}\n\n"
+            "🔄 Контент будет сохранен заново при следующей проверке"
+        )
+    
+    async def mode_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /mode для выбора режима проверки сайта
+        
+        Args:
+            update (Update): Обновление от Telegram
+            context (ContextTypes.DEFAULT_TYPE): Контекст бота
+        """
+        user_id = update.effective_user.id
+        
+        if not context.args:
+            await update.message.reply_text(
+                "❌ Неверный формат команды!\n\n"
+                "📝 Используйте:\n"
+                "/mode <ID> - показать режим\n"
+                "/mode <ID> content - отслеживать изменения контента\n"
+                "/mode <ID> availability - только доступность (без загрузки страницы)\n"
+                "/mode <ID> keyword <слово>, <фраза> - проверять наличие ключевых слов"
+            )
+            return
+        
+        try:
+            site_id = int(context.args[0])
+        except ValueError:
+            await update.message.reply_text("❌ ID сайта должен быть числом!")
+            return
+        
+        # Проверяем, принадлежит ли сайт пользователю
+        site = self.database.get_site_by_id(site_id)
+        if not site or site.get('user_id') != user_id:
+            await update.message.reply_text(
+                f"❌ Сайт с ID {site_id} не найден или не принадлежит вам!"
+            )
+            return
+        
+        if len(context.args) == 1:
+            mode = self.monitor.check_mode(site)
+            keywords = f": {', '.join(site.get('keywords') or [])}" if mode == 'keyword' else ""
+            await update.message.reply_text(f"🔎 Режим проверки {site['name']}: {mode}{keywords}")
+            return
+        
+        mode = context.args[1].lower()
+        if mode not in CHECK_MODES:
+            await update.message.reply_text(f"❌ Неизвестный режим: {mode} (доступны: {', '.join(CHECK_MODES)})")
+            return
+        
+        keywords = []
+        if mode == 'keyword':
+            keywords = [keyword.strip() for keyword in ' '.join(context.args[2:]).split(',') if keyword.strip()]
+            if not keywords:
+                await update.message.reply_text("❌ Укажите ключевые слова через запятую")
+                return
+        
+        self.database.set_site_check_mode(site_id, mode, keywords)
+        await update.message.reply_text(
+            f"✅ Режим проверки {site['name']}: {mode}"
+            + (f" ({', '.join(keywords)})" if keywords else "")
+        )
+    
+    async def watch_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /watch для настройки правил наблюдения за страницей
+        
+        Args:
+            update (Update): Обновление от Telegram
+            context (ContextTypes.DEFAULT_TYPE): Контекст бота
+        """
+        user_id = update.effective_user.id
+        
+        if not context.args:
+            await update.message.reply_text(
+                "❌ Неверный формат команды!\n\n"
+                "📝 Используйте:\n"
+                "/watch <ID> - показать правила\n"
+                "/watch <ID> <слово или фраза> - уведомить, когда текст появится или пропадет\n"
+                "/watch <ID> re:<выражение> - уведомить, когда изменится найденное значение\n"
+                "/watch <ID> clear - удалить все правила\n\n"
+                "💡 Пока у сайта есть правила наблюдения, уведомления об изменениях приходят только по ним"
+            )
+            return
+        
+        try:
+            site_id = int(context.args[0])
+        except ValueError:
+            await update.message.reply_text("❌ ID сайта должен быть числом!")
+            return
+        
+        # Проверяем, принадлежит ли сайт пользователю
+        site = self.database.get_site_by_id(site_id)
+        if not site or site.get('user_id') != user_id:
+            await update.message.reply_text(
+                f"❌ Сайт с ID {site_id} не найден или не принадлежит вам!"
+            )
+            return
+        
+        patterns = list(site.get('watch') or [])
+        value = ' '.join(context.args[1:])
+        
+        if not value:
+            rules_text = '\n'.join(f"• {pattern}" for pattern in patterns) or "Правил нет"
+            await update.message.reply_text(f"👀 Правила наблюдения для {site['name']}:\n\n{rules_text}")
+            return
+        
+        if value.lower() == 'clear':
+            patterns = []
+        else:
+            error = validate_watch_rule(value)
+            if error:
+                await update.message.reply_text(f"❌ {error}")
+                return
+            if value not in patterns:
+                patterns.append(value)
+        
+        self.database.set_site_watch(site_id, patterns)
+        rules_text = '\n'.join(f"• {pattern}" for pattern in patterns) or "Правил нет"
+        await update.message.reply_text(
+            f"✅ Правила наблюдения для {site['name']} обновлены:\n\n{rules_text}\n\n"
+            "🔄 Новые правила начнут работать со следующей проверки"
+        )
+    
     async def status_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
         Обработчик команды /status для показа статуса всех сайтов
@@ -231,29 +598,190 @@ class SiteMonitorBot:
             update (Update): Обновление от Telegram
             context (ContextTypes.DEFAULT_TYPE): Контекст бота
         """
+        await self._send_first_page(update, 'status')
+    
+    async def _send_first_page(self, update: Update, view: str):
+        """
+        Отправляет первую страницу списка сайтов с кнопками листания
+        
+        Args:
+            update (Update): Обновление от Telegram
+            view (str): Представление ('list' или 'status')
+        """
         user_id = update.effective_user.id
-        user_sites = self.database.get_sites_by_user(user_id)
         
-        if not user_sites:
+        pages = self._get_pages(user_id, view)
+        if not pages:
             await update.message.reply_text(
                 "📭 У вас пока нет добавленных сайтов.\n\n"
                 "💡 Используйте команду /add чтобы добавить первый сайт!"
             )
             return
         
-        message = f"📊 Статус ваших сайтов ({len(user_sites)}):\n\n"
+        text, keyboard = self._render_page(pages, view, 0)
+        await update.message.reply_text(text, reply_markup=keyboard)
+    
+    async def page_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик нажатия кнопок листания /list и /status
+        
+        Редактирует исходное сообщение вместо отправки нового
+        
+        Args:
+            update (Update): Обновление от Telegram
+            context (ContextTypes.DEFAULT_TYPE): Контекст бота
+        """
+        query = update.callback_query
+        view, _, page = query.data.partition(':')
+        
+        if view not in self.PAGE_VIEWS or not page.isdigit():
+            await query.answer()
+            return
+        
+        pages = self._get_pages(query.from_user.id, view)
+        if not pages:
+            await query.answer("📭 У вас больше нет добавленных сайтов")
+            return
+        
+        text, keyboard = self._render_page(pages, view, int(page))
+        await query.answer()
+        try:
+            await query.edit_message_text(text, reply_markup=keyboard)
+        except BadRequest as e:
+            # Повторное нажатие на текущую страницу - сообщение не изменилось
+            if 'not modified' not in str(e):
+                raise
+    
+    def _get_pages(self, user_id: int, view: str) -> Optional[Dict]:
+        """
+        Возвращает разбиение сайтов пользователя на страницы из кеша
+        
+        Кеш сбрасывается, как только меняется любое поле сайтов, которое отображается
+        на страницах (PAGE_FIELDS), или состав сайтов
+        
+        Args:
+            user_id (int): ID пользователя
+            view (str): Представление ('list' или 'status')
+            
+        Returns:
+            Optional[Dict]: Страницы представления или None если у пользователя нет сайтов
+        """
+        user_sites = self.database.get_sites_by_user(user_id)
+        cache_key = (user_id, view)
         
-        for site in user_sites:
-            message += self.monitor.get_site_summary(site)
-            message += "\n" + "─" * 40 + "\n\n"
+        if not user_sites:
+            self._page_cache.pop(cache_key, None)
+            return None
         
-        # Разбиваем длинное сообщение если нужно
-        if len(message) > 4096:
-            parts = [message[i:i+4096] for i in range(0, len(message), 4096)]
-            for i, part in enumerate(parts):
-                await update.message.reply_text(f"{part}\n\nЧасть {i+1}/{len(parts)}")
+        if view == 'list':
+            # Группируем сайты по статусу, сохраняя порядок внутри группы
+            user_sites.sort(key=lambda site: list(self.STATUS_NAMES).index(self._list_status(site)))
+            per_page = config.LIST_PAGE_SIZE
         else:
-            await update.message.reply_text(message)
+            per_page = config.STATUS_PAGE_SIZE
+        signature = tuple(tuple(site.get(field) for field in self.PAGE_FIELDS[view]) for site in user_sites)
+        
+        cached = self._page_cache.get(cache_key)
+        if cached and cached['signature'] == signature:
+            self._page_cache.move_to_end(cache_key)
+            return cached
+        
+        cached = {
+            'signature': signature,
+            'total': len(user_sites),
+            'pages': [user_sites[i:i + per_page] for i in range(0, len(user_sites), per_page)],
+            'rendered': {}
+        }
+        self._page_cache[cache_key] = cached
+        self._page_cache.move_to_end(cache_key)
+        while len(self._page_cache) > config.PAGE_CACHE_SIZE:
+            self._page_cache.popitem(last=False)
+        return cached
+    
+    def _render_page(self, cached: Dict, view: str, page: int) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+        """
+        Формирует текст и кнопки страницы (страница рендерится при первом показе)
+        
+        Args:
+            cached (Dict): Страницы представления из _get_pages
+            view (str): Представление ('list' или 'status')
+            page (int): Номер страницы, начиная с 0
+            
+        Returns:
+            Tuple[str, Optional[InlineKeyboardMarkup]]: (текст страницы, кнопки листания)
+        """
+        pages_count = len(cached['pages'])
+        page = min(max(page, 0), pages_count - 1)
+        
+        if page not in cached['rendered']:
+            sites = cached['pages'][page]
+            
+            if view == 'list':
+                text = f"📋 Ваши сайты ({cached['total']}):\n\n"
+                current_status = None
+                for site in sites:
+                    status = self._list_status(site)
+                    if status != current_status:
+                        if current_status is not None:
+                            text += "\n"
+                        text += f"{self.STATUS_EMOJI[status]} {self.STATUS_NAMES[status]}:\n"
+                        current_status = status
+                    text += f"  {site['id']}. {site['name']}\n"
+                    text += f"     {site['url']}\n"
+                text += "\n💡 Используйте /status для подробной информации"
+            else:
+                text = f"📊 Статус ваших сайтов ({cached['total']}):\n\n"
+                for site in sites:
+                    text += self.monitor.get_site_summary(site)
+                    text += "\n" + "─" * 40 + "\n\n"
+            
+            if pages_count > 1:
+                text = text.rstrip() + f"\n\n📄 Страница {page + 1}/{pages_count}"
+            
+            # Страховка от очень длинных названий и URL
+            if len(text) > self.MAX_MESSAGE_LENGTH:
+                text = text[:self.MAX_MESSAGE_LENGTH - 1] + "…"
+            
+            cached['rendered'][page] = text
+        
+        return cached['rendered'][page], self._page_keyboard(view, page, pages_count)
+    
+    def _page_keyboard(self, view: str, page: int, pages_count: int) -> Optional[InlineKeyboardMarkup]:
+        """
+        Формирует кнопки листания страниц
+        
+        Args:
+            view (str): Представление ('list' или 'status')
+            page (int): Номер текущей страницы
+            pages_count (int): Количество страниц
+            
+        Returns:
+            Optional[InlineKeyboardMarkup]: Кнопки или None если страница одна
+        """
+        if pages_count <= 1:
+            return None
+        
+        buttons = []
+        if page > 0:
+            buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data=f"{view}:{page - 1}"))
+        buttons.append(InlineKeyboardButton(f"{page + 1}/{pages_count}", callback_data=f"{view}:{page}"))
+        if page < pages_count - 1:
+            buttons.append(InlineKeyboardButton("Вперед ➡️", callback_data=f"{view}:{page + 1}"))
+        
+        return InlineKeyboardMarkup([buttons])
+    
+    def _list_status(self, site: Dict) -> str:
+        """
+        Возвращает группу сайта для /list
+        
+        Args:
+            site (Dict): Данные сайта
+            
+        Returns:
+            str: Статус сайта или 'unknown' для непроверенных и прочих статусов
+        """
+        status = site.get('last_status') or 'unknown'
+        return status if status in self.STATUS_NAMES else 'unknown'
     
     async def check_now(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """
@@ -276,23 +804,16 @@ class SiteMonitorBot:
         await update.message.reply_text("🔍 Запускаю проверку ваших сайтов...")
         
         try:
-            # Проверяем только сайты пользователя
-            results = {'ok': [], 'error': [], 'changed': []}
-            
-            for site in user_sites:
-                if site.get('is_active', True):
-                    status, message, content_hash = self.monitor.check_site(site)
-                    results[status].append({
-                        'site': site,
-                        'message': message,
-                        'content_hash': content_hash
-                    })
+            # Проверяем только активные сайты пользователя (без паузы между запросами)
+            active_sites = [site for site in user_sites if site.get('is_active', True)]
+            results = await self.run_check(self.monitor.check_sites, active_sites, pause=False, manual=True)
             
             # Формируем отчет
             report = f"📊 Результаты проверки ({len(user_sites)} сайтов):\n\n"
             report += f"✅ Работают: {len(results['ok'])}\n"
             report += f"❌ Ошибки: {len(results['error'])}\n"
-            report += f"🔄 Изменения: {len(results['changed'])}\n\n"
+            report += f"🔄 Изменения: {len(results['changed'])}\n"
+            report += f"🐢 Медленные: {len(results['slow'])}\n\n"
             
             if results['error']:
                 report += "❌ Сайты с ошибками:\n"
@@ -303,6 +824,13 @@ class SiteMonitorBot:
             if results['changed']:
                 report += "🔄 Сайты с изменениями:\n"
                 for result in results['changed']:
+                    message = result['message'].replace('\n', '\n    ')
+                    report += f"  • {result['site']['name']}: {message}\n"
+                report += "\n"
+            
+            if results['slow']:
+                report += "🐢 Медленные сайты:\n"
+                for result in results['slow']:
                     report += f"  • {result['site']['name']}: {result['message']}\n"
                 report += "\n"
             
@@ -311,6 +839,41 @@ class SiteMonitorBot:
         except Exception as e:
             await update.message.reply_text(f"❌ Ошибка при проверке: {str(e)}")
     
+    async def profile_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """
+        Обработчик команды /profile для включения профилирования проверок (только для администраторов)
+        
+        Args:
+            update (Update): Обновление от Telegram
+            context (ContextTypes.DEFAULT_TYPE): Контекст бота
+        """
+        user_id = update.effective_user.id
+        
+        if user_id not in config.ADMIN_USER_IDS:
+            await update.message.reply_text("❌ Команда доступна только администраторам!")
+            return
+        
+        action = context.args[0].lower() if context.args else 'status'
+        
+        if action == 'on':
+            self.monitor.profiling_enabled = True
+        elif action == 'off':
+            self.monitor.profiling_enabled = False
+        elif action != 'status':
+            await update.message.reply_text(
+                "❌ Неверный формат команды!\n\n"
+                "📝 Используйте: /profile [on|off|status]"
+            )
+            return
+        
+        if self.monitor.profiling_enabled:
+            await update.message.reply_text(
+                f"🔬 Профилирование проверок включено (режим: {config.PROFILE_MODE})\n\n"
+                f"📝 Сводка по самым медленным сайтам и этапам пишется в лог после каждого прогона"
+            )
+        else:
+            await update.message.reply_text("🔬 Профилирование проверок выключено")
+    
     async def error_handler(self, update: object, context: ContextTypes.DEFAULT_TYPE):
         """
         Обработчик ошибок бота
@@ -321,10 +884,22 @@ class SiteMonitorBot:
         """
         self.logger.error(f"Exception while handling an update: {context.error}")
     
-    def run(self):
-        """Запуск бота"""
+    def build_application(self) -> Application:
+        """
+        Создает приложение бота с обработчиками команд
+        
+        Returns:
+            Application: Приложение бота
+        """
         # Создаем приложение
-        self.application = Application.builder().token(config.TELEGRAM_BOT_TOKEN).build()
+        self.application = (
+            Application.builder()
+            .token(config.TELEGRAM_BOT_TOKEN)
+            .base_url(config.TELEGRAM_API_URL)
+            .post_init(self._post_init)
+            .post_stop(self._post_stop)
+            .build()
+        )
         
         # Добавляем обработчики команд
         self.application.add_handler(CommandHandler("start", self.start))
@@ -334,10 +909,75 @@ class SiteMonitorBot:
         self.application.add_handler(CommandHandler("remove", self.remove_site))
         self.application.add_handler(CommandHandler("status", self.status_command))
         self.application.add_handler(CommandHandler("check", self.check_now))
+        self.application.add_handler(CommandHandler("rules", self.rules_command))
+        self.application.add_handler(CommandHandler("mode", self.mode_command))
+        self.application.add_handler(CommandHandler("watch", self.watch_command))
+        self.application.add_handler(CommandHandler("import", self.import_command))
+        self.application.add_handler(CommandHandler("export", self.export_command))
+        self.application.add_handler(MessageHandler(filters.Document.ALL, self.document_received))
+        self.application.add_handler(CommandHandler("profile", self.profile_command))
+        self.application.add_handler(CallbackQueryHandler(self.page_callback, pattern=r"^(list|status):\d+$"))
         
         # Добавляем обработчик ошибок
         self.application.add_error_handler(self.error_handler)
         
+        return self.application
+    
+    async def serve_webhook(self, stop_event: asyncio.Event = None):
+        """
+        Принимает обновления через вебхук до остановки (SIGINT/SIGTERM или stop_event)
+        
+        Args:
+            stop_event (asyncio.Event): Событие остановки (по умолчанию - по сигналу)
+        """
+        application = self.application
+        loop = asyncio.get_running_loop()
+        
+        if stop_event is None:
+            stop_event = asyncio.Event()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                loop.add_signal_handler(signum, stop_event.set)
+        
+        # Без заданного секрета генерируем случайный: запросы без него сервер отклоняет
+        secret_token = config.WEBHOOK_SECRET_TOKEN or secrets.token_urlsafe(32)
+        self.webhook_server = WebhookServer(
+            application, loop, config.WEBHOOK_LISTEN, config.WEBHOOK_PORT,
+            urlsplit(config.WEBHOOK_URL).path or '/', secret_token,
+            config.WEBHOOK_CERT_FILE, config.WEBHOOK_KEY_FILE
+        )
+        
+        await application.initialize()
+        try:
+            await self._post_init(application)
+            self.webhook_server.start()
+            # Самоподписанный сертификат нужно передать Telegram при регистрации вебхука
+            certificate = None
+            if config.WEBHOOK_CERT_FILE:
+                with open(config.WEBHOOK_CERT_FILE, 'rb') as f:
+                    certificate = f.read()
+            await application.bot.set_webhook(
+                config.WEBHOOK_URL, certificate=certificate, secret_token=secret_token,
+                allowed_updates=Update.ALL_TYPES
+            )
+            await application.start()
+            await stop_event.wait()
+        finally:
+            self.webhook_server.shutdown()
+            self.webhook_server.server_close()
+            if application.running:
+                await application.stop()
+            await self._post_stop(application)
+            await application.shutdown()
+    
+    def run(self):
+        """Запуск бота: вебхук, если задан WEBHOOK_URL, иначе long polling"""
+        self.build_application()
+        
+        if config.WEBHOOK_URL:
+            self.logger.info(f"Запускаю бота в режиме вебхука ({config.WEBHOOK_URL})...")
+            asyncio.run(self.serve_webhook())
+            return
+        
         # Запускаем бота
         self.logger.info("Запускаю бота...")
         self.application.run_polling()
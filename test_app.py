@@ -47,6 +47,20 @@ def test_database():
         first_site = all_sites[0]
         db.update_site_status(first_site['id'], 'ok', 'test_hash_123')
         print(f"    Статус обновлен для: {first_site['name']}")
+        
+        # Одновременные обновления из разных потоков не теряют изменения друг друга
+        import threading
+        check_count = db.get_site_by_id(first_site['id'])['check_count']
+        writers = [
+            threading.Thread(target=lambda: [db.update_site_status(first_site['id'], 'ok') for _ in range(30)]),
+            threading.Thread(target=lambda: [db.set_site_watch(first_site['id'], [f"слово {i}"]) for i in range(30)])
+        ]
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join()
+        site = db.get_site_by_id(first_site['id'])
+        assert site['check_count'] == check_count + 30 and site['watch'] == ["слово 29"]
     
     # Тестируем удаление сайта
     print("\n  🗑️ Удаляю тестовый сайт...")
@@ -58,6 +72,521 @@ def test_database():
     print("✅ Тестирование базы данных завершено\n")
     return db
 
+def test_bulk_import():
+    """Тестирование массового импорта сайтов"""
+    print("🧪 Тестирование импорта сайтов из файла...")
+    
+    import os
+    from site_import import parse_sites_file, export_sites
+    
+    # Начинаем с пустой базы, даже если предыдущий запуск не убрал файл
+    if os.path.exists("test_import_sites.json"):
+        os.remove("test_import_sites.json")
+    db = SitesDatabase("test_import_sites.json")
+    
+    # Файл с дубликатом и некорректной строкой
+    data = "https://google.com Google\nyandex.ru\nhttps://google.com\nне url\n".encode('utf-8')
+    entries, rejected = parse_sites_file(data, "sites.txt")
+    print(f"    Разобрано: {len(entries)}, отброшено: {rejected}")
+    assert entries == [("https://google.com", "Google"), ("https://yandex.ru", None)]
+    assert rejected == 1
+    
+    # Импорт одной записью в базу, повторный импорт ничего не добавляет
+    assert db.add_sites(entries, 12345) == (2, 0)
+    assert db.add_sites(entries, 12345) == (0, 2)
+    
+    # Другой пользователь может следить за теми же URL
+    assert db.add_sites(entries, 67890) == (2, 0)
+    
+    # Выгрузка в JSON читается обратно импортом
+    exported, filename = export_sites(db.get_sites_by_user(12345), "json")
+    assert parse_sites_file(exported, filename)[0] == [("https://google.com", "Google"), ("https://yandex.ru", "https://yandex.ru")]
+    
+    print("✅ Тестирование импорта завершено\n")
+
+def test_content_rules():
+    """Тестирование правил выборочного мониторинга"""
+    print("🧪 Тестирование правил фрагментов страницы...")
+    
+    monitor = SiteMonitor(SitesDatabase("test_sites.json"))
+    page = (
+        "<html><body><div class='ad'>Реклама 42</div>"
+        "<main><p id='price'>Цена 1 200 руб на 12.10.2026</p><table><tr><td>Склад</td></tr></table></main></body></html>"
+    )
+    
+    # Без правил текст извлекается как раньше
+    assert monitor.extract_text(page, {}) == monitor.extract_text(page)
+    assert monitor.extract_text(page, {'exclude': ['.ad', '//table']}) == "Цена 1 200 руб на 12.10.2026"
+    assert monitor.extract_text(page, {'include': ['#price'], 'normalize': ['dates', 'numbers']}) == "Цена [число] [число] руб на [дата]"
+    
+    # Выражения с вложенными квантификаторами отклоняются и не выполняются, даже если уже сохранены
+    from content_rules import normalize_text, validate_rule
+    assert validate_rule('normalize', 're:(a+)+$') is not None
+    assert validate_rule('normalize', 're:(\\d{1,3}\\.){3}\\d+') is None
+    assert normalize_text("a" * 40 + "!", ['re:(a+)+$']) == "a" * 40 + "!"
+    
+    print("✅ Тестирование правил завершено\n")
+
+def test_check_modes():
+    """Тестирование режимов проверки сайта"""
+    print("🧪 Тестирование режимов проверки...")
+    
+    site = {'url': "https://example.com", 'check_mode': 'keyword', 'keywords': ["В наличии", "Купить"]}
+    assert SiteMonitor.check_mode({'url': "https://example.com"}) == 'content'
+    assert SiteMonitor.check_mode(site) == 'keyword'
+    from watch_rules import WatchMatcher
+    
+    matches = WatchMatcher(SiteMonitor.watch_patterns(site)).match("Товар в наличии, доставка завтра")
+    missing = SiteMonitor._missing_keywords(site, matches)
+    print(f"    Не найдены: {missing}")
+    assert missing == ["Купить"]
+    
+    # Режим keyword без ключевых слов (база это допускает) не ломает проверку
+    import os
+    if os.path.exists("test_mode_sites.json"):
+        os.remove("test_mode_sites.json")
+    db = SitesDatabase("test_mode_sites.json")
+    db.add_site("https://example.com", "Пример", 1)
+    db.set_site_check_mode(1, 'keyword', [])
+    monitor = SiteMonitor(db)
+    text = "Товар в наличии, доставка завтра. " * 10
+    page = {'error': None, 'status_code': 200, 'content': None, 'texts': {}, 'timings': {},
+            'text': text, 'text_hash': monitor.hash_text(text), 'text_length': len(text)}
+    result = monitor._evaluate(db.get_all_sites()[0], page)
+    assert result['status'] == 'ok', result['message']
+    
+    print("✅ Тестирование режимов завершено\n")
+
+def test_watch_rules():
+    """Тестирование правил наблюдения"""
+    print("🧪 Тестирование правил наблюдения...")
+    
+    from watch_rules import WatchMatcher, validate_watch_rule, watch_events
+    
+    patterns = ["В наличии", "re:Цена (\\d+) руб", "re:(?i)распродажа"]
+    matcher = WatchMatcher(patterns)
+    before = matcher.match("Цена 100 руб. Нет в продаже")
+    after = matcher.match("Цена 120 руб. Товар в НАЛИЧИИ. РАСПРОДАЖА")
+    assert before == {"В наличии": None, "re:Цена (\\d+) руб": "100", "re:(?i)распродажа": None}
+    
+    events = watch_events(patterns, before, after)
+    print(f"    Сработали: {events}")
+    assert events == [
+        "«В наличии» появилось на странице",
+        "re:Цена (\\d+) руб: «100» → «120»",
+        "re:(?i)распродажа: найдено «РАСПРОДАЖА»"
+    ]
+    assert watch_events(patterns, {}, after) == []
+    
+    # Выражение с вложенными квантификаторами отклоняется, а сохраненное ранее не выполняется
+    assert validate_watch_rule("re:(a+)+$") is not None
+    assert WatchMatcher(["re:(a+)+$", "a"]).match("a" * 40 + "!") == {"re:(a+)+$": None, "a": "a"}
+    
+    # Одинаковые имена групп в правилах разных пользователей не мешают друг другу
+    named = ["re:(?P<p>\\d+) руб", "re:Цена (?P<p>\\d+)", "re:(?P<_w0>Товар)", "re:(\\d+) руб"]
+    assert WatchMatcher(named).match("Цена 120 руб. Товар") == {
+        "re:(?P<p>\\d+) руб": "120", "re:Цена (?P<p>\\d+)": "120", "re:(?P<_w0>Товар)": "Товар", "re:(\\d+) руб": "120"
+    }
+    
+    print("✅ Тестирование правил наблюдения завершено\n")
+
+def test_html_stream():
+    """Тестирование потокового извлечения текста"""
+    print("🧪 Тестирование потокового извлечения текста...")
+    
+    from html_stream import StreamingTextExtractor
+    from site_monitor import SKIP_TAGS
+    
+    html = (
+        "<html><head><title>Заголовок</title><style>p {color: red}</style></head><body>"
+        "<header>Шапка</header><p>Цена&nbsp;100&#160;руб &amp; доставка &#150; завтра &copy; &unknown;</p>"
+        "<!-- комментарий --><div>Слово<b>слитно</b>   и   пробелы<br>перенос</div>"
+        "<script>var x = '<p>не текст</p>';</script><ul><li>один<li>два</ul>"
+        "<p>&#x41;&#66;C &#x1F600; незакрытый <i>тег</p><footer>Подвал</footer></body></html>"
+    )
+    expected = SiteMonitor.__new__(SiteMonitor).extract_text(html)
+    extractor = StreamingTextExtractor(SKIP_TAGS)
+    for position in range(0, len(html), 7):
+        extractor.feed(html[position:position + 7])
+    extractor.close()
+    print(f"    Текст: {extractor.text}")
+    assert extractor.text == expected
+    
+    # Суррогаты и значения вне Unicode заменяются, а не ломают хеширование
+    extractor = StreamingTextExtractor(SKIP_TAGS)
+    extractor.feed("<p>&#xD800; &#55357;&#56832; &#x110000; ok</p>")
+    extractor.close()
+    assert extractor.text == "\ufffd \ufffd\ufffd \ufffd ok"
+    assert len(extractor.hexdigest()) == 64
+    
+    print("✅ Тестирование потокового извлечения завершено\n")
+
+def test_json_snapshot():
+    """Тестирование снимков JSON ответов"""
+    print("🧪 Тестирование снимков JSON...")
+    
+    from json_snapshot import canonical_json, diff_fields, json_fields, parse_json_path
+    
+    data = {"data": {"items": [{"price": 10, "id": "a"}, {"price": 20, "id": "b"}]}, "ts": 1}
+    assert parse_json_path("$.data.items[*].price") == ["data", "items", "*", "price"]
+    assert canonical_json({"b": 1, "a": [1, 2]}) == canonical_json({"a": [1, 2], "b": 1})
+    assert json_fields(data, ["$.data.items[*].price"]) == {"$.data.items[0].price": 10, "$.data.items[1].price": 20}
+    assert list(json_fields(data, exclude=["$.ts", "$.data.items[*].id"])) == ["$.data.items[0].price", "$.data.items[1].price"]
+    
+    changed = json_fields({"data": {"items": [{"price": 15, "id": "a"}]}, "ts": 2}, exclude=["$.ts"])
+    diff = diff_fields(json_fields(data, exclude=["$.ts"]), changed)
+    print(f"    Изменения полей: {diff}")
+    assert diff == {'changed': ["$.data.items[0].price"], 'added': [],
+                    'removed': ["$.data.items[1].price", "$.data.items[1].id"]}
+    
+    print("✅ Тестирование снимков JSON завершено\n")
+
+def test_transfer_accounting():
+    """Тестирование учета объема сжатых ответов"""
+    print("🧪 Тестирование учета объема ответов...")
+    
+    import gzip
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from fetcher import PageFetcher
+    
+    body = ("<p>Новости дня</p>" * 1000).encode()
+    
+    class GzipHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            compressed = gzip.compress(body) if 'gzip' in self.headers.get('Accept-Encoding', '') else body
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            if compressed is not body:
+                self.send_header('Content-Encoding', 'gzip')
+            self.send_header('Content-Length', str(len(compressed)))
+            self.end_headers()
+            self.wfile.write(compressed)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(('127.0.0.1', 0), GzipHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        timings = {}
+        PageFetcher().fetch_stream(f"http://127.0.0.1:{server.server_address[1]}/", 5, timings, lambda text: None)
+    finally:
+        server.shutdown()
+        server.server_close()
+    
+    print(f"    По сети: {timings['wire_bytes']} байт, после распаковки: {timings['decoded_bytes']} байт")
+    assert timings['decoded_bytes'] == len(body)
+    assert timings['wire_bytes'] == len(gzip.compress(body))
+    
+    print("✅ Тестирование учета объема ответов завершено\n")
+
+def test_fetch_retries():
+    """Тестирование повторов загрузки после временных ошибок"""
+    print("🧪 Тестирование повторов загрузки...")
+    
+    import os
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    import config
+    from circuit_breaker import HostCircuitBreaker, OPEN
+    from site_monitor import SiteMonitor
+    
+    # Начинаем с пустой базы и состояния, даже если предыдущий запуск не убрал файлы
+    for file in ("test_retry_sites.json", "test_circuit_state.json", "test_redirect_cache.json"):
+        if os.path.exists(file):
+            os.remove(file)
+    
+    hits = {}
+    
+    class FlakyHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits[self.path] = hits.get(self.path, 0) + 1
+            # /flaky отвечает 503 только на первый запрос, /down* - всегда, /broken - всегда 500
+            if self.path.startswith(('/down', '/broken')) or hits[self.path] == 1:
+                self.send_response(500 if self.path == '/broken' else 503)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = ("<p>Страница после восстановления сервера</p>" * 10).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    saved = (config.MAX_RETRIES, config.RETRY_BACKOFF_BASE, config.RETRY_BUDGET_RATIO)
+    config.MAX_RETRIES, config.RETRY_BACKOFF_BASE, config.RETRY_BUDGET_RATIO = 3, 0.01, 0
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        db = SitesDatabase("test_retry_sites.json")
+        monitor = SiteMonitor(db)
+        monitor.circuit_breaker = HostCircuitBreaker(state_file='test_circuit_state.json', failure_threshold=0)
+        monitor.redirects.state_file = 'test_redirect_cache.json'
+        
+        db.add_site(base + "/flaky", "Flaky", 1)
+        results = monitor.check_sites(db.get_all_sites(), pause=False)
+        assert [entry['retries'] for entry in results['ok']] == [1] and hits['/flaky'] == 2
+        
+        # Бюджет прогона - MAX_RETRIES повторов на все URL: второй недоступный сайт получает остаток
+        db.remove_site(1)
+        db.add_site(base + "/down1", "Down 1", 1)
+        db.add_site(base + "/down2", "Down 2", 1)
+        results = monitor.check_sites(db.get_all_sites(), pause=False)
+        print(f"    Запросы: {hits}")
+        assert len(results['error']) == 2
+        assert sum(entry['retries'] for entry in results['error']) == 3
+        assert hits['/down1'] + hits['/down2'] == 5
+        
+        # Ошибка 500 не повторяется, но считается сбоем хоста
+        monitor.circuit_breaker = HostCircuitBreaker(state_file='test_circuit_state.json', failure_threshold=2)
+        db.remove_site(2)
+        db.remove_site(1)
+        db.add_site(base + "/broken", "Broken", 1)
+        for _ in range(2):
+            monitor.check_sites(db.get_all_sites(), pause=False)
+        assert hits['/broken'] == 2
+        assert monitor.circuit_breaker.state(monitor.circuit_breaker.host_key(base)) == OPEN
+    finally:
+        config.MAX_RETRIES, config.RETRY_BACKOFF_BASE, config.RETRY_BUDGET_RATIO = saved
+        server.shutdown()
+        server.server_close()
+    
+    print("✅ Тестирование повторов загрузки завершено\n")
+
+def test_redirect_cache():
+    """Тестирование кеша постоянных редиректов"""
+    print("🧪 Тестирование кеша редиректов...")
+    
+    import requests
+    from datetime import datetime, timedelta
+    from redirect_cache import RedirectCache
+    
+    def response(url, status_code, history=()):
+        result = requests.Response()
+        result.url, result.status_code, result.history = url, status_code, list(history)
+        return result
+    
+    cache = RedirectCache(state_file='test_redirect_cache.json', ttl_hours=24)
+    chain = [response("http://a.ru/", 301), response("https://a.ru/", 308), response("https://www.a.ru/", 302)]
+    cache.learn("http://a.ru/", response("https://www.a.ru/today", 200, chain))
+    print(f"    Кеш: {cache.entries}")
+    assert cache.resolve("http://a.ru/") == ("https://www.a.ru/", 2)
+    assert cache.resolve("http://a.ru/", now=datetime.now() + timedelta(hours=25)) is None
+    
+    # Редирект больше не возвращается исходным URL - запись удаляется
+    cache.learn("http://a.ru/", response("http://a.ru/", 200))
+    assert cache.resolve("http://a.ru/") is None
+    
+    print("✅ Тестирование кеша редиректов завершено\n")
+
+def test_alert_state():
+    """Тестирование состояний оповещений"""
+    print("🧪 Тестирование состояний оповещений...")
+    
+    from datetime import datetime, timedelta
+    from alerts import AlertStateEngine
+    
+    engine = AlertStateEngine(state_file='test_alert_state.json', dedupe_window=300, digest_interval_hours=0)
+    site = {'id': 1, 'name': 'Тест', 'url': 'https://example.com', 'user_id': 1}
+    started = datetime(2026, 1, 1, 12, 0)
+    
+    def events(status, minutes, content_hash=None):
+        result = {'site': site, 'message': status, 'content_hash': content_hash}
+        found = engine.process(1, {status: [result]}, now=started + timedelta(minutes=minutes))
+        return [event for event, items in found.items() if items]
+    
+    # Два разных изменения подряд - оба в уведомлениях, повтор того же хеша подавляется
+    assert events('changed', 0, 'a') == ['changed']
+    assert events('changed', 1, 'b') == ['changed']
+    assert events('changed', 2, 'b') == []
+    
+    # Повторный сбой в пределах окна откладывается до следующей проверки после окна, а не теряется
+    assert events('error', 3) == ['error']
+    assert events('ok', 4) == ['recovered']
+    assert events('error', 5) == []
+    assert events('error', 9) == ['error']
+    assert events('error', 10) == []
+    
+    # Кратковременный сбой внутри окна поглощается без уведомлений
+    assert events('ok', 11) == ['recovered']
+    assert events('error', 12) == []
+    assert events('ok', 13) == []
+    
+    # Из сбоя в медленный ответ - и восстановление, и медленный ответ
+    assert events('error', 30) == ['error']
+    assert events('slow', 31) == ['recovered', 'slow']
+    
+    print("✅ Тестирование состояний оповещений завершено\n")
+
+def test_circuit_breaker():
+    """Тестирование отключения недоступных хостов"""
+    print("🧪 Тестирование circuit breaker...")
+    
+    import os
+    from datetime import datetime, timedelta
+    from circuit_breaker import HostCircuitBreaker, CLOSED, HALF_OPEN, OPEN
+    
+    # Начинаем с пустого состояния, даже если предыдущий запуск не убрал файл
+    if os.path.exists("test_circuit_state.json"):
+        os.remove("test_circuit_state.json")
+    breaker = HostCircuitBreaker(state_file='test_circuit_state.json', failure_threshold=3,
+                                 probe_delay=60, probe_max_delay=200)
+    host = breaker.host_key("https://Example.com/page")
+    now = datetime(2026, 1, 1, 12, 0)
+    
+    # До порога хост проверяется как обычно
+    breaker.record_failure(host, now)
+    breaker.record_failure(host, now)
+    assert breaker.state(host, now) == CLOSED
+    breaker.record_failure(host, now)
+    assert breaker.state(host, now) == OPEN and breaker.open_hosts() == 1
+    
+    # Проба наступает через probe_delay, задержка после неудачных проб удваивается до probe_max_delay
+    assert breaker.state(host, now + timedelta(seconds=59)) == OPEN
+    assert breaker.state(host, now + timedelta(seconds=60)) == HALF_OPEN
+    delays = []
+    for _ in range(3):
+        breaker.record_failure(host, now)
+        delays.append((breaker.next_probe_at(host) - now).total_seconds())
+    print(f"    Задержки проб: {delays}")
+    assert delays == [120, 200, 200]
+    
+    # Состояние переживает перезапуск
+    breaker.save()
+    restored = HostCircuitBreaker(state_file='test_circuit_state.json', failure_threshold=3)
+    assert restored.state(host, now) == OPEN and restored.next_probe_at(host) == breaker.next_probe_at(host)
+    
+    # Успешный ответ возвращает хост к обычной проверке
+    restored.record_success(host)
+    assert restored.state(host, now) == CLOSED and restored.open_hosts() == 0
+    
+    print("✅ Тестирование circuit breaker завершено\n")
+
+def test_text_diff():
+    """Тестирование пословного сравнения текстов"""
+    print("🧪 Тестирование пословного diff...")
+    
+    from text_diff import WordDiff, format_summary
+    
+    diff = WordDiff("Цена товара 100 руб доставка завтра", "Цена товара 120 руб доставка сегодня")
+    print(f"    Доля совпадений: {diff.ratio:.2f}, измененных символов: {diff.changed_chars}")
+    assert diff.hunks() == [("100", "120"), ("завтра", "сегодня")]
+    assert diff.changed_chars == len("100") + len("120") + len("завтра") + len("сегодня")
+    summary = diff.summary(max_passages=1)
+    assert summary == {'added': ["сегодня"], 'removed': ["завтра"], 'omitted': 2}
+    assert format_summary(summary) == "+ «сегодня»\n− «завтра»\n… и еще изменений: 2"
+    assert WordDiff("одинаковый текст", "одинаковый текст").ratio == 1.0
+    
+    # Большая таблица повторяющихся чисел без уникальных слов, сдвинутая на одно число
+    cells = [str(i * 7 % 50) for i in range(3000)]
+    rotated = WordDiff(' '.join(cells), ' '.join(cells[1:] + cells[:1]))
+    print(f"    Сдвинутая таблица: доля совпадений {rotated.ratio:.4f}")
+    assert rotated.ratio > 0.99 and rotated.hunks() == [(cells[0], ""), ("", cells[0])]
+    
+    print("✅ Тестирование diff завершено\n")
+
+def test_cluster_queue():
+    """Тестирование очереди распределенной проверки"""
+    print("🧪 Тестирование очереди воркеров...")
+    
+    from cluster import HashRing, WorkQueue
+    
+    queue = WorkQueue("test_work_queue.sqlite3")
+    queue.heartbeat("w1")
+    queue.heartbeat("w2")
+    assert queue.live_workers(60) == ["w1", "w2"]
+    
+    ring = HashRing(["w1", "w2"])
+    keys = [f"https://site{i}.example/" for i in range(10)]
+    queue.enqueue("run", ((key, ring.node_for(key), [{'id': i}]) for i, key in enumerate(keys)))
+    taken = queue.claim("w1", 100)
+    
+    # Воркер w1 выбывает - его задания переходят к w2
+    queue.leave("w1")
+    moved = queue.rebalance("run", HashRing(["w2"]))
+    print(f"    Забрано w1: {len(taken)}, переназначено: {moved}")
+    assert moved == len(taken)
+    assert taken and not queue.complete(taken[0][0], "w1", {})
+    assert len(queue.claim("w2", 100)) == len(keys)
+    queue.purge("run")
+    
+    print("✅ Тестирование очереди завершено\n")
+
+def test_fair_queue():
+    """Тестирование справедливой очереди проверки"""
+    print("🧪 Тестирование справедливой очереди...")
+    
+    from fair_queue import FairQueue
+    
+    queue = FairQueue(weights={2: 2})
+    for i in range(6):
+        queue.add([1], f"a{i}")
+    for i in range(4):
+        queue.add([2], f"b{i}")
+    queue.add([1, 2], "shared")
+    
+    order = [queue.pop()[0] for _ in range(len(queue))]
+    print(f"    Порядок: {' '.join(order)}")
+    assert order[:6] == ["a0", "b0", "b1", "a1", "b2", "b3"]
+    assert order.count("shared") == 1 and not queue
+    
+    # Квота: второй раз пользователь получит группу только через минуту
+    clock = [0.0]
+    limited = FairQueue(rates={1: 1}, clock=lambda: clock[0])
+    limited.add([1], "x")
+    limited.add([1], "y")
+    assert limited.pop() == ("x", 0.0) and limited.pop() == (None, 60.0)
+    clock[0] = 60.0
+    assert limited.pop() == ("y", 0.0)
+    
+    print("✅ Тестирование очереди завершено\n")
+
+def test_run_journal():
+    """Тестирование журнала прогона"""
+    print("🧪 Тестирование журнала прогона...")
+    
+    from run_journal import RunJournal
+    
+    journal = RunJournal("test_run_journal.jsonl")
+    assert journal.load() is None
+    run_id = journal.start()['run_id']
+    site = {'url': "https://example.com", 'user_id': 1}
+    journal.record_result('ok', {'site': site, 'message': "OK", 'content_hash': "abc", 'timings': {}})
+    journal.record_notifications({1: "Сайт восстановлен", 2: "Сайт недоступен"})
+    journal.record_sent(1)
+    
+    # Оборванная при сбое последняя строка пропускается
+    with open("test_run_journal.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"type": "sent", "user')
+    
+    run = journal.load()
+    print(f"    Прогон {run['run_id'][:8]}: результатов {len(run['results'])}, отправлено {len(run['sent'])}")
+    assert run['run_id'] == run_id
+    assert run['results']["1:https://example.com"]['status'] == 'ok'
+    assert run['notifications'] == {1: "Сайт восстановлен", 2: "Сайт недоступен"} and run['sent'] == {1}
+    
+    # Неудачная отправка не отмечается в журнале: уведомление будет отправлено повторно
+    import asyncio
+    import logging
+    from types import SimpleNamespace
+    from scheduler import MonitoringScheduler
+    scheduler = MonitoringScheduler.__new__(MonitoringScheduler)
+    scheduler.bot = SimpleNamespace(application=None)
+    scheduler.journal = journal
+    scheduler.logger = logging.getLogger("test_run_journal")
+    asyncio.run(scheduler._send_notifications({2: "Сайт недоступен"}))
+    assert journal.load()['sent'] == {1}
+    journal.finish()
+    assert journal.load() is None
+    
+    print("✅ Тестирование журнала завершено\n")
+
 def test_monitor(database):
     """Тестирование монитора сайтов"""
     print("🧪 Тестирование монитора сайтов...")
@@ -116,11 +645,52 @@ def test_config():
     except Exception as e:
         print(f"  ❌ Ошибка загрузки конфигурации: {str(e)}\n")
 
+def test_page_cache():
+    """Тестирование кеша страниц /list и /status"""
+    print("🧪 Тестирование кеша страниц...")
+    
+    import os
+    from collections import OrderedDict
+    import config
+    from telegram_bot import SiteMonitorBot
+    
+    if os.path.exists("test_page_sites.json"):
+        os.remove("test_page_sites.json")
+    bot = SiteMonitorBot.__new__(SiteMonitorBot)
+    bot.database = SitesDatabase("test_page_sites.json")
+    bot.monitor = SiteMonitor(bot.database)
+    bot._page_cache = OrderedDict()
+    bot.database.add_site("https://example.com", "Example", 1)
+    bot.database.add_site("https://example.org", "Example", 2)
+    
+    status = bot._get_pages(1, 'status')
+    assert bot._get_pages(1, 'status') is status
+    
+    # Правила наблюдения видны на странице /status - кеш сбрасывается
+    bot.database.set_site_watch(1, ["цена"])
+    status = bot._get_pages(1, 'status')
+    assert "цена" in bot._render_page(status, 'status', 0)[0]
+    
+    # Кеш ограничен PAGE_CACHE_SIZE записями, вытесняются давно не открытые
+    saved = config.PAGE_CACHE_SIZE
+    config.PAGE_CACHE_SIZE = 2
+    try:
+        bot._get_pages(1, 'list')
+        bot._get_pages(1, 'status')
+        bot._get_pages(2, 'list')
+        assert list(bot._page_cache) == [(1, 'status'), (2, 'list')]
+    finally:
+        config.PAGE_CACHE_SIZE = saved
+    
+    print("✅ Тестирование кеша страниц завершено\n")
+
 def cleanup_test_files():
     """Очистка тестовых файлов"""
     import os
     
-    test_files = ["test_sites.json"]
+    test_files = ["test_sites.json", "test_import_sites.json", "test_work_queue.sqlite3", "test_run_journal.jsonl",
+                  "test_circuit_state.json", "test_retry_sites.json", "test_redirect_cache.json",
+                  "test_mode_sites.json", "test_page_sites.json"]
     
     for file in test_files:
         if os.path.exists(file):
@@ -139,6 +709,54 @@ def main():
         # Тестируем базу данных
         db = test_database()
         
+        # Тестируем импорт
+        test_bulk_import()
+        
+        # Тестируем правила фрагментов
+        test_content_rules()
+        
+        # Тестируем режимы проверки
+        test_check_modes()
+        
+        # Тестируем правила наблюдения
+        test_watch_rules()
+        
+        # Тестируем потоковое извлечение текста
+        test_html_stream()
+        
+        # Тестируем снимки JSON ответов
+        test_json_snapshot()
+        
+        # Тестируем учет объема сжатых ответов
+        test_transfer_accounting()
+        
+        # Тестируем повторы загрузки
+        test_fetch_retries()
+        
+        # Тестируем кеш постоянных редиректов
+        test_redirect_cache()
+        
+        # Тестируем состояния оповещений
+        test_alert_state()
+        
+        # Тестируем отключение недоступных хостов
+        test_circuit_breaker()
+        
+        # Тестируем пословный diff
+        test_text_diff()
+        
+        # Тестируем очередь воркеров
+        test_cluster_queue()
+        
+        # Тестируем справедливую очередь
+        test_fair_queue()
+        
+        # Тестируем журнал прогона
+        test_run_journal()
+        
+        # Тестируем кеш страниц
+        test_page_cache()
+        
         # Тестируем монитор
         test_monitor(db)
         
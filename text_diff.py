@@ -0,0 +1,368 @@
+"""
+Модуль пословного сравнения текстов страниц
+Разбивает тексты на слова один раз, заменяет слова целочисленными идентификаторами
+и строит пословный diff (patience diff), из которого получаются доля изменений,
+число измененных символов и сводка крупнейших изменений для уведомления
+"""
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Tuple
+
+# Участок без уникальных общих слов сравнивается SequenceMatcher, если он не больше
+# этого числа пар слов; иначе - алгоритмом Майерса
+FALLBACK_MAX_CELLS = 250_000
+
+# Предел шагов алгоритма Майерса (примерно квадрат числа правок / 2 плюс длина участка):
+# участок, требующий больше, целиком считается замененным
+MYERS_MAX_STEPS = 500_000
+
+# Предельная длина одного участка в сводке изменений (на случай очень длинных "слов")
+MAX_PASSAGE_CHARS = 200
+
+
+def _intern(words: List[str], vocabulary: Dict[str, int]) -> array:
+    """
+    Заменяет слова идентификаторами из общего словаря
+
+    Args:
+        words (List[str]): Слова текста
+        vocabulary (Dict[str, int]): Словарь слово -> идентификатор (дополняется)
+
+    Returns:
+        array: Идентификаторы слов
+    """
+    ids = array('l')
+    for word in words:
+        word_id = vocabulary.get(word)
+        if word_id is None:
+            word_id = vocabulary[word] = len(vocabulary)
+        ids.append(word_id)
+    return ids
+
+
+def _unique_anchors(a: array, b: array, alo: int, ahi: int, blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """
+    Находит опорные пары: слова, встречающиеся на участке ровно по одному разу в обоих текстах,
+    и оставляет наибольшую возрастающую по обоим текстам последовательность таких пар
+
+    Returns:
+        List[Tuple[int, int]]: Пары позиций (в старом тексте, в новом тексте)
+    """
+    positions_a = {}
+    for i in range(alo, ahi):
+        positions_a[a[i]] = -1 if a[i] in positions_a else i
+
+    positions_b = {}
+    for j in range(blo, bhi):
+        word_id = b[j]
+        if positions_a.get(word_id, -1) >= 0:
+            positions_b[word_id] = -1 if word_id in positions_b else j
+
+    pairs = sorted(
+        (positions_a[word_id], j) for word_id, j in positions_b.items() if j >= 0
+    )
+    if not pairs:
+        return []
+
+    # Наибольшая возрастающая подпоследовательность по позициям в новом тексте (patience sorting)
+    tails = []
+    tail_indexes = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        position = bisect_left(tails, j)
+        if position == len(tails):
+            tails.append(j)
+            tail_indexes.append(index)
+        else:
+            tails[position] = j
+            tail_indexes[position] = index
+        previous[index] = tail_indexes[position - 1] if position else -1
+
+    anchors = []
+    index = tail_indexes[-1]
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _myers_pairs(a: array, b: array, alo: int, ahi: int, blo: int, bhi: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Находит наибольшую общую подпоследовательность участка алгоритмом Майерса
+
+    Время растет с числом правок, а не с произведением длин участков, поэтому большой
+    участок с небольшими изменениями (например, сдвинутая таблица повторяющихся чисел)
+    сравнивается точно. Если правок слишком много (MYERS_MAX_STEPS), сравнение прерывается
+
+    Returns:
+        Optional[List[Tuple[int, int]]]: Пары совпадающих позиций по возрастанию
+        или None, если предел шагов превышен
+    """
+    n = ahi - alo
+    m = bhi - blo
+
+    # Нижняя оценка числа правок по общим словам - заведомо дорогой участок отбрасываем сразу
+    common = sum((Counter(a[alo:ahi]) & Counter(b[blo:bhi])).values())
+    min_edits = n + m - 2 * common
+    if min_edits * min_edits // 2 > MYERS_MAX_STEPS:
+        return None
+
+    # furthest[k] - наибольший x на диагонали k = x - y; trace[d] - состояние до шага d
+    furthest = {1: 0}
+    trace = []
+    steps = 0
+    for d in range(n + m + 1):
+        trace.append(dict(furthest))
+        steps += d + 1
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and furthest[k - 1] < furthest[k + 1]):
+                x = furthest[k + 1]
+            else:
+                x = furthest[k - 1] + 1
+            y = x - k
+            start = x
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            steps += x - start
+            furthest[k] = x
+            if x >= n and y >= m:
+                break
+        else:
+            if steps > MYERS_MAX_STEPS:
+                return None
+            continue
+        break
+
+    # Обратный проход по сохраненным состояниям собирает диагональные участки
+    pairs = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        previous = trace[d]
+        k = x - y
+        if k == -d or (k != d and previous[k - 1] < previous[k + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = previous[prev_k]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y and x > 0 and y > 0:
+            x -= 1
+            y -= 1
+            pairs.append((alo + x, blo + y))
+        x, y = prev_x, prev_y
+
+    pairs.reverse()
+    return pairs
+
+
+def _matching_pairs(a: array, b: array) -> List[Tuple[int, int]]:
+    """
+    Строит пословное соответствие двух текстов
+
+    Общие начало и конец участка отсекаются за линейное время, середина делится
+    по уникальным общим словам, и так далее для каждого промежутка между ними
+
+    Returns:
+        List[Tuple[int, int]]: Пары совпадающих позиций по возрастанию
+    """
+    matches = []
+    # В стеке лежат участки (alo, ahi, blo, bhi) и уже найденные пары (i, j);
+    # участки кладутся в обратном порядке, чтобы пары выходили по возрастанию
+    stack = [(0, len(a), 0, len(b))]
+
+    while stack:
+        item = stack.pop()
+        if len(item) == 2:
+            matches.append(item)
+            continue
+
+        alo, ahi, blo, bhi = item
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+
+        suffix = []
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            suffix.append((ahi, bhi))
+        stack.extend(suffix)
+
+        if alo == ahi or blo == bhi:
+            continue
+
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            ranges = []
+            for i, j in anchors:
+                ranges.append((alo, i, blo, j))
+                ranges.append((i, j))
+                alo, blo = i + 1, j + 1
+            ranges.append((alo, ahi, blo, bhi))
+            stack.extend(reversed(ranges))
+        elif (ahi - alo) * (bhi - blo) <= FALLBACK_MAX_CELLS:
+            # Нет уникальных общих слов (например, повторяющиеся слова) - небольшой участок сравниваем точно
+            matcher = SequenceMatcher(None, a[alo:ahi].tolist(), b[blo:bhi].tolist(), autojunk=False)
+            stack.extend(reversed([
+                (alo + block.a + k, blo + block.b + k)
+                for block in matcher.get_matching_blocks() for k in range(block.size)
+            ]))
+        else:
+            # Большой участок без уникальных общих слов: точное сравнение, пока правок немного,
+            # иначе участок целиком считается замененным
+            stack.extend(reversed(_myers_pairs(a, b, alo, ahi, blo, bhi) or []))
+
+    return matches
+
+
+class WordDiff:
+    """
+    Пословный diff двух текстов
+
+    Доля изменений и число измененных символов считаются по символам слов
+    (с разделяющим пробелом), поэтому сопоставимы с посимвольными порогами
+    """
+
+    def __init__(self, old_text: str, new_text: str):
+        """
+        Сравнивает тексты
+
+        Args:
+            old_text (str): Предыдущий текст страницы
+            new_text (str): Новый текст страницы
+        """
+        self.old_words = old_text.split()
+        self.new_words = new_text.split()
+
+        vocabulary = {}
+        old_ids = _intern(self.old_words, vocabulary)
+        new_ids = _intern(self.new_words, vocabulary)
+
+        self.opcodes = self._opcodes(_matching_pairs(old_ids, new_ids))
+
+        matched = 0
+        self.removed_chars = 0
+        self.added_chars = 0
+        for tag, i1, i2, j1, j2 in self.opcodes:
+            if tag == 'equal':
+                matched += self._weight(self.old_words, i1, i2)
+            else:
+                self.removed_chars += len(' '.join(self.old_words[i1:i2]))
+                self.added_chars += len(' '.join(self.new_words[j1:j2]))
+
+        total = self._weight(self.old_words, 0, len(self.old_words)) + self._weight(self.new_words, 0, len(self.new_words))
+        self.ratio = 2.0 * matched / total if total else 1.0
+        self.changed_chars = self.removed_chars + self.added_chars
+
+    @staticmethod
+    def _weight(words: List[str], start: int, end: int) -> int:
+        """Число символов слов с учетом пробела после каждого слова"""
+        return sum(len(word) + 1 for word in words[start:end])
+
+    def _opcodes(self, matches: List[Tuple[int, int]]) -> List[Tuple[str, int, int, int, int]]:
+        """
+        Преобразует пары совпадений в операции в формате SequenceMatcher.get_opcodes()
+
+        Returns:
+            List[Tuple[str, int, int, int, int]]: Операции (вид, i1, i2, j1, j2)
+        """
+        opcodes = []
+        i = j = 0
+        # Замыкающая пара за концом текстов завершает последний промежуток
+        for match_i, match_j in matches + [(len(self.old_words), len(self.new_words))]:
+            if i < match_i or j < match_j:
+                tag = 'replace' if i < match_i and j < match_j else ('delete' if i < match_i else 'insert')
+                opcodes.append((tag, i, match_i, j, match_j))
+            if match_i < len(self.old_words):
+                if opcodes and opcodes[-1][0] == 'equal':
+                    _, i1, _, j1, _ = opcodes[-1]
+                    opcodes[-1] = ('equal', i1, match_i + 1, j1, match_j + 1)
+                else:
+                    opcodes.append(('equal', match_i, match_i + 1, match_j, match_j + 1))
+            i, j = match_i + 1, match_j + 1
+        return opcodes
+
+    def hunks(self) -> List[Tuple[str, str]]:
+        """
+        Измененные участки по порядку следования в тексте
+
+        Returns:
+            List[Tuple[str, str]]: Пары (удаленный текст, добавленный текст)
+        """
+        return [
+            (' '.join(self.old_words[i1:i2]), ' '.join(self.new_words[j1:j2]))
+            for tag, i1, i2, j1, j2 in self.opcodes if tag != 'equal'
+        ]
+
+    def summary(self, max_passages: int = 3, max_words: int = 12) -> Dict:
+        """
+        Формирует ограниченную по размеру сводку изменений: самые крупные
+        добавленные и удаленные участки из уже построенных операций diff
+
+        Args:
+            max_passages (int): Сколько участков каждого вида оставить
+            max_words (int): Сколько слов оставить из каждого участка
+
+        Returns:
+            Dict: Ключи added и removed (участки по убыванию размера)
+            и omitted (сколько участков не вошло в сводку)
+        """
+        added = []
+        removed = []
+        for tag, i1, i2, j1, j2 in self.opcodes:
+            if tag == 'equal':
+                continue
+            if i2 > i1:
+                removed.append((self._weight(self.old_words, i1, i2), i1, i2))
+            if j2 > j1:
+                added.append((self._weight(self.new_words, j1, j2), j1, j2))
+
+        def top(passages: List[Tuple[int, int, int]], words: List[str]) -> List[str]:
+            largest = heapq.nlargest(max_passages, passages, key=lambda passage: passage[0])
+            return [_shorten(words[start:start + max_words], end - start) for _, start, end in largest]
+
+        return {
+            'added': top(added, self.new_words),
+            'removed': top(removed, self.old_words),
+            'omitted': max(0, len(added) - max_passages) + max(0, len(removed) - max_passages)
+        }
+
+
+def format_summary(summary: Dict) -> str:
+    """
+    Формирует текст сводки изменений для уведомления и /status
+
+    Args:
+        summary (Dict): Сводка из WordDiff.summary()
+
+    Returns:
+        str: Строки вида "+ «добавлено»" и "− «удалено»"
+    """
+    lines = [f"+ «{passage}»" for passage in summary.get('added', [])]
+    lines += [f"− «{passage}»" for passage in summary.get('removed', [])]
+    if summary.get('omitted'):
+        lines.append(f"… и еще изменений: {summary['omitted']}")
+    return '\n'.join(lines)
+
+
+def _shorten(words: List[str], total_words: int) -> str:
+    """
+    Склеивает начало участка, отмечая многоточием, что участок длиннее
+
+    Args:
+        words (List[str]): Первые слова участка
+        total_words (int): Число слов во всем участке
+
+    Returns:
+        str: Текст участка не длиннее MAX_PASSAGE_CHARS символов
+    """
+    text = ' '.join(words)
+    if len(text) > MAX_PASSAGE_CHARS:
+        return text[:MAX_PASSAGE_CHARS].rstrip() + '…'
+    return text + ('…' if total_words > len(words) else '')
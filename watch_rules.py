@@ -0,0 +1,236 @@
+"""
+Модуль правил наблюдения за страницей
+Правило - ключевое слово или фраза (поиск без учета регистра) либо регулярное
+выражение с префиксом re:. Все правила сайтов с одним URL собираются в один
+сопоставитель: слова ищутся автоматом Ахо-Корасик, выражения - одним общим
+регулярным выражением, так что текст страницы просматривается за один проход
+"""
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+from content_rules import REGEX_PREFIX, compile_user_regex, regex_error
+
+# Выражения, которые нельзя включить в общее выражение: обратные ссылки по номеру
+# (номера групп сдвигаются), именованные группы (имена могут совпасть у правил разных
+# пользователей или со служебными _wN) и глобальные флаги вида (?i) в начале
+_STANDALONE_REGEX = re.compile(r'\\[1-9]|\(\?P[<=]|^\(\?[aiLmsux]+\)')
+
+
+def is_regex(pattern: str) -> bool:
+    """
+    Определяет, является ли правило регулярным выражением
+
+    Args:
+        pattern (str): Правило наблюдения
+
+    Returns:
+        bool: True для правила re:<выражение>
+    """
+    return pattern.startswith(REGEX_PREFIX)
+
+
+def validate_watch_rule(pattern: str) -> Optional[str]:
+    """
+    Проверяет корректность правила наблюдения
+
+    Args:
+        pattern (str): Ключевое слово или re:<выражение>
+
+    Returns:
+        Optional[str]: Описание ошибки или None если правило корректно
+    """
+    if not pattern.strip():
+        return "Не указано ключевое слово или выражение"
+    if is_regex(pattern):
+        return regex_error(pattern[len(REGEX_PREFIX):])
+    return None
+
+
+class AhoCorasick:
+    """
+    Автомат Ахо-Корасик: находит все слова из набора за один проход по тексту
+    """
+
+    def __init__(self, words: Iterable[str]):
+        """
+        Строит автомат
+
+        Args:
+            words (Iterable[str]): Искомые слова
+        """
+        self.words = list(words)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for index, word in enumerate(self.words):
+            node = 0
+            for char in word:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = self._goto[node][char] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = next_node
+            self._output[node].append(index)
+
+        # Ссылки неудач строятся обходом в ширину; выходы наследуются от узла неудачи
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def find(self, text: str) -> set:
+        """
+        Находит слова, встречающиеся в тексте
+
+        Args:
+            text (str): Текст
+
+        Returns:
+            set: Индексы найденных слов
+        """
+        found = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        node = 0
+
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                found.update(output[node])
+                # Все слова найдены - дальше текст можно не просматривать
+                if len(found) == len(self.words):
+                    break
+
+        return found
+
+
+class WatchMatcher:
+    """
+    Сопоставитель набора правил наблюдения
+
+    Для ключевого слова результат - само слово, если оно найдено. Для выражения -
+    первое совпадение (или его первая группа, если в выражении есть группы).
+    Недопустимые выражения (см. content_rules.regex_error), сохраненные до появления
+    ограничений, не выполняются и ничего не находят
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Собирает правила в один сопоставитель
+
+        Args:
+            patterns (Iterable[str]): Правила наблюдения
+        """
+        self.patterns = tuple(sorted(set(patterns)))
+        self._literals = [pattern for pattern in self.patterns if not is_regex(pattern)]
+        self._automaton = AhoCorasick(pattern.casefold() for pattern in self._literals) if self._literals else None
+
+        self._combined = None
+        self._combined_groups = []
+        self._standalone = []
+        alternatives = []
+        for pattern in self.patterns:
+            if not is_regex(pattern):
+                continue
+            expression = pattern[len(REGEX_PREFIX):]
+            compiled = compile_user_regex(expression)
+            if compiled is None:
+                continue
+            if _STANDALONE_REGEX.search(expression):
+                self._standalone.append((pattern, compiled))
+                continue
+            name = f"_w{len(alternatives)}"
+            alternatives.append(f"(?P<{name}>{expression})")
+            self._combined_groups.append((pattern, name, compiled))
+        if alternatives:
+            self._combined = re.compile('|'.join(alternatives))
+
+    def match(self, text: str) -> Dict[str, Optional[str]]:
+        """
+        Применяет правила к тексту
+
+        Args:
+            text (str): Текст страницы
+
+        Returns:
+            Dict[str, Optional[str]]: Результат каждого правила (None - не найдено)
+        """
+        matches = dict.fromkeys(self.patterns)
+
+        if self._automaton:
+            for index in self._automaton.find(text.casefold()):
+                matches[self._literals[index]] = self._literals[index]
+
+        if self._combined:
+            outer = {name: (pattern, self._combined.groupindex[name], compiled.groups)
+                     for pattern, name, compiled in self._combined_groups}
+            pending = len(outer)
+            for found in self._combined.finditer(text):
+                pattern, index, groups = outer[found.lastgroup]
+                if matches[pattern] is None:
+                    matches[pattern] = found.group(index + 1 if groups else index)
+                    pending -= 1
+                    if not pending:
+                        break
+
+            if pending < len(outer):
+                # Совпадения одного выражения могут заслонить совпадения другого в том же месте текста -
+                # ненайденные выражения проверяем отдельно (только если общий проход что-то нашел)
+                for pattern, _, compiled in self._combined_groups:
+                    if matches[pattern] is None:
+                        matches[pattern] = self._search(compiled, text)
+
+        for pattern, compiled in self._standalone:
+            matches[pattern] = self._search(compiled, text)
+
+        return matches
+
+    @staticmethod
+    def _search(compiled: re.Pattern, text: str) -> Optional[str]:
+        """Первое совпадение выражения (или его первая группа)"""
+        found = compiled.search(text)
+        if found is None:
+            return None
+        return found.group(1 if compiled.groups else 0)
+
+
+def watch_events(patterns: Iterable[str], previous: Dict[str, Optional[str]],
+                 current: Dict[str, Optional[str]]) -> List[str]:
+    """
+    Сравнивает результаты правил с прошлой проверкой
+
+    Правила, для которых еще нет прошлого результата, только запоминаются
+
+    Args:
+        patterns (Iterable[str]): Правила сайта
+        previous (Dict[str, Optional[str]]): Результаты прошлой проверки
+        current (Dict[str, Optional[str]]): Результаты текущей проверки
+
+    Returns:
+        List[str]: Описания сработавших правил
+    """
+    events = []
+    for pattern in patterns:
+        if pattern not in previous or previous[pattern] == current.get(pattern):
+            continue
+        old, new = previous[pattern], current.get(pattern)
+        if not is_regex(pattern):
+            events.append(f"«{pattern}» появилось на странице" if new else f"«{pattern}» пропало со страницы")
+        elif old is None:
+            events.append(f"{pattern}: найдено «{new}»")
+        elif new is None:
+            events.append(f"{pattern}: больше не найдено (было «{old}»)")
+        else:
+            events.append(f"{pattern}: «{old}» → «{new}»")
+    return events
@@ -0,0 +1,135 @@
+"""
+Модуль приема обновлений Telegram через вебхук
+HTTP(S) сервер в фоновом потоке принимает POST запросы Telegram с обновлениями
+и передает их в очередь обновлений приложения бота на его event loop
+"""
+import asyncio
+import hmac
+import json
+import logging
+import ssl
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from telegram import Update
+from telegram.ext import Application
+
+# Заголовок с секретом, который Telegram передает в каждом запросе вебхука
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+# Максимальный размер тела запроса с одним обновлением
+MAX_BODY_SIZE = 1024 * 1024
+
+# Сколько ждать постановки обновления в очередь приложения, секунд
+ENQUEUE_TIMEOUT = 10
+
+
+class _WebhookHandler(BaseHTTPRequestHandler):
+    """
+    Обработчик HTTP запросов вебхука
+    """
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_BODY_SIZE:
+            self.send_error(400 if length <= 0 else 413)
+            return
+
+        # Тело читаем до проверок: закрытие соединения с непрочитанными данными сбрасывает его
+        # до того, как клиент получит ответ с ошибкой
+        body = self.rfile.read(length)
+
+        if self.path.split('?', 1)[0] != server.path:
+            self.send_error(404)
+            return
+
+        if not hmac.compare_digest(self.headers.get(SECRET_HEADER, ''), server.secret_token):
+            self.send_error(403)
+            return
+
+        try:
+            update = Update.de_json(json.loads(body), server.application.bot)
+        except (ValueError, TypeError, KeyError) as e:
+            server.logger.warning(f"Некорректное обновление в вебхуке: {str(e)}")
+            self.send_error(400)
+            return
+
+        # Отвечаем только после постановки в очередь, иначе Telegram не повторит доставку
+        future = asyncio.run_coroutine_threadsafe(server.application.update_queue.put(update), server.loop)
+        try:
+            future.result(timeout=ENQUEUE_TIMEOUT)
+        except Exception as e:
+            server.logger.error(f"Не удалось передать обновление боту: {str(e)}")
+            self.send_error(503)
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        # Не засоряем лог запросами Telegram
+        pass
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """
+    Сервер вебхука: принимает обновления по HTTP или HTTPS (если заданы сертификат и ключ)
+    """
+
+    daemon_threads = True
+
+    # Очередь входящих соединений: при залпе обновлений значение по умолчанию (5)
+    # приводит к повторным SYN и задержкам около секунды
+    request_queue_size = 128
+
+    def __init__(self, application: Application, loop: asyncio.AbstractEventLoop, host: str, port: int,
+                 path: str, secret_token: str, cert_file: str = None, key_file: str = None):
+        """
+        Инициализация сервера
+
+        Args:
+            application (Application): Приложение бота
+            loop (asyncio.AbstractEventLoop): Event loop приложения
+            host (str): Адрес для прослушивания
+            port (int): Порт (0 - выбрать свободный)
+            path (str): Путь вебхука
+            secret_token (str): Секрет из заголовка X-Telegram-Bot-Api-Secret-Token
+            cert_file (str): Файл сертификата для HTTPS
+            key_file (str): Файл закрытого ключа для HTTPS
+        """
+        super().__init__((host, port), _WebhookHandler)
+        self.application = application
+        self.loop = loop
+        self.path = path
+        self.secret_token = secret_token
+        self.logger = logging.getLogger(__name__)
+
+        self.ssl_context: Optional[ssl.SSLContext] = None
+        if cert_file and key_file:
+            self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            self.ssl_context.load_cert_chain(cert_file, key_file)
+
+    @property
+    def url(self) -> str:
+        """Локальный адрес вебхука"""
+        scheme = 'https' if self.ssl_context else 'http'
+        host, port = self.server_address[:2]
+        return f"{scheme}://{host}:{port}{self.path}"
+
+    def finish_request(self, request, client_address):
+        # TLS рукопожатие выполняется в потоке запроса, чтобы медленный клиент не задерживал прием соединений
+        if self.ssl_context:
+            try:
+                request = self.ssl_context.wrap_socket(request, server_side=True)
+            except (ssl.SSLError, OSError) as e:
+                self.logger.warning(f"Ошибка TLS соединения с {client_address[0]}: {str(e)}")
+                return
+        super().finish_request(request, client_address)
+
+    def start(self):
+        """Запускает сервер в фоновом потоке"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        self.logger.info(f"Вебхук слушает на {self.url}")